@@ -2,12 +2,13 @@ import linuxcnc
 from qtpyvcp.utilities import logger
 from qtpyvcp.utilities.info import Info
 from qtpyvcp.plugins import getPlugin
+from qtpyvcp.lib.command_dispatcher import getCommandDispatcher
 
 STATUS = getPlugin('status')
 STAT = STATUS.stat
 
 INFO = Info()
-CMD = linuxcnc.command()
+CMD = getCommandDispatcher()
 
 
 # Set up logging
@@ -5,11 +5,12 @@ from qtpyvcp.utilities import logger
 LOG = logger.getLogger(__name__)
 
 from qtpyvcp.plugins import getPlugin
+from qtpyvcp.lib.command_dispatcher import getCommandDispatcher
 
 STATUS = getPlugin('status')
 STAT = STATUS.stat
 
-CMD = linuxcnc.command()
+CMD = getCommandDispatcher()
 
 #==============================================================================
 # Coolent actions
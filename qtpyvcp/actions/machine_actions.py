@@ -8,14 +8,15 @@ from qtpyvcp.utilities import logger
 LOG = logger.getLogger(__name__)
 
 from qtpyvcp.actions.base_actions import setTaskMode
-from qtpyvcp.plugins import getPlugin
+from qtpyvcp.plugins import getPlugin, iterPlugins
 
 STATUS = getPlugin('status')
 STAT = STATUS.stat
 
 from qtpyvcp.utilities.info import Info
+from qtpyvcp.lib.command_dispatcher import getCommandDispatcher
 INFO = Info()
-CMD = linuxcnc.command()
+CMD = getCommandDispatcher()
 
 
 # -------------------------------------------------------------------------
@@ -160,6 +161,7 @@ power.on.bindOk = power.off.bindOk = power.toggle.bindOk = _power_bindOk
 # -------------------------------------------------------------------------
 
 PREVIOUS_MODE = None
+MDI_EXECUTOR = None
 
 def _resetMode(interp_state):
     global PREVIOUS_MODE
@@ -170,6 +172,13 @@ def _resetMode(interp_state):
 
 STATUS.interp_state.onValueChanged(_resetMode)
 
+def _mdiExecutor():
+    global MDI_EXECUTOR
+    if MDI_EXECUTOR is None:
+        MDI_EXECUTOR = dict(iterPlugins()).get('mdi_executor')
+    if MDI_EXECUTOR is not None and MDI_EXECUTOR._initialized:
+        return MDI_EXECUTOR
+
 def issue_mdi(command, reset=True):
     """Issue an MDI command.
 
@@ -178,6 +187,9 @@ def issue_mdi(command, reset=True):
         mode will automatically be switched to MDI prior to issuing the command
         and will be returned to the previous mode when the interpreter becomes IDLE.
 
+        The commands are queued on the ``mdi_executor`` plugin, which issues
+        each command once the previous one is complete.
+
         ActionButton syntax to issue G0 X5:
         ::
 
@@ -190,7 +202,16 @@ def issue_mdi(command, reset=True):
             can be separated with a ``;`` and will be issued sequentially.
         reset (bool, optional): Whether to reset the Task Mode to the state
             the machine was in prior to issuing the MDI command.
+
+    Returns:
+        list : An :py:class:`.MDICommand` for each command, which signals
+            when the command is done, or None if the ``mdi_executor``
+            plugin is not available.
     """
+    executor = _mdiExecutor()
+    if executor is not None:
+        return executor.submit(command, reset=reset)
+
     if reset:
         # save the previous mode
         global PREVIOUS_MODE
@@ -328,7 +349,7 @@ class feed_override:
     @staticmethod
     def set(value):
         """Feed Override Set Value"""
-        CMD.feedrate(float(value) / 100)
+        CMD.feedrate(float(value) / 100, coalesce=True)
 
     @staticmethod
     def reset():
@@ -422,7 +443,7 @@ class rapid_override:
     """Rapid Override Group"""
     @staticmethod
     def set(value):
-        CMD.rapidrate(float(value) / 100)
+        CMD.rapidrate(float(value) / 100, coalesce=True)
 
     @staticmethod
     def reset():
@@ -484,7 +505,7 @@ class max_velocity:
     @staticmethod
     def set(value):
         """Max Velocity Override Set Value"""
-        CMD.maxvel(float(value) / 60)
+        CMD.maxvel(float(value) / 60, coalesce=True)
 
     @staticmethod
     def reset():
@@ -8,13 +8,15 @@ LOG = logger.getLogger(__name__)
 
 from qtpyvcp.utilities.info import Info
 from qtpyvcp.plugins import getPlugin
+from qtpyvcp.lib.command_dispatcher import getCommandDispatcher
 
 STATUS = getPlugin('status')
 STAT = STATUS.stat
 INFO = Info()
-CMD = linuxcnc.command()
+CMD = getCommandDispatcher()
 
 from qtpyvcp.actions.base_actions import setTaskMode
+from qtpyvcp.actions.machine_actions import _mdiExecutor
 
 
 #==============================================================================
@@ -30,8 +32,7 @@ def load(fname, add_to_recents=True):
     filter_prog = INFO.getFilterProgram(fname)
     if not filter_prog:
         LOG.debug('Loading NC program: %s', fname)
-        CMD.program_open(fname.encode('utf-8'))
-        CMD.wait_complete()
+        CMD.program_open(fname.encode('utf-8'), wait=True)
     else:
         LOG.debug('Loading file with filter program: %s', fname)
         openFilterProgram(fname, filter_prog)
@@ -294,6 +295,12 @@ def abort():
     """
 
     LOG.debug("Aborting program")
+
+    # stop the queued MDI commands being issued once the interpreter is idle
+    executor = _mdiExecutor()
+    if executor is not None:
+        executor.abort()
+
     CMD.abort()
 
 def _abort_ok(widget=None):
@@ -6,6 +6,7 @@ LOG = logger.getLogger(__name__)
 
 from qtpyvcp.utilities.info import Info
 from qtpyvcp.plugins import getPlugin
+from qtpyvcp.lib.command_dispatcher import getCommandDispatcher
 
 STATUS = getPlugin('status')
 STAT = STATUS.stat
@@ -14,7 +15,7 @@ INFO = Info()
 SPINDLES = range(INFO.spindles())
 DEFAULT_SPEED = INFO.defaultSpindleSpeed()
 
-CMD = linuxcnc.command()
+CMD = getCommandDispatcher()
 
 from qtpyvcp.actions.base_actions import setTaskMode
 
@@ -249,7 +250,7 @@ def override(override, spindle=0):
         spindle (float, optional) : The number of the spindle to apply the
             override to. If ``spindle`` is not specified spindle 0 is assumed.
     """
-    CMD.spindleoverride(float(override) / 100, spindle)
+    CMD.spindleoverride(float(override) / 100, spindle, coalesce=True)
 
 def _or_reset(spindle=0):
     CMD.spindleoverride(1.0, spindle)
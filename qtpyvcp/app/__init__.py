@@ -38,6 +38,12 @@ Application Options:
                        Specify the Qt Python binding to use.
   --perfmon            Monitor and log system performance.
   --develop            Development mode. Enables live reloading of QSS styles.
+  --no-config-cache    Don't use the cached merged YAML config, always load
+                       and merge the config files.
+  --profile-startup    Profile the startup, and write a Chrome trace and
+                       a summary report to ~/.cache/qtpyvcp/profiles.
+  --standby            Keep a warm process ready to launch the VCP as soon as
+                       LinuxCNC is running, and relaunch it if it exits.
   --command_line_args <args>...
                        Additional args passed to the QtApplication.
 
@@ -91,6 +97,10 @@ def run(opts, config_file=None):
             the VCP will be loaded solely from the options passed in the
             options dict.
     """
+    if opts.profile_startup:
+        from qtpyvcp.utilities import profiler
+        profiler.enable()
+
     from qtpyvcp.utilities.opt_parser import apply_opts
 
     # apply command line options
@@ -123,7 +133,7 @@ def run(opts, config_file=None):
         config_files.append(qtpyvcp.DEFAULT_CONFIG_FILE)
 
         from qtpyvcp.utilities.config_loader import load_config_files
-        config = load_config_files(*config_files)
+        config = load_config_files(*config_files, use_cache=not opts.no_config_cache)
 
         from qtpyvcp.app.launcher import launch_application
         launch_application(opts, config)
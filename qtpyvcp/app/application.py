@@ -6,7 +6,7 @@ import os
 import sys
 import imp
 import inspect
-from pkg_resources import iter_entry_points
+from qtpyvcp.utilities.entry_points import iterEntryPoints
 
 from qtpy import API
 from qtpy.QtGui import QFontDatabase
@@ -15,6 +15,7 @@ from qtpy.QtWidgets import QApplication, QStyleFactory
 
 import qtpyvcp
 
+from qtpyvcp.utilities import profiler
 from qtpyvcp.utilities.logger import initBaseLogger
 from qtpyvcp.plugins import initialisePlugins, terminatePlugins, getPlugin
 from qtpyvcp.widgets.base_widgets.base_widget import VCPPrimitiveWidget
@@ -119,9 +120,9 @@ class VCPApplication(QApplication):
         else:
             try:
                 entry_points = {}
-                for entry_point in iter_entry_points(group='qtpyvcp.example_vcp'):
+                for entry_point in iterEntryPoints('qtpyvcp.example_vcp'):
                     entry_points[entry_point.name] = entry_point
-                for entry_point in iter_entry_points(group='qtpyvcp.vcp'):
+                for entry_point in iterEntryPoints('qtpyvcp.vcp'):
                     entry_points[entry_point.name] = entry_point
                 window = entry_points[vcp.lower()].load()
                 return window(opts=opts)
@@ -248,7 +249,12 @@ class VCPApplication(QApplication):
     def initialiseWidgets(self):
         for w in self.allWidgets():
             if isinstance(w, VCPPrimitiveWidget):
-                w.initialize()
+                if profiler.isEnabled():
+                    name = "{} '{}'".format(w.__class__.__name__, w.objectName())
+                    with profiler.profile(name, 'widget'):
+                        w.initialize()
+                else:
+                    w.initialize()
 
     def terminateWidgets(self):
         LOG.debug("Terminating widgets")
@@ -2,15 +2,17 @@ import os
 import sys
 import time
 import importlib
-from pkg_resources import iter_entry_points
 
-from qtpy.QtCore import Qt
+from qtpy.QtCore import Qt, QTimer
 from qtpy.QtWidgets import QApplication
 
 import qtpyvcp
 from qtpyvcp import hal
+from qtpyvcp.utilities import profiler
 from qtpyvcp.utilities.logger import getLogger
-from qtpyvcp.plugins import registerPluginFromClass, postGuiInitialisePlugins
+from qtpyvcp.utilities.entry_points import getVCPEntryPoints
+from qtpyvcp.plugins import registerPluginFromClass, postGuiInitialisePlugins, \
+    preInitialisePlugins, sortByDependencies
 from qtpyvcp.widgets.dialogs.error_dialog import ErrorDialog, IGNORE_LIST
 
 from qtpyvcp.utilities.info import Info
@@ -52,34 +54,54 @@ def log_time(task, times=[time.time(), time.time()]):
     LOG.debug("yellow<Time:> {:.3f} (green<{:+.3f}>) - {}"
               .format(now - times[0], now - times[1], task))
     times[1] = now
+    profiler.mark(task)
 
 log_time("in script")
 
 
 def launch_application(opts, config):
+    if opts.standby:
+        from qtpyvcp.app import standby
+        standby.supervise(opts, config)
+
+    app = setup_application(opts, config)
+    run_application(app)
+
+
+def setup_application(opts, config):
     qtpyvcp.OPTIONS.update(opts)
     qtpyvcp.CONFIG.update(config)
 
     hal_comp = hal.component('qtpyvcp')
 
     LOG.debug('Loading data plugings')
-    loadPlugins(config['data_plugins'])
+    with profiler.profile('load data plugins'):
+        loadPlugins(config['data_plugins'])
     log_time('done loading data plugins')
 
+    # start the plugins' blocking I/O, this only overlaps with constructing
+    # the QApplication as VCPApplication initialises the plugins, which
+    # waits for it, before the dialogs and windows are loaded
+    preInitialisePlugins()
+
     LOG.debug('Initializing app')
-    app = _initialize_object_from_dict(config['application'])
+    with profiler.profile('initialize app'):
+        app = _initialize_object_from_dict(config['application'])
     log_time('done initializing app')
 
     LOG.debug('Loading dialogs')
-    loadDialogs(config['dialogs'])
+    with profiler.profile('load dialogs'):
+        loadDialogs(config['dialogs'])
     log_time('done loading dialogs')
 
     LOG.debug('Loading windows')
-    loadWindows(config['windows'])
+    with profiler.profile('load windows'):
+        loadWindows(config['windows'])
     log_time('done loading windows')
 
     LOG.debug('Initializing widgets')
-    app.initialiseWidgets()
+    with profiler.profile('initialize widgets'):
+        app.initialiseWidgets()
     log_time('done initializing widgets')
 
     hal_comp.ready()
@@ -103,6 +125,14 @@ def launch_application(opts, config):
     # suppress QtQuick warnings
     app.setAttribute(Qt.AA_DontCreateNativeWidgetSiblings)
 
+    return app
+
+
+def run_application(app):
+    if profiler.isEnabled():
+        # write the reports once the event loop is running
+        QTimer.singleShot(0, profiler.finish)
+
     sys.exit(app.exec_())
 
 
@@ -142,7 +172,7 @@ def _load_vcp_from_yaml_file(yaml_file, opts):
     cfg_files.extend(os.getenv('VCP_CONFIG_FILES', '').split(':'))
     cfg_files.append(yaml_file)
     cfg_files.append(qtpyvcp.DEFAULT_CONFIG_FILE)
-    config = load_config_files(*cfg_files)
+    config = load_config_files(*cfg_files, use_cache=not opts.no_config_cache)
     # add the YAML file dir to path so can import relative modules
     sys.path.insert(0, os.path.dirname(os.path.dirname(yaml_file)))
     launch_application(opts, config)
@@ -154,7 +184,7 @@ def _load_vcp_from_ui_file(ui_file, opts):
     cfg_files = [opts.config_file or '']
     cfg_files.extend(os.getenv('VCP_CONFIG_FILES', '').split(':'))
     cfg_files.append(qtpyvcp.DEFAULT_CONFIG_FILE)
-    config = load_config_files(*cfg_files)
+    config = load_config_files(*cfg_files, use_cache=not opts.no_config_cache)
     kwargs = config['windows']['mainwindow'].get('kwargs', {})
     kwargs.update({'ui_file': ui_file})
     config['windows']['mainwindow']['kwargs'] = kwargs
@@ -162,13 +192,7 @@ def _load_vcp_from_ui_file(ui_file, opts):
 
 
 def _load_vcp_from_entry_point(vcp_name, opts):
-    entry_points = {}
-    for entry_point in iter_entry_points(group='qtpyvcp.example_vcp'):
-        entry_points[entry_point.name] = entry_point
-    for entry_point in iter_entry_points(group='qtpyvcp.test_vcp'):
-        entry_points[entry_point.name] = entry_point
-    for entry_point in iter_entry_points(group='qtpyvcp.vcp'):
-        entry_points[entry_point.name] = entry_point
+    entry_points = getVCPEntryPoints()
 
     try:
         vcp = entry_points[vcp_name.lower()].load()
@@ -209,7 +233,11 @@ def _initialize_object_from_dict(object_dict, parent=None):
 
 
 def loadPlugins(plugins):
-    for plugin_id, plugin_dict in plugins.items():
+    dependencies = {plugin_id: plugin_dict.get('depends') or []
+                    for plugin_id, plugin_dict in plugins.items()}
+
+    for plugin_id in sortByDependencies(plugins.keys(), dependencies):
+        plugin_dict = plugins[plugin_id]
 
         try:
             cls = plugin_dict['provider']
@@ -219,13 +247,15 @@ def loadPlugins(plugins):
         args = plugin_dict.get('args', [])
         kwargs = plugin_dict.get('kwargs', {})
 
-        registerPluginFromClass(plugin_id=plugin_id, plugin_cls=cls, args=args, kwargs=kwargs)
+        registerPluginFromClass(plugin_id=plugin_id, plugin_cls=cls, args=args,
+                                kwargs=kwargs, depends=dependencies[plugin_id])
 
 
 def loadWindows(windows):
     for window_id, window_dict in windows.items():
 
-        window = _initialize_object_from_dict(window_dict)
+        with profiler.profile("window '{}'".format(window_id), 'window'):
+            window = _initialize_object_from_dict(window_dict)
         qtpyvcp.WINDOWS[window_id] = window
 
         if window_id == 'mainwindow':
@@ -239,5 +269,6 @@ def loadWindows(windows):
 def loadDialogs(dialogs):
     for dialogs_id, dialogs_dict in dialogs.items():
 
-        inst = _initialize_object_from_dict(dialogs_dict)
+        with profiler.profile("dialog '{}'".format(dialogs_id), 'dialog'):
+            inst = _initialize_object_from_dict(dialogs_dict)
         qtpyvcp.DIALOGS[dialogs_id] = inst
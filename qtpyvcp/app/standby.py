@@ -0,0 +1,288 @@
+"""Warm Standby
+
+Supervised launcher mode which keeps a warm QtPyVCP process ready, so that
+after a LinuxCNC restart or a VCP crash the VCP is up again without waiting
+for the Python imports and the config load.
+
+The supervisor process imports the heavy modules and loads the config once,
+then forks a standby process which waits for LinuxCNC to be running (i.e.
+for ``/tmp/linuxcnc.lock`` to appear and the status buffer to be valid)
+before launching the application. When the application exits a new standby
+process is forked straight away. If it was closed normally the standby
+process waits for the next LinuxCNC session. If it crashed it is relaunched
+after a delay, which doubles after each consecutive failure, and after
+``MAX_FAILURES`` consecutive failures it is not relaunched until the next
+LinuxCNC session. The ``qtpyvcp`` HAL component of a crashed application
+is unloaded before relaunching, if it can't be the application is not
+relaunched until the next LinuxCNC session either.
+
+The main window geometry and state are saved on exit and restored when
+the application is relaunched, and the program model's preview cache (see
+:py:mod:`qtpyvcp.plugins.program_model`) means the preview of the last
+loaded program does not need to be regenerated.
+
+Standby mode is enabled with the ``--standby`` command line option. As
+LinuxCNC does not launch the VCP in this mode the supervisor should be
+started on login, e.g.::
+
+    qtpyvcp --ini ~/linuxcnc/configs/sim/xyz.ini mini --standby
+"""
+
+import os
+import sys
+import time
+import json
+import base64
+import signal
+import hashlib
+import importlib
+import subprocess
+
+from qtpyvcp.utilities.logger import getLogger
+from qtpyvcp.utilities.misc import cacheDir
+
+LOG = getLogger(__name__)
+
+LOCK_FILE = '/tmp/linuxcnc.lock'
+
+# interval for polling whether LinuxCNC is running, in seconds
+POLL_INTERVAL = 0.1
+
+# delay before relaunching a failed application, doubled after each
+# consecutive failure up to MAX_RELAUNCH_DELAY, in seconds
+RELAUNCH_DELAY = 1.0
+MAX_RELAUNCH_DELAY = 30.0
+
+# consecutive failures after which to wait for the next LinuxCNC session
+MAX_FAILURES = 5
+
+# an application which ran for this long before failing is relaunched
+# without counting the earlier failures, in seconds
+STABLE_RUN_TIME = 60.0
+
+HAL_COMPONENT = 'qtpyvcp'
+
+# third party modules to import in the supervisor, so the standby processes
+# inherit them. QtPyVCP modules can't be pre-imported as many of them
+# look up the plugins at import time.
+PRELOAD_MODULES = (
+    'qtpy.QtCore',
+    'qtpy.QtGui',
+    'qtpy.QtWidgets',
+    'qtpy.uic',
+    'linuxcnc',
+    'gcode',
+    'vtk',
+)
+
+
+def supervise(opts, config):
+    """Run the warm standby supervisor. Does not return.
+
+    Args:
+        opts (OptDict) : The command line options.
+        config (dict) : The loaded config.
+    """
+    LOG.info("Starting warm standby supervisor")
+
+    preloadModules()
+
+    failures = 0
+    wait_for_new_session = False
+    while True:
+        started = time.time()
+        pid = os.fork()
+        if pid == 0:
+            _runStandby(opts, config, wait_for_new_session)
+
+        try:
+            pid, status = os.waitpid(pid, 0)
+        except KeyboardInterrupt:
+            LOG.info("Stopping warm standby supervisor")
+            os.kill(pid, signal.SIGTERM)
+            sys.exit()
+
+        if os.WIFSIGNALED(status):
+            LOG.error("Application terminated by signal %i", os.WTERMSIG(status))
+        elif os.WEXITSTATUS(status) != 0:
+            LOG.error("Application exited with status %i", os.WEXITSTATUS(status))
+        else:
+            LOG.info("Application closed, waiting for the next LinuxCNC session")
+            failures = 0
+            wait_for_new_session = True
+            continue
+
+        if time.time() - started >= STABLE_RUN_TIME:
+            failures = 0
+        failures += 1
+        wait_for_new_session = False
+
+        if not unloadStaleComponent():
+            LOG.error("Could not unload the '%s' HAL component of the failed "
+                      "application, waiting for the next LinuxCNC session", HAL_COMPONENT)
+            failures = 0
+            wait_for_new_session = True
+            continue
+
+        if failures >= MAX_FAILURES:
+            LOG.error("Application failed %i times in a row, waiting for the "
+                      "next LinuxCNC session", failures)
+            failures = 0
+            wait_for_new_session = True
+            continue
+
+        delay = min(RELAUNCH_DELAY * 2 ** (failures - 1), MAX_RELAUNCH_DELAY)
+        LOG.info("Relaunching application in %.1f s", delay)
+        try:
+            time.sleep(delay)
+        except KeyboardInterrupt:
+            LOG.info("Stopping warm standby supervisor")
+            sys.exit()
+
+
+def preloadModules(modules=PRELOAD_MODULES):
+    """Import modules so they are inherited by the standby processes.
+
+    Modules which are not available are skipped.
+    """
+    start = time.time()
+    for modname in modules:
+        try:
+            importlib.import_module(modname)
+        except Exception:
+            LOG.debug("Could not preload module: %s", modname)
+
+    LOG.debug("Preloaded modules in %.3f s", time.time() - start)
+
+
+def isLinuxCNCRunning():
+    """Check whether LinuxCNC is running and its status buffer is valid."""
+    if not os.path.isfile(LOCK_FILE):
+        return False
+
+    import linuxcnc
+    try:
+        linuxcnc.stat().poll()
+    except linuxcnc.error:
+        return False
+
+    return True
+
+
+def waitForLinuxCNC(new_session=False):
+    """Block until LinuxCNC is running.
+
+    Args:
+        new_session (bool) : Wait for the current session to end first.
+    """
+    if new_session:
+        while os.path.isfile(LOCK_FILE):
+            time.sleep(POLL_INTERVAL)
+
+    while not isLinuxCNCRunning():
+        time.sleep(POLL_INTERVAL)
+
+
+def unloadStaleComponent(name=HAL_COMPONENT):
+    """Unload the HAL component left behind by a failed application.
+
+    A new application can't create its HAL component while one with the
+    same name exists.
+
+    Returns:
+        bool : Whether there is no such component any more.
+    """
+    if not isLinuxCNCRunning():
+        # HAL is recreated with the next LinuxCNC session
+        return True
+
+    try:
+        import hal
+        component_exists = hal.component_exists
+    except (ImportError, AttributeError):
+        LOG.debug("Can't check for a stale '%s' HAL component", name)
+        return True
+
+    if not component_exists(name):
+        return True
+
+    LOG.warning("Unloading stale '%s' HAL component", name)
+    try:
+        subprocess.call(['halcmd', 'unloadusr', name])
+    except OSError:
+        LOG.exception("Error running halcmd")
+
+    deadline = time.time() + 2
+    while component_exists(name):
+        if time.time() > deadline:
+            return False
+        time.sleep(POLL_INTERVAL)
+
+    return True
+
+
+def windowStateFile():
+    """Path of the file the main window state is saved to.
+
+    The state is saved per INI file.
+    """
+    ini_hash = hashlib.sha1(os.getenv('INI_FILE_NAME', '').encode('utf-8'))
+    return os.path.join(cacheDir('standby'), ini_hash.hexdigest()[:16] + '.json')
+
+
+def saveWindowState(window):
+    """Save the geometry and the toolbar/dock state of a main window."""
+    state = {
+        'geometry': bytes(window.saveGeometry()),
+        'state': bytes(window.saveState()),
+    }
+
+    state_file = windowStateFile()
+    temp_file = '{}.{}.tmp'.format(state_file, os.getpid())
+    try:
+        with open(temp_file, 'w') as fh:
+            json.dump({key: base64.b64encode(value).decode('ascii')
+                       for key, value in state.items()}, fh)
+        os.rename(temp_file, state_file)
+    except Exception:
+        LOG.exception("Error saving window state")
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+
+
+def restoreWindowState(window):
+    """Restore the geometry and the toolbar/dock state of a main window."""
+    from qtpy.QtCore import QByteArray
+
+    try:
+        with open(windowStateFile(), 'r') as fh:
+            state = json.load(fh)
+    except (IOError, OSError, ValueError):
+        return
+
+    window.restoreGeometry(QByteArray(base64.b64decode(state['geometry'])))
+    window.restoreState(QByteArray(base64.b64decode(state['state'])))
+
+
+def _runStandby(opts, config, new_session):
+    # runs in the forked standby process, never returns
+    LOG.info("Standby process %i waiting for LinuxCNC", os.getpid())
+
+    # let the supervisor handle ctrl+c while waiting
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    waitForLinuxCNC(new_session)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    import qtpyvcp
+    from qtpyvcp.app.launcher import setup_application, run_application
+
+    LOG.info("LinuxCNC is running, launching application")
+
+    app = setup_application(opts, config)
+
+    window = qtpyvcp.WINDOWS.get('mainwindow')
+    if window is not None:
+        restoreWindowState(window)
+        app.aboutToQuit.connect(lambda: saveWindowState(window))
+
+    run_application(app)
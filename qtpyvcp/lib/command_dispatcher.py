@@ -0,0 +1,417 @@
+"""
+Command Dispatcher
+------------------
+
+Issues ``linuxcnc.command`` calls on a worker thread, in the order they
+were made, so a slow task controller can never block the GUI.
+
+The dispatcher has the same methods as ``linuxcnc.command``, but each call
+returns straight away with a :py:class:`CommandResult`, which can be waited
+on if the caller needs to know the outcome. Passing ``wait=True`` waits
+for LinuxCNC to complete the command on the worker thread, with an
+optional ``timeout`` in seconds.
+
+E-stop, abort, jog stop, pause and feed hold commands are urgent, so they
+are not queued behind other commands but sent as soon as any command which
+is being sent has been sent, and any queued commands they would be undone
+by are cancelled.
+
+Continuous values, such as overrides set from a slider, can be sent with
+``coalesce=True``. These are sent at most ``max_rate`` times per second
+per command, superseded values which have not been sent yet are dropped,
+and the last value is always sent.
+
+The time from dispatch to completion of each command is recorded in a
+latency histogram per command.
+
+Example:
+
+    Issuing commands::
+
+        from qtpyvcp.lib.command_dispatcher import getCommandDispatcher
+        CMD = getCommandDispatcher()
+
+        CMD.mode(linuxcnc.MODE_MDI)  # returns immediately
+
+        result = CMD.program_open(fname, wait=True, timeout=10)
+        ...
+        if result.wait():
+            # the program has been opened
+
+        CMD.feedrate(value / 100.0, coalesce=True)
+"""
+
+import time
+import atexit
+import threading
+from collections import deque
+
+import linuxcnc
+
+from qtpyvcp.utilities.logger import getLogger
+
+LOG = getLogger(__name__)
+
+# upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05,
+                   0.1, 0.2, 0.5, 1.0, 2.0, 5.0, float('inf'))
+
+_DISPATCHER = None
+
+
+def getCommandDispatcher():
+    """Get the shared command dispatcher, creating it if needed."""
+    global _DISPATCHER
+    if _DISPATCHER is None:
+        _DISPATCHER = CommandDispatcher()
+        atexit.register(_DISPATCHER.flush)
+    return _DISPATCHER
+
+
+class CommandResult(object):
+    """The result of a dispatched command.
+
+    Attributes:
+        name (str) : The name of the command method, e.g. ``mode``.
+        args (tuple) : The command arguments.
+        result : The value returned by the command, or by ``wait_complete``
+            if the command was waited on, e.g. ``linuxcnc.RCS_DONE``, or
+            -1 if it timed out.
+        error (Exception) : The error raised by the command, if any.
+        latency (float) : The time from dispatch to completion in seconds.
+    """
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.result = None
+        self.error = None
+        self.latency = None
+        self.cancelled = False
+
+        self._sent = False
+        self._value = None
+
+        self._dispatch_time = time.time()
+        self._done = threading.Event()
+
+    def __repr__(self):
+        return "<CommandResult {}{}>".format(self.name, self.args)
+
+    def done(self):
+        """Whether the command has been issued or cancelled."""
+        return self._done.is_set()
+
+    def ok(self):
+        """Whether the command was issued without error, and if it was
+        waited on, completed successfully."""
+        return self.done() and not self.cancelled and self.error is None \
+            and self.result not in (-1, linuxcnc.RCS_ERROR)
+
+    def wait(self, timeout=None):
+        """Wait for the command to be issued.
+
+        Args:
+            timeout (float) : Max time to wait in seconds, or None to
+                wait indefinitely.
+
+        Returns:
+            bool : Whether the command succeeded, see :py:meth:`ok`.
+        """
+        self._done.wait(timeout)
+        return self.ok()
+
+    def _finish(self, result=None, error=None, cancelled=False):
+        self.result = result
+        self.error = error
+        self.cancelled = cancelled
+        self.latency = time.time() - self._dispatch_time
+        self._done.set()
+
+
+class CommandDispatcher(object):
+    """Serializes ``linuxcnc.command`` calls on a worker thread.
+
+    Args:
+        default_timeout (float) : Timeout for ``wait=True`` in seconds.
+        max_rate (float) : Max number of coalesced commands to send per
+            second, per command.
+    """
+    def __init__(self, default_timeout=5.0, max_rate=20):
+        self.default_timeout = default_timeout
+        self.max_rate = max_rate
+
+        self._queue = deque()  # (CommandResult, wait, timeout)
+
+        # coalesced commands waiting to be sent, keyed by the command
+        # name and the arguments after the value
+        self._pending = {}  # key: (due time, CommandResult, wait, timeout)
+        self._last_sent = {}  # key: time last sent
+        self._condition = threading.Condition()
+        self._running = False
+        self._inflight = None  # the CommandResult the worker is executing
+        self._urgent_count = 0  # urgent commands waiting to be sent
+        self._worker = None
+
+        # held while a command is sent, so urgent commands are never
+        # overtaken by a command the worker is already sending
+        self._send_lock = threading.RLock()
+
+        # urgent commands are sent from the calling thread
+        self._urgent_cmd = None
+        self._urgent_lock = threading.Lock()
+
+        self._histogram_lock = threading.Lock()
+        self._histograms = {}  # command name: counts per bucket
+
+    def __getattr__(self, name):
+        if name.startswith('_') or not callable(getattr(linuxcnc.command, name, None)):
+            raise AttributeError(name)
+
+        def dispatchCommand(*args, **kwargs):
+            return self.dispatch(name, *args, **kwargs)
+
+        dispatchCommand.__name__ = name
+        return dispatchCommand
+
+    def dispatch(self, name, *args, **kwargs):
+        """Dispatch a ``linuxcnc.command`` call.
+
+        Args:
+            name (str) : The command method, e.g. ``mode``.
+            *args : The command arguments.
+            wait (bool) : Whether to wait for LinuxCNC to complete the command.
+            timeout (float) : Max time to wait for completion in seconds.
+            coalesce (bool) : Whether the first argument is a continuous
+                value, which may be superseded by later calls before
+                it is sent. Superseded commands are cancelled.
+
+        Returns:
+            CommandResult : The result, which can be waited on.
+        """
+        wait = kwargs.pop('wait', False)
+        timeout = kwargs.pop('timeout', self.default_timeout)
+        coalesce = kwargs.pop('coalesce', False)
+        if kwargs:
+            raise TypeError("Unexpected keyword arguments: {}".format(', '.join(kwargs)))
+
+        result = CommandResult(name, args)
+
+        if self._isUrgent(name, args):
+            self._runUrgent(result, wait, timeout)
+            return result
+
+        key = (name,) + args[1:]
+
+        with self._condition:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run,
+                                                name='command-dispatcher')
+                self._worker.daemon = True
+                self._worker.start()
+
+            pending = self._pending.pop(key, None)
+            if pending is not None:
+                # superseded by this command
+                pending[1]._finish(cancelled=True)
+
+            if coalesce:
+                if pending is not None:
+                    due = pending[0]
+                else:
+                    due = self._last_sent.get(key, 0) + 1.0 / self.max_rate
+                self._pending[key] = (due, result, wait, timeout)
+            else:
+                self._queue.append((result, wait, timeout))
+
+            self._condition.notify_all()
+
+        return result
+
+    def flush(self, timeout=1.0):
+        """Wait for the queued commands to be issued.
+
+        Returns:
+            bool : Whether the queue was emptied within the timeout.
+        """
+        deadline = time.time() + timeout
+        with self._condition:
+            while self._queue or self._pending or self._running:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def latencyHistogram(self, name=None):
+        """Get the latency histogram of the commands.
+
+        Args:
+            name (str) : The command name, or None for all commands.
+
+        Returns:
+            dict : Lists of ``(upper bound in seconds, count)`` tuples, keyed
+                by command name, or just the list if ``name`` was given.
+        """
+        with self._histogram_lock:
+            histograms = {cmd_name: list(zip(LATENCY_BUCKETS, counts))
+                          for cmd_name, counts in self._histograms.items()}
+
+        if name is not None:
+            return histograms.get(name, list(zip(LATENCY_BUCKETS, [0] * len(LATENCY_BUCKETS))))
+        return histograms
+
+    def _isUrgent(self, name, args):
+        if name in ('abort', 'set_feed_hold'):
+            return True
+        if name == 'state':
+            return args[:1] == (linuxcnc.STATE_ESTOP,)
+        if name == 'jog':
+            return args[:1] == (linuxcnc.JOG_STOP,)
+        if name == 'auto':
+            return args[:1] == (linuxcnc.AUTO_PAUSE,)
+        return False
+
+    def _runUrgent(self, result, wait, timeout):
+        # cancel the queued commands which would undo this one
+        if result.name == 'jog':
+            # only jogs of the same joint or axis
+            cancel = lambda queued: queued.name == 'jog' and \
+                queued.args[1:3] == result.args[1:3]
+        elif result.name == 'set_feed_hold':
+            cancel = lambda queued: queued.name == 'set_feed_hold'
+        elif result.name == 'auto':
+            # commands which would resume the program
+            cancel = lambda queued: queued.name == 'auto' and queued.args[:1] in \
+                ((linuxcnc.AUTO_RESUME,), (linuxcnc.AUTO_RUN,), (linuxcnc.AUTO_STEP,))
+        else:
+            cancel = lambda queued: True
+
+        # stop the worker taking more commands until this one is sent
+        with self._condition:
+            self._urgent_count += 1
+
+        try:
+            self._sendUrgent(result, wait, timeout, cancel)
+        finally:
+            with self._condition:
+                self._urgent_count -= 1
+                self._condition.notify_all()
+
+    def _sendUrgent(self, result, wait, timeout, cancel):
+        with self._urgent_lock:
+            # wait for the command the worker is sending, if any, to be sent
+            with self._send_lock:
+                with self._condition:
+                    for key, pending in list(self._pending.items()):
+                        if cancel(pending[1]):
+                            pending[1]._finish(cancelled=True)
+                            del self._pending[key]
+
+                    keep = deque()
+                    for item in self._queue:
+                        if cancel(item[0]):
+                            item[0]._finish(cancelled=True)
+                        else:
+                            keep.append(item)
+                    self._queue = keep
+
+                    # the worker has taken this one but not sent it yet
+                    inflight = self._inflight
+                    if inflight is not None and not inflight._sent \
+                            and not inflight.done() and cancel(inflight):
+                        inflight._finish(cancelled=True)
+
+                    self._condition.notify_all()
+
+                if self._urgent_cmd is None:
+                    self._urgent_cmd = linuxcnc.command()
+                sent = self._send(self._urgent_cmd, result)
+
+            if sent:
+                self._complete(self._urgent_cmd, result, wait, timeout)
+
+    def _run(self):
+        # runs on the worker thread, with its own command channel
+        cmd = linuxcnc.command()
+
+        while True:
+            with self._condition:
+                result, wait, timeout = self._next()
+                self._running = True
+                self._inflight = result
+
+            if self._send(cmd, result):
+                self._complete(cmd, result, wait, timeout)
+
+            with self._condition:
+                self._running = False
+                self._inflight = None
+                self._condition.notify_all()
+
+    def _next(self):
+        # wait for the next command to send, must be called with the
+        # condition held
+        while True:
+            if self._urgent_count:
+                self._condition.wait()
+                continue
+
+            if self._queue:
+                return self._queue.popleft()
+
+            if self._pending:
+                now = time.time()
+                key, (due, result, wait, timeout) = min(self._pending.items(),
+                                                        key=lambda item: item[1][0])
+                if due <= now:
+                    del self._pending[key]
+                    self._last_sent[key] = now
+                    return result, wait, timeout
+
+                self._condition.wait(due - now)
+            else:
+                self._condition.wait()
+
+    def _send(self, cmd, result):
+        # returns whether the command was sent, it is finished if not
+        with self._send_lock:
+            if result.done():
+                # cancelled by an urgent command before it was sent
+                return False
+
+            try:
+                result._value = getattr(cmd, result.name)(*result.args)
+            except Exception as e:
+                LOG.exception("Error issuing command: %s%s", result.name, result.args)
+                result._finish(error=e)
+                self._recordLatency(result.name, result.latency)
+                return False
+
+            result._sent = True
+            return True
+
+    def _complete(self, cmd, result, wait, timeout):
+        # waits for the sent command to complete, if needed, without
+        # holding the send lock
+        value = result._value
+        try:
+            if wait:
+                value = cmd.wait_complete(timeout)
+                if value == -1:
+                    LOG.warning("Timed out waiting for command to complete: %s%s",
+                                result.name, result.args)
+        except Exception as e:
+            LOG.exception("Error issuing command: %s%s", result.name, result.args)
+            result._finish(error=e)
+        else:
+            result._finish(value)
+
+        self._recordLatency(result.name, result.latency)
+
+    def _recordLatency(self, name, latency):
+        with self._histogram_lock:
+            counts = self._histograms.setdefault(name, [0] * len(LATENCY_BUCKETS))
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if latency <= bound:
+                    counts[index] += 1
+                    break
@@ -0,0 +1,193 @@
+"""
+G-code Search
+-------------
+
+Search and replace engine for large G-code programs.
+
+Programs are searched and replaced on a worker thread, in chunks of whole
+lines, and the matches of each chunk are streamed back to the GUI thread as
+soon as they are found, so even very large files can be searched without
+freezing the UI.
+"""
+
+import re
+import threading
+
+from qtpy.QtCore import QObject, Signal
+
+from qtpyvcp.utilities.logger import getLogger
+
+LOG = getLogger(__name__)
+
+
+def compilePattern(text, regex=False, case_sensitive=True, whole_word=False,
+                   encoding='utf-8'):
+    """Compile a search pattern for searching encoded document bytes.
+
+    Args:
+        text (str) : The text or regular expression to search for.
+        regex (bool) : Whether ``text`` is a regular expression.
+        case_sensitive (bool) : Whether the search is case sensitive.
+        whole_word (bool) : Whether to only match whole words.
+        encoding (str) : The encoding of the document being searched.
+
+    Returns:
+        A compiled regular expression.
+    """
+    if not isinstance(text, bytes):
+        text = text.encode(encoding)
+
+    if not regex:
+        text = re.escape(text)
+
+    if whole_word:
+        text = br'\b' + text + br'\b'
+
+    return re.compile(text, 0 if case_sensitive else re.IGNORECASE)
+
+
+class GcodeSearch(QObject):
+    """Threaded G-code search and replace engine.
+
+    Signals:
+        matchesFound (list) : Emitted for each chunk with matches, as a list
+            of ``(start, end)`` byte positions.
+        searchFinished (int) : Emitted with the total number of matches when
+            a search completes.
+        replaceFinished (bytes, int) : Emitted with the new document data and
+            the number of replacements when a replace all completes.
+    """
+
+    matchesFound = Signal(object)
+    searchFinished = Signal(int)
+    replaceFinished = Signal(object, int)
+
+    # emitted from the worker thread, tagged with the run generation
+    _matchesFound = Signal(int, object)
+    _searchFinished = Signal(int, int)
+    _replaceFinished = Signal(int, object, int)
+
+    # approximate number of bytes to search per chunk
+    CHUNK_SIZE = 1 << 20
+
+    def __init__(self, parent=None):
+        super(GcodeSearch, self).__init__(parent)
+
+        self._thread = None
+        self._cancel_event = threading.Event()
+
+        # incremented for each run and on cancel, results from the worker
+        # thread are only passed on if they are from the current run
+        self._generation = 0
+
+        self._matchesFound.connect(self._onMatchesFound)
+        self._searchFinished.connect(self._onSearchFinished)
+        self._replaceFinished.connect(self._onReplaceFinished)
+
+    def isRunning(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def search(self, data, pattern):
+        """Search for all occurrences of a pattern.
+
+        Args:
+            data (bytes) : The document data to search.
+            pattern : A compiled regex, as returned by :py:func:`compilePattern`.
+        """
+        self._start(self._search, data, pattern)
+
+    def replaceAll(self, data, pattern, repl, literal=True):
+        """Replace all occurrences of a pattern.
+
+        Args:
+            data (bytes) : The document data.
+            pattern : A compiled regex, as returned by :py:func:`compilePattern`.
+            repl (bytes) : The replacement.
+            literal (bool) : Whether ``repl`` should be used as is, or if it
+                may contain group references.
+        """
+        self._start(self._replaceAll, data, pattern, repl, literal)
+
+    def cancel(self):
+        """Cancel the running search, if any.
+
+        Does not wait for the worker thread, it stops at the end of the
+        current chunk, and any results it has already sent are dropped.
+        """
+        self._cancel_event.set()
+        self._generation += 1
+        self._thread = None
+
+    def _start(self, target, *args):
+        self.cancel()
+
+        # each run gets its own event, so a stale thread can't be un-cancelled
+        self._cancel_event = threading.Event()
+
+        self._thread = threading.Thread(target=target,
+                                        args=(self._cancel_event, self._generation) + args)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _onMatchesFound(self, generation, matches):
+        if generation == self._generation:
+            self.matchesFound.emit(matches)
+
+    def _onSearchFinished(self, generation, count):
+        if generation == self._generation:
+            self.searchFinished.emit(count)
+
+    def _onReplaceFinished(self, generation, data, count):
+        if generation == self._generation:
+            self.replaceFinished.emit(data, count)
+
+    def _chunks(self, data):
+        # yields the (start, end) positions of chunks of whole lines
+        start = 0
+        length = len(data)
+
+        while start < length:
+            # end each chunk on a line boundary
+            end = data.find(b'\n', start + self.CHUNK_SIZE)
+            end = length if end == -1 else end + 1
+            yield start, end
+            start = end
+
+    def _search(self, cancel_event, generation, data, pattern):
+        count = 0
+
+        for start, end in self._chunks(data):
+            matches = [match.span() for match in pattern.finditer(data, start, end)]
+
+            if cancel_event.is_set():
+                return
+
+            if matches:
+                count += len(matches)
+                self._matchesFound.emit(generation, matches)
+
+        LOG.debug("Found %i matches for '%s'", count, pattern.pattern)
+        self._searchFinished.emit(generation, count)
+
+    def _replaceAll(self, cancel_event, generation, data, pattern, repl, literal):
+        # replace chunk by chunk, rather than with a single subn call which
+        # would hold the GIL, and so block the GUI, for the whole document
+        parts = []
+        count = 0
+        last = 0
+
+        for start, end in self._chunks(data):
+            for match in pattern.finditer(data, start, end):
+                parts.append(data[last:match.start()])
+                parts.append(repl if literal else match.expand(repl))
+                last = match.end()
+                count += 1
+
+            if cancel_event.is_set():
+                return
+
+        parts.append(data[last:])
+        new_data = b''.join(parts)
+
+        LOG.debug("Replaced %i matches for '%s'", count, pattern.pattern)
+        self._replaceFinished.emit(generation, new_data, count)
@@ -0,0 +1,92 @@
+"""
+Lazy Module
+-----------
+
+Allows a package to export names, typically widget classes, without
+importing the modules that define them until they are first accessed.
+
+This is used for widgets that depend on heavy optional libraries (VTK,
+OpenGL, QtMultimedia etc.), so that importing a widget package does not
+pull in those libraries for VCPs that don't use them. The time taken by
+each deferred import is logged, and recorded by the startup profiler.
+
+Example:
+
+    In the package's ``__init__.py``::
+
+        from qtpyvcp.lib.lazy_module import lazyModule
+
+        lazyModule(__name__, {
+            'VTKBackPlot': 'qtpyvcp.widgets.display_widgets.vtk_backplot.vtk_backplot',
+        })
+"""
+
+import sys
+import time
+import importlib
+
+from qtpyvcp.utilities import profiler
+from qtpyvcp.utilities.logger import getLogger
+
+LOG = getLogger(__name__)
+
+# can't import from `types`, that would be qtpyvcp.lib.types on python 2
+ModuleType = type(sys)
+
+
+class LazyModule(ModuleType):
+    """Module that imports some of its attributes on first access.
+
+    Args:
+        module (module) : The module to wrap.
+        lazy_attrs (dict) : Map of attribute names to the names of the
+            modules to import them from.
+    """
+    def __init__(self, module, lazy_attrs):
+        super(LazyModule, self).__init__(module.__name__, module.__doc__)
+        self.__dict__.update(module.__dict__)
+
+        # keep a reference to the original module, otherwise python 2
+        # clears its globals when it is garbage collected
+        self.__dict__['_lazy_module'] = module
+        self.__dict__['_lazy_attrs'] = dict(lazy_attrs)
+
+    def __getattr__(self, name):
+        try:
+            modname = self._lazy_attrs[name]
+        except KeyError:
+            raise AttributeError("module '{}' has no attribute '{}'"
+                                 .format(self.__name__, name))
+
+        start = time.time()
+        with profiler.profile('lazy import {}'.format(modname), 'import'):
+            value = getattr(importlib.import_module(modname), name)
+
+        LOG.debug("Lazy imported %s from %s in %.3f s",
+                  name, modname, time.time() - start)
+
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(self.__dict__) | set(self._lazy_attrs))
+
+
+def lazyModule(module_name, lazy_attrs):
+    """Replace a module in ``sys.modules`` with a :class:`LazyModule`.
+
+    Should be called from the module itself, usually a package's
+    ``__init__.py``, after any eager imports.
+
+    Args:
+        module_name (str) : The name of the module, i.e. ``__name__``.
+        lazy_attrs (dict) : Map of attribute names to the names of the
+            modules to import them from on first access.
+
+    Returns:
+        LazyModule : The replacement module.
+    """
+    module = sys.modules[module_name]
+    lazy = LazyModule(module, lazy_attrs)
+    sys.modules[module_name] = lazy
+    return lazy
@@ -0,0 +1,209 @@
+"""
+Notification Store
+------------------
+
+Bounded store for the notification history, with a retention policy by
+count and by age, and indices by message type and time so the history can
+be queried without scanning every message.
+
+Messages are dicts with at least the ``timestamp`` and ``message_type``
+keys, and are kept in time order.
+"""
+
+import csv
+import json
+import time
+from bisect import bisect_left, bisect_right
+
+# columns written by exportCSV, other keys are ignored
+CSV_FIELDS = ('timestamp', 'message_type', 'message_text', 'operator_id',
+              'loaded_file', 'task_mode', 'task_state', 'interp_mode')
+
+
+class NotificationStore(object):
+    """Bounded, time ordered store of notification messages.
+
+    Args:
+        max_count (int) : Max number of messages to keep, or None for no limit.
+        max_age (float) : Max age of the messages to keep in seconds, or
+            None for no limit.
+    """
+    def __init__(self, max_count=1000, max_age=None):
+        self.max_count = max_count
+        self.max_age = max_age
+
+        self._messages = []
+        self._timestamps = []
+        self._by_type = {}  # message_type: (messages, timestamps)
+
+    def __len__(self):
+        return len(self._messages)
+
+    def __iter__(self):
+        return iter(self._messages)
+
+    def add(self, message):
+        """Add a message, dropping the oldest messages if over the limits.
+
+        Args:
+            message (dict) : The message, ``timestamp`` defaults to now.
+        """
+        message.setdefault('timestamp', time.time())
+        timestamp = message['timestamp']
+
+        if self._timestamps and timestamp < self._timestamps[-1]:
+            # out of order, e.g. merging histories
+            self.load(self._messages + [message])
+            return
+
+        self._messages.append(message)
+        self._timestamps.append(timestamp)
+
+        messages, timestamps = self._by_type.setdefault(message.get('message_type'), ([], []))
+        messages.append(message)
+        timestamps.append(timestamp)
+
+        self.prune()
+
+    def load(self, messages):
+        """Replace the contents of the store, applying the retention policy.
+
+        Args:
+            messages (list) : The messages to load, in any order.
+        """
+        self._messages = sorted(messages, key=lambda msg: msg.get('timestamp', 0))
+        self._timestamps = [msg.get('timestamp', 0) for msg in self._messages]
+
+        self._by_type = {}
+        for message, timestamp in zip(self._messages, self._timestamps):
+            messages, timestamps = self._by_type.setdefault(message.get('message_type'), ([], []))
+            messages.append(message)
+            timestamps.append(timestamp)
+
+        self.prune()
+
+    def clear(self):
+        """Remove all the messages."""
+        self.load([])
+
+    def prune(self, now=None):
+        """Drop the messages which are over the count or age limits.
+
+        Messages are dropped in batches, so the store may briefly hold up
+        to 10% more than ``max_count`` messages.
+        """
+        count = 0
+        if self.max_count is not None and len(self._messages) > self.max_count * 1.1:
+            count = len(self._messages) - self.max_count
+
+        if self.max_age is not None:
+            now = time.time() if now is None else now
+            count = max(count, bisect_left(self._timestamps, now - self.max_age))
+
+        if count:
+            self._drop(count)
+
+    def messages(self, message_type=None, since=None, until=None):
+        """Get the messages, optionally filtered by type and time.
+
+        Args:
+            message_type (str) : Only messages of this type, e.g. ``error``.
+            since (float) : Only messages at or after this time.
+            until (float) : Only messages before this time.
+
+        Returns:
+            list : The messages, oldest first.
+        """
+        if message_type is None:
+            messages, timestamps = self._messages, self._timestamps
+        else:
+            messages, timestamps = self._by_type.get(message_type, ([], []))
+
+        start = 0 if since is None else bisect_left(timestamps, since)
+        end = len(timestamps) if until is None else bisect_left(timestamps, until)
+        return messages[start:end]
+
+    def latest(self, count, message_type=None, until=None):
+        """Get the most recent messages.
+
+        Args:
+            count (int) : Max number of messages to return.
+            message_type (str) : Only messages of this type.
+            until (float) : Only messages before this time.
+
+        Returns:
+            list : The messages, oldest first.
+        """
+        if message_type is None:
+            messages, timestamps = self._messages, self._timestamps
+        else:
+            messages, timestamps = self._by_type.get(message_type, ([], []))
+
+        end = len(timestamps) if until is None else bisect_right(timestamps, until)
+        return messages[max(0, end - count):end]
+
+    def countByType(self):
+        """Get the number of messages of each type.
+
+        Returns:
+            dict : The counts keyed by message type.
+        """
+        return {message_type: len(messages)
+                for message_type, (messages, timestamps) in self._by_type.items()}
+
+    def toList(self):
+        """Get a list of the messages for serialization."""
+        return list(self._messages)
+
+    def exportJSONL(self, fh, **filters):
+        """Write the messages to a file as JSON lines, one message per line.
+
+        Args:
+            fh (file) : The text file to write to.
+            **filters : Filters as for :py:meth:`messages`.
+
+        Returns:
+            int : The number of messages written.
+        """
+        count = 0
+        for message in self.messages(**filters):
+            fh.write(json.dumps(message, sort_keys=True))
+            fh.write('\n')
+            count += 1
+        return count
+
+    def exportCSV(self, fh, **filters):
+        """Write the messages to a file as CSV, with a header row.
+
+        Args:
+            fh (file) : The text file to write to.
+            **filters : Filters as for :py:meth:`messages`.
+
+        Returns:
+            int : The number of messages written.
+        """
+        writer = csv.DictWriter(fh, CSV_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+
+        count = 0
+        for message in self.messages(**filters):
+            writer.writerow(message)
+            count += 1
+        return count
+
+    def _drop(self, count):
+        # drop the oldest messages, which are also the oldest of their type
+        dropped = {}
+        for message in self._messages[:count]:
+            message_type = message.get('message_type')
+            dropped[message_type] = dropped.get(message_type, 0) + 1
+
+        del self._messages[:count]
+        del self._timestamps[:count]
+
+        for message_type, type_count in dropped.items():
+            messages, timestamps = self._by_type[message_type]
+            del messages[:type_count]
+            del timestamps[:type_count]
+            if not messages:
+                del self._by_type[message_type]
@@ -0,0 +1,122 @@
+"""
+Ring Buffer
+-----------
+
+Fixed size circular buffer of numeric samples, backed by a preallocated
+numpy array.
+
+Each sample is a row of one or more columns, e.g. a timestamp and the
+values of several HAL pins. Samples are written twice, at the write index
+and one capacity further on, so the most recent samples are always a
+contiguous slice of the array. This makes appending O(1) and lets the
+samples be read as a numpy view, without copying the buffer.
+"""
+
+import numpy as np
+
+
+class RingBuffer(object):
+    """Fixed size circular buffer of rows of samples.
+
+    Args:
+        capacity (int) : Max number of samples to keep.
+        columns (int) : Number of values in each sample.
+        dtype : The numpy data type of the values.
+    """
+    def __init__(self, capacity, columns=1, dtype=float):
+        self.capacity = max(1, int(capacity))
+        self.columns = columns
+
+        self._data = np.zeros((2 * self.capacity, columns), dtype=dtype)
+        self._index = 0  # where the next sample is written
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def clear(self):
+        """Remove all the samples."""
+        self._index = 0
+        self._count = 0
+
+    def append(self, sample):
+        """Add a sample, dropping the oldest sample if full.
+
+        Args:
+            sample (sequence) : The values, one per column.
+        """
+        index = self._index
+        self._data[index] = sample
+        self._data[index + self.capacity] = sample
+
+        self._index = (index + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def extend(self, samples):
+        """Add several samples at once, dropping the oldest samples if full.
+
+        Args:
+            samples (array) : The samples, one row per sample.
+        """
+        samples = np.asarray(samples, dtype=self._data.dtype).reshape(-1, self.columns)
+        samples = samples[-self.capacity:]
+        count = len(samples)
+        if not count:
+            return
+
+        positions = (self._index + np.arange(count)) % self.capacity
+        self._data[positions] = samples
+        self._data[positions + self.capacity] = samples
+
+        self._index = (self._index + count) % self.capacity
+        self._count = min(self._count + count, self.capacity)
+
+    def view(self, count=None):
+        """Get the most recent samples, oldest first.
+
+        The result is a view of the buffer, so it is only valid until
+        more samples are added, copy it if it needs to be kept.
+
+        Args:
+            count (int) : Max number of samples to get, defaults to all.
+
+        Returns:
+            numpy.ndarray : The samples, one row per sample.
+        """
+        if count is None or count > self._count:
+            count = self._count
+
+        end = self._index + self.capacity
+        return self._data[end - count:end]
+
+    def decimated(self, max_points, count=None):
+        """Get the most recent samples, reduced to about ``max_points``.
+
+        The samples are split into buckets and the min and max of each
+        bucket are kept, so short peaks still show up when plotting long
+        time windows. The first column is taken to be the time, and the
+        time of the first sample in each bucket is used.
+
+        Args:
+            max_points (int) : Max number of points to return.
+            count (int) : Max number of samples to use, defaults to all.
+
+        Returns:
+            numpy.ndarray : The points, one row per point.
+        """
+        samples = self.view(count)
+
+        step = 2 * len(samples) // max(max_points, 2)
+        if step < 2:
+            return samples
+
+        # drop the oldest samples which don't fill a bucket
+        samples = samples[len(samples) % step:]
+        buckets = samples.reshape(-1, step, self.columns)
+
+        points = np.empty((2 * len(buckets), self.columns), dtype=samples.dtype)
+        points[0::2] = buckets.min(axis=1)
+        points[1::2] = buckets.max(axis=1)
+        points[0::2, 0] = buckets[:, 0, 0]
+        points[1::2, 0] = buckets[:, step // 2, 0]
+        return points
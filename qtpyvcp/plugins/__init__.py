@@ -5,25 +5,38 @@ QtPyVCP Plugins
 These package level functions provide methods for registering and initializing
 plugins, as well as retrieving them for use and terminating them in the proper
 order.
+
+Plugins can declare the plugins they depend on, in which case they are
+initialised after, and terminated before, those plugins. The blocking I/O
+of independent plugins is done concurrently on worker threads, see
+:py:meth:`.Plugin.preInitialise`.
 """
 import importlib
+import threading
 
 from collections import OrderedDict
 
+from qtpyvcp.utilities import profiler
 from qtpyvcp.utilities.logger import getLogger
 from qtpyvcp.plugins.base_plugins import Plugin, DataPlugin, DataChannel
 
 LOG = getLogger(__name__)
 
 _PLUGINS = OrderedDict()  # Ordered dict so we can initialize/terminate in order
+_DEPENDENCIES = {}
+_PRE_INITIALISED = {}  # plugin_id: threading.Event set once pre-initialised
+
+# max number of plugins to pre-initialise concurrently
+MAX_PRE_INITIALISE_THREADS = 4
 
 
-def registerPlugin(plugin_id, plugin_inst):
+def registerPlugin(plugin_id, plugin_inst, depends=None):
     """Register a Plugin instance.
 
     Args:
         plugin_id (str) : The unique name to register the plugin under.
         plugin_inst(plugin_inst) : The plugin instance to register.
+        depends (list) : IDs of the plugins this plugin depends on.
     """
 
     if plugin_id in _PLUGINS:
@@ -31,9 +44,10 @@ def registerPlugin(plugin_id, plugin_inst):
                     .format(_PLUGINS[plugin_id].__class__, plugin_inst.__class__, plugin_id))
 
     _PLUGINS[plugin_id] = plugin_inst
+    _DEPENDENCIES[plugin_id] = list(depends or [])
 
 
-def registerPluginFromClass(plugin_id, plugin_cls, args=[], kwargs={}):
+def registerPluginFromClass(plugin_id, plugin_cls, args=[], kwargs={}, depends=None):
     """Register a plugin from a class.
 
     This is primarily used for registering plugins defined in the YAML config.
@@ -43,6 +57,8 @@ def registerPluginFromClass(plugin_id, plugin_cls, args=[], kwargs={}):
         data_plugins:
           my_plugin:
             provider: my_package.my_module:MyPluginClass
+            depends:
+              - status
             args:
               - 10
               - False
@@ -57,6 +73,7 @@ def registerPluginFromClass(plugin_id, plugin_cls, args=[], kwargs={}):
             the location of an importable :py:class:`.Plugin` subclass.
         args (list) : Arguments to pass to the plugin's __init__ method.
         kwargs (dict) : Keyword argument to pass to the plugin's __init__ method.
+        depends (list) : IDs of the plugins this plugin depends on.
 
     Returns:
         The plugin instance
@@ -76,8 +93,9 @@ def registerPluginFromClass(plugin_id, plugin_cls, args=[], kwargs={}):
     assert issubclass(plugin_cls, Plugin), "Not a valid plugin, must be a qtpyvcp.plugins.Plugin subclass."
 
     try:
-        inst = plugin_cls(*args, **kwargs)
-        registerPlugin(plugin_id, inst)
+        with profiler.profile("construct '{}'".format(plugin_id), 'plugin'):
+            inst = plugin_cls(*args, **kwargs)
+        registerPlugin(plugin_id, inst, depends)
         return inst
     except TypeError:
         LOG.critical("Error initializing plugin: {}(*{}, **{})".format(plugin_cls, args, kwargs))
@@ -105,40 +123,137 @@ def iterPlugins():
     return _PLUGINS.iteritems()
 
 
+def sortByDependencies(plugin_ids, dependencies):
+    """Sort plugin IDs so that each plugin comes after its dependencies.
+
+    Plugins keep their relative order unless a dependency requires otherwise.
+    Dependencies which are not in ``plugin_ids`` are ignored.
+
+    Args:
+        plugin_ids (list) : The plugin IDs to sort.
+        dependencies (dict) : The dependencies of each plugin ID.
+
+    Returns:
+        list : The sorted plugin IDs.
+    """
+    plugin_ids = list(plugin_ids)
+
+    remaining = {}
+    for plugin_id in plugin_ids:
+        remaining[plugin_id] = set(dep for dep in dependencies.get(plugin_id, [])
+                                   if dep in plugin_ids and dep != plugin_id)
+
+    sorted_ids = []
+    while remaining:
+        ready = [plugin_id for plugin_id in plugin_ids
+                 if plugin_id in remaining and not remaining[plugin_id]]
+
+        if not ready:
+            raise ValueError("Circular plugin dependencies between: {}"
+                             .format(', '.join(sorted(remaining))))
+
+        plugin_id = ready[0]
+        sorted_ids.append(plugin_id)
+        del remaining[plugin_id]
+
+        for deps in remaining.values():
+            deps.discard(plugin_id)
+
+    return sorted_ids
+
+
+def _sortedPlugins():
+    return [(plugin_id, _PLUGINS[plugin_id]) for plugin_id in
+            sortByDependencies(_PLUGINS.keys(), _DEPENDENCIES)]
+
+
+def preInitialisePlugins():
+    """Starts pre-initializing all registered plugins on worker threads.
+
+        Each plugin's :py:meth:`.Plugin.preInitialise` runs as soon as its
+        dependencies have been pre-initialized, concurrently with any other
+        plugins that are ready, up to ``MAX_PRE_INITIALISE_THREADS`` at a time.
+        This returns immediately, :py:func:`initialisePlugins` waits for each
+        plugin to be pre-initialized before initializing it.
+    """
+    pool = threading.BoundedSemaphore(MAX_PRE_INITIALISE_THREADS)
+
+    for plugin_id, plugin_inst in _sortedPlugins():
+        if plugin_id in _PRE_INITIALISED:
+            continue
+
+        done = threading.Event()
+        _PRE_INITIALISED[plugin_id] = done
+
+        deps_done = [_PRE_INITIALISED[dep] for dep in _DEPENDENCIES[plugin_id]
+                     if dep in _PRE_INITIALISED]
+
+        thread = threading.Thread(target=_preInitialisePlugin,
+                                  args=(plugin_id, plugin_inst, deps_done, pool, done),
+                                  name="pre-initialise {}".format(plugin_id))
+        thread.daemon = True
+        thread.start()
+
+
+def _preInitialisePlugin(plugin_id, plugin_inst, deps_done, pool, done):
+    try:
+        for dep_done in deps_done:
+            dep_done.wait()
+
+        with pool:
+            LOG.debug("Pre-initializing '%s' plugin", plugin_id)
+            with profiler.profile("pre-initialise '{}'".format(plugin_id), 'plugin'):
+                plugin_inst.preInitialise()
+
+    except Exception:
+        LOG.exception("Error pre-initializing '%s' plugin", plugin_id)
+
+    finally:
+        done.set()
+
+
 def initialisePlugins():
     """Initializes all registered plugins.
 
-        Plugins are initialized in the order they were registered in.
-        Plugins defined in the YAML file are registered in the order they
-        were defined.
+        Plugins are initialized in the order they were registered in, with
+        plugins moved after any plugins they depend on. Plugins defined in
+        the YAML file are registered in the order they were defined.
+
+        Each plugin is initialized as soon as it has been pre-initialized,
+        so plugins which are ready don't have to wait for slower ones.
     """
-    for plugin_id, plugin_inst in _PLUGINS.items():
+    preInitialisePlugins()
+
+    for plugin_id, plugin_inst in _sortedPlugins():
+        _PRE_INITIALISED[plugin_id].wait()
+
         LOG.debug("Initializing '%s' plugin", plugin_id)
-        plugin_inst.initialise()
+        with profiler.profile("initialise '{}'".format(plugin_id), 'plugin'):
+            plugin_inst.initialise()
 
 
 def postGuiInitialisePlugins(main_window):
     """Initializes all registered plugins after main window is shown.
 
-        Plugins are initialized in the order they were registered in.
-        Plugins defined in the YAML file are registered in the order they
-        were defined.
+        Plugins are initialized in the same order as by
+        :py:func:`initialisePlugins`.
     """
-    for plugin_id, plugin_inst in _PLUGINS.items():
+    for plugin_id, plugin_inst in _sortedPlugins():
         LOG.debug("Post GUI Initializing '%s' plugin", plugin_id)
-        plugin_inst.postGuiInitialise(main_window)
+        with profiler.profile("post GUI initialise '{}'".format(plugin_id), 'plugin'):
+            plugin_inst.postGuiInitialise(main_window)
 
 
 def terminatePlugins():
     """Terminates all registered plugins.
 
-        Plugins are terminated in the reverse order they were registered in.
+        Plugins are terminated in the reverse order they were initialized in.
         If an error is encountered while terminating a plugin it will be ignored
         and the remaining plugins will still be terminated.
     """
     # terminate in reverse order, this is to prevent problems
     # when terminating plugins that make use of other plugins.
-    for plugin_id, plugin_inst in reversed(_PLUGINS.items()):
+    for plugin_id, plugin_inst in reversed(_sortedPlugins()):
         LOG.debug("Terminating '%s' plugin", plugin_id)
         try:
             # try so that other plugins are terminated properly
@@ -22,6 +22,19 @@ class Plugin(QObject):
             return self._log
         return self._log
 
+    def preInitialise(self):
+        """Pre-initialize the plugin.
+
+        This method is called on a worker thread before :py:meth:`initialise`,
+        concurrently with the pre-initialization of any plugins this plugin
+        does not depend on. Slow blocking I/O, such as reading data files,
+        should be done here so it does not hold up the startup.
+
+        This method must not create or modify any Qt objects, or set data
+        channel values, the results should be applied in :py:meth:`initialise`.
+        """
+        pass
+
     def initialise(self):
         """Initialize the plugin.
 
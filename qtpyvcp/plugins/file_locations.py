@@ -36,6 +36,8 @@ class FileLocations(DataPlugin):
         self.monitor = None
         self.observer = None
 
+        self._preloaded_devices = None
+
         self.status = getPlugin('status')
 
     @DataChannel
@@ -62,7 +64,27 @@ class FileLocations(DataPlugin):
                 self.updateRemovableDevices()
 
     def updateRemovableDevices(self):
+        removable_devices, new_device_info = self.findRemovableDevices(self._new_device)
+
+        self.removable_devices.setValue(removable_devices)
+        self.new_device.setValue(new_device_info)
+
+        # reset new device
+        self._new_device = None
+
+    def findRemovableDevices(self, new_device=None):
+        """Find the mounted partitions of removable disks.
+
+        This does not change any data channels, so is safe to call from
+        any thread.
 
+        Args:
+            new_device (str) : Device node of a newly added partition.
+
+        Returns:
+            tuple : Dict of the removable devices info, and the info of
+                the new device if it was found.
+        """
         disks = [disk for disk in
                    self.context.list_devices(subsystem='block', DEVTYPE='disk') if
                    disk.attributes.asstring('removable') == "1"]
@@ -85,14 +107,10 @@ class FileLocations(DataPlugin):
 
                     removable_devices[partition.device] = info
 
-                    if partition.device == self._new_device:
+                    if partition.device == new_device:
                         new_device_info = info
 
-        self.removable_devices.setValue(removable_devices)
-        self.new_device.setValue(new_device_info)
-
-        # reset new device
-        self._new_device = None
+        return removable_devices, new_device_info
 
     def ejectDevice(self, device):
 
@@ -116,8 +134,14 @@ class FileLocations(DataPlugin):
             os.system("udisksctl unmount --block-device {}".format(device))
             os.system("udisksctl power-off --block-device {}".format(device))
 
-    def initialise(self):
+    def preInitialise(self):
+        # enumerating the devices is slow, so do it off the GUI thread
         self.context = Context()
+        self._preloaded_devices = self.findRemovableDevices()
+
+    def initialise(self):
+        if self.context is None:
+            self.context = Context()
 
         self.monitor = Monitor.from_netlink(self.context)
         self.monitor.filter_by(subsystem='block')
@@ -126,7 +150,13 @@ class FileLocations(DataPlugin):
         self.observer.deviceEvent.connect(self._onDeviceEvent)
         self.monitor.start()
 
-        self.updateRemovableDevices()
+        if self._preloaded_devices is None:
+            self.updateRemovableDevices()
+        else:
+            removable_devices, new_device_info = self._preloaded_devices
+            self.removable_devices.setValue(removable_devices)
+            self.new_device.setValue(new_device_info)
+            self._preloaded_devices = None
 
     def terminate(self):
         pass
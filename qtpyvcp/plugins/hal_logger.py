@@ -0,0 +1,360 @@
+"""
+HAL Logger
+----------
+
+Plugin to log the values of any number of HAL pins at up to 1 kHz, for
+diagnostics such as spindle load and following error.
+
+The pins are sampled on a background thread. The most recent samples are
+kept in memory for plotting, see :py:class:`.HalLoggerPlot`, and all the
+samples are written to disk in chunks. Each chunk is a numpy ``.npz`` file
+holding one array per column, ``time`` and one per series, and can be
+loaded with :py:meth:`HalLogger.readLog`. The oldest chunks are deleted
+once the log is older than ``retention`` or larger than ``max_size``.
+
+Each series reads an existing HAL pin or signal by name. If no ``pin`` is
+given a float input pin named ``hal-logger.<name>`` is added to the
+``qtpyvcp`` HAL component instead, which can be connected in the
+``POSTGUI_HALFILE``.
+
+This plugin is not loaded by default, so to use it you will first
+need to add it to your VCPs YAML config file.
+
+YAML configuration:
+
+.. code-block:: yaml
+
+    data_plugins:
+      hal_logger:
+        provider: qtpyvcp.plugins.hal_logger:HalLogger
+        kwargs:
+          series:
+            # series named after the pin it reads
+            - joint.0.f-error
+            # series with a different name
+            - name: spindle-load
+              pin: spindle.0.torque
+            # series read from the qtpyvcp.hal-logger.probe-force pin
+            - name: probe-force
+          # sample rate in Hz, max 1000
+          rate: 500
+          # seconds of samples to keep in memory for plotting
+          window: 60
+          # seconds of samples per file on disk
+          chunk_length: 10
+          # max age of the log on disk in seconds
+          retention: 3600
+          # max size of the log on disk in MB
+          max_size: 100
+"""
+
+import os
+import time
+import glob
+import threading
+from collections import deque
+
+import _hal
+import numpy as np
+
+from qtpy.QtCore import Signal
+
+from qtpyvcp import hal
+from qtpyvcp.lib.ring_buffer import RingBuffer
+from qtpyvcp.utilities.logger import getLogger
+from qtpyvcp.utilities.misc import cacheDir
+from qtpyvcp.plugins import Plugin
+
+LOG = getLogger(__name__)
+
+MAX_RATE = 1000  # Hz
+
+
+class HalLogger(Plugin):
+    """HAL logger plugin
+
+    Args:
+        series (list) : The series to log, each either a HAL pin name, or
+            a dict with a ``name`` and an optional ``pin``.
+        rate (float, optional) : Sample rate in Hz, max 1000 (Default = 100)
+        window (float, optional) : Seconds of samples to keep in memory
+            (Default = 60)
+        log_dir (str, optional) : Dir to write the log to (Default = the
+            ``hal_logger`` dir in the QtPyVCP cache dir)
+        log_to_disk (bool, optional) : Whether to write the samples to disk
+            (Default = True)
+        chunk_length (float, optional) : Seconds of samples per file
+            (Default = 10)
+        retention (float, optional) : Max age of the log in seconds
+            (Default = 3600)
+        max_size (float, optional) : Max size of the log in MB
+            (Default = 100)
+        notify_rate (float, optional) : Max number of times per second
+            to emit ``updated`` (Default = 10)
+    """
+
+    # emitted when new samples have been added, at most notify_rate times per second
+    updated = Signal()
+
+    def __init__(self, series=None, rate=100, window=60, log_dir=None,
+                 log_to_disk=True, chunk_length=10, retention=3600,
+                 max_size=100, notify_rate=10):
+        super(HalLogger, self).__init__()
+
+        if rate > MAX_RATE:
+            LOG.warning("HAL logger rate of %s Hz is too high, using %s Hz", rate, MAX_RATE)
+        self.rate = float(min(rate, MAX_RATE))
+        self.chunk_length = chunk_length
+        self.window = max(window, chunk_length)
+        self.log_dir = os.path.expanduser(log_dir) if log_dir else None
+        self.log_to_disk = log_to_disk
+        self.retention = retention
+        self.max_size = max_size * 1024 * 1024
+        self.notify_rate = notify_rate
+
+        self._series = []  # (name, pin name or None)
+        for item in series or []:
+            if isinstance(item, basestring):
+                self._series.append((item, item))
+            else:
+                self._series.append((item['name'], item.get('pin')))
+
+        self._buffer = RingBuffer(int(self.window * self.rate), len(self._series) + 1)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._write_queue = deque()  # chunks to write, None to stop
+        self._write_condition = threading.Condition()
+        self._readers = []
+        self._sampler = None
+        self._writer = None
+
+    def seriesNames(self):
+        """Get the names of the logged series, in order."""
+        return [name for name, pin in self._series]
+
+    def latest(self):
+        """Get the most recent value of each series.
+
+        Returns:
+            dict : The values keyed by series name, empty if nothing has
+                been sampled yet.
+        """
+        with self._lock:
+            sample = self._buffer.view(1).copy()
+
+        if not len(sample):
+            return {}
+        return dict(zip(self.seriesNames(), sample[0, 1:]))
+
+    def samples(self, duration=None, max_points=None, series=None):
+        """Get the most recent samples, oldest first.
+
+        Args:
+            duration (float) : Seconds of samples to get, defaults to all
+                the samples in memory.
+            max_points (int) : Max number of points to return, longer
+                periods are decimated keeping the min and max values.
+            series (list) : Names of the series to get, defaults to all.
+
+        Returns:
+            tuple : An array of the sample times in seconds since the epoch,
+                and a dict of arrays of the values keyed by series name.
+        """
+        count = None if duration is None else int(duration * self.rate)
+
+        with self._lock:
+            if max_points:
+                data = self._buffer.decimated(max_points, count)
+            else:
+                data = self._buffer.view(count)
+            data = data.copy()
+
+        names = self.seriesNames()
+        if series is None:
+            series = names
+
+        values = {}
+        for name in series:
+            if name in names:
+                values[name] = data[:, names.index(name) + 1]
+
+        return data[:, 0], values
+
+    def logFiles(self):
+        """Get the log files on disk, oldest first."""
+        if not self.log_dir:
+            return []
+        return sorted(glob.glob(os.path.join(self.log_dir, '*.npz')))
+
+    @staticmethod
+    def readLog(fname):
+        """Read a log file.
+
+        Args:
+            fname (str) : The path of the log file.
+
+        Returns:
+            dict : Arrays of the ``time`` and series values, keyed by name.
+        """
+        with np.load(fname) as data:
+            return {name: data[name] for name in data.files}
+
+    def initialise(self):
+        if not self._series:
+            LOG.warning("No series configured for the HAL logger")
+
+        self._readers = [self._makeReader(name, pin) for name, pin in self._series]
+
+        if self.log_to_disk:
+            if self.log_dir is None:
+                self.log_dir = cacheDir('hal_logger')
+            elif not os.path.isdir(self.log_dir):
+                os.makedirs(self.log_dir)
+
+            self._writer = threading.Thread(target=self._write, name='hal-logger-writer')
+            self._writer.daemon = True
+            self._writer.start()
+
+        self._sampler = threading.Thread(target=self._sample, name='hal-logger')
+        self._sampler.daemon = True
+        self._sampler.start()
+
+        self._initialized = True
+
+    def terminate(self):
+        # the sampler saves the last chunk and then stops the writer
+        self._stop_event.set()
+        if self._sampler is not None:
+            self._sampler.join()
+
+        if self._writer is not None:
+            self._writer.join(5)
+
+    def _makeReader(self, name, pin):
+        # returns a function to read the current value of the series
+        if not pin:
+            qpin = hal.getComponent().addPin('hal-logger.' + name, 'float', 'in')
+            return lambda: qpin.value
+
+        get_value = getattr(_hal, 'get_value', None)
+        if get_value is None:
+            LOG.error("Can't read HAL pin '%s', this version of LinuxCNC doesn't "
+                      "support it. Leave out the pin to create one for the series.", pin)
+            return lambda: float('nan')
+
+        try:
+            get_value(pin)
+        except Exception:
+            LOG.error("Can't read HAL pin or signal '%s' for series '%s'", pin, name)
+            return lambda: float('nan')
+
+        return lambda: get_value(pin)
+
+    def _sample(self):
+        # runs on the sampler thread
+        try:
+            self._sampleLoop()
+        finally:
+            # stop the writer once it has written the last chunk
+            if self._writer is not None:
+                self._queueWrite(None)
+
+    def _sampleLoop(self):
+        period = 1.0 / self.rate
+        notify_every = max(1, int(self.rate / self.notify_rate))
+        chunk_samples = max(1, int(self.chunk_length * self.rate))
+        readers = self._readers
+
+        sampled = 0
+        unsaved = 0
+        next_time = time.time()
+
+        while not self._stop_event.is_set():
+            row = [time.time()]
+            for read in readers:
+                try:
+                    row.append(read())
+                except Exception:
+                    row.append(float('nan'))
+
+            with self._lock:
+                self._buffer.append(row)
+
+            sampled += 1
+            if sampled % notify_every == 0:
+                self.updated.emit()
+
+            unsaved += 1
+            if unsaved >= chunk_samples:
+                self._saveChunk(unsaved)
+                unsaved = 0
+
+            next_time += period
+            delay = next_time - time.time()
+            if delay > 0:
+                self._stop_event.wait(delay)
+            elif delay < -10 * period:
+                # fell too far behind, skip the missed samples
+                next_time = time.time()
+
+        if unsaved:
+            self._saveChunk(unsaved)
+
+    def _saveChunk(self, count):
+        # queue the last count samples to be written to disk
+        if not self.log_to_disk:
+            return
+
+        with self._lock:
+            data = self._buffer.view(count).copy()
+        self._queueWrite(data)
+
+    def _queueWrite(self, data):
+        with self._write_condition:
+            self._write_queue.append(data)
+            self._write_condition.notify()
+
+    def _write(self):
+        # runs on the writer thread, so disk I/O never delays sampling
+        while True:
+            with self._write_condition:
+                while not self._write_queue:
+                    self._write_condition.wait()
+                data = self._write_queue.popleft()
+
+            if data is None:
+                return
+
+            try:
+                self._writeChunk(data)
+                self._applyRetention()
+            except Exception:
+                LOG.exception("Error writing HAL log")
+
+    def _writeChunk(self, data):
+        start = data[0, 0]
+        fname = os.path.join(self.log_dir, '{}-{:03d}.npz'.format(
+            time.strftime('%Y%m%d-%H%M%S', time.localtime(start)),
+            int(start * 1000) % 1000))
+
+        columns = {'time': data[:, 0]}
+        for index, name in enumerate(self.seriesNames()):
+            columns[name] = data[:, index + 1]
+
+        tmp_file = fname + '.tmp'
+        with open(tmp_file, 'wb') as fh:
+            np.savez(fh, **columns)
+        os.rename(tmp_file, fname)
+
+    def _applyRetention(self):
+        # delete the oldest files, but always keep the newest one
+        files = [(fname, os.path.getsize(fname)) for fname in self.logFiles()]
+        total = sum(size for fname, size in files)
+        cutoff = time.time() - self.retention
+
+        for fname, size in files[:-1]:
+            if total <= self.max_size and os.path.getmtime(fname) >= cutoff:
+                break
+            LOG.debug("Deleting old HAL log: %s", fname)
+            os.remove(fname)
+            total -= size
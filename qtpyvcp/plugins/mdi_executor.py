@@ -0,0 +1,350 @@
+"""
+MDI Executor
+------------
+
+Plugin to run MDI commands in order from a queue.
+
+Commands are issued on a worker thread, which waits for each command to
+be completed by LinuxCNC before issuing the next one, so the GUI is never
+blocked. The task mode is switched to MDI once at the start of each batch
+of commands and restored once at the end.
+
+Each queued command is returned as an :py:class:`MDICommand`, which
+signals when it starts and finishes, and can be waited on.
+
+Aborting, e-stopping or turning off the machine cancels all the queued
+commands, and fails the command which was running.
+
+YAML configuration:
+
+.. code-block:: yaml
+
+    data_plugins:
+      mdi_executor:
+        provider: qtpyvcp.plugins.mdi_executor:MDIExecutor
+        depends:
+          - status
+        kwargs:
+          # max time to wait for LinuxCNC to accept a command, in seconds
+          command_timeout: 5.0
+"""
+
+import time
+import threading
+from collections import deque
+
+import linuxcnc
+
+from qtpy.QtCore import QObject, Signal
+
+from qtpyvcp.utilities.logger import getLogger
+from qtpyvcp.plugins import Plugin, getPlugin
+
+LOG = getLogger(__name__)
+
+
+class MDICommand(QObject):
+    """A queued MDI command.
+
+    Acts as a future for the completion of the command. The signals are
+    emitted from the executor thread, so connected slots are called on
+    the thread of the receiver, which is normally the GUI thread.
+    """
+
+    QUEUED = 0
+    RUNNING = 1
+    DONE = 2
+    FAILED = 3
+    CANCELLED = 4
+
+    # emitted when the command is issued
+    started = Signal()
+    # emitted when the command is done, with whether it succeeded
+    finished = Signal(bool)
+
+    def __init__(self, command):
+        super(MDICommand, self).__init__()
+
+        self.command = command
+        self.state = MDICommand.QUEUED
+        self.error = ''
+
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return "<MDICommand '{}'>".format(self.command)
+
+    def done(self):
+        """Whether the command has finished, failed or been cancelled."""
+        return self._done.is_set()
+
+    def succeeded(self):
+        return self.state == MDICommand.DONE
+
+    def onFinished(self, slot):
+        """Call a slot with whether the command succeeded once it is done.
+
+        Unlike connecting to ``finished``, the slot is called straight away
+        if the command is already done, e.g. cancelled by the executor
+        before this was called, so the result is never missed.
+
+        Args:
+            slot (callable) : Called with True if the command succeeded.
+        """
+        with self._lock:
+            if not self._done.is_set():
+                self.finished.connect(slot)
+                return
+        slot(self.succeeded())
+
+    def wait(self, timeout=None):
+        """Wait for the command to finish.
+
+        Must not be called from the GUI thread while the command is
+        queued, as the GUI would be blocked.
+
+        Args:
+            timeout (float) : Max time to wait in seconds, or None to
+                wait indefinitely.
+
+        Returns:
+            bool : True if the command succeeded.
+        """
+        self._done.wait(timeout)
+        return self.succeeded()
+
+    def _start(self):
+        self.state = MDICommand.RUNNING
+        self.started.emit()
+
+    def _finish(self, state, error=''):
+        with self._lock:
+            self.state = state
+            self.error = error
+            self._done.set()
+        self.finished.emit(state == MDICommand.DONE)
+
+
+class MDIExecutor(Plugin):
+    """MDI executor plugin
+
+    Args:
+        command_timeout (float, optional): Max time to wait for LinuxCNC to
+            accept a command in seconds (Default = 5)
+        poll_interval (float, optional): Interval for checking whether a
+            command has completed in seconds (Default = 0.01)
+    """
+
+    # emitted with the MDICommand when it is issued
+    command_started = Signal(object)
+    # emitted with the MDICommand when it is done
+    command_finished = Signal(object)
+    # emitted when the last queued command is done
+    queue_empty = Signal()
+
+    def __init__(self, command_timeout=5.0, poll_interval=0.01):
+        super(MDIExecutor, self).__init__()
+
+        self.command_timeout = command_timeout
+        self.poll_interval = poll_interval
+
+        self._queue = deque()  # (commands, reset mode) batches
+        self._condition = threading.Condition()
+        self._stop_event = threading.Event()
+        # set when aborted while a command is running
+        self._abort_event = threading.Event()
+        self._current = []  # the batch being run
+        self._worker = None
+
+    def submit(self, command, reset=True):
+        """Queue MDI commands to be run in order.
+
+        Args:
+            command (str | list) : A gcode command string, multiple commands
+                can be separated with a ``;``, or a list of commands.
+            reset (bool, optional): Whether to reset the task mode to the
+                mode before the batch once all its commands are done.
+
+        Returns:
+            list : An :py:class:`MDICommand` for each command. The commands
+                may already be done when this returns, use
+                :py:meth:`MDICommand.onFinished` to get the results.
+        """
+        if isinstance(command, basestring):
+            command = command.strip().split(';')
+
+        commands = [MDICommand(cmd.strip()) for cmd in command if cmd.strip()]
+        if not commands:
+            return []
+
+        with self._condition:
+            self._queue.append((commands, reset))
+            self._condition.notify()
+
+        return commands
+
+    def cancel(self):
+        """Cancel all the queued commands which have not been issued yet."""
+        with self._condition:
+            for commands, reset in self._queue:
+                self._cancel(commands)
+            self._queue.clear()
+            self._cancel(self._current)
+
+    def abort(self):
+        """Cancel all the queued commands, and fail the running command.
+
+        An aborted command leaves the interpreter idle without an error,
+        so this must be called when LinuxCNC is aborted, otherwise the
+        rest of the batch would be issued.
+        """
+        with self._condition:
+            if self._current:
+                self._abort_event.set()
+        self.cancel()
+
+    def isBusy(self):
+        """Whether any commands are queued or running."""
+        with self._condition:
+            return bool(self._current or self._queue)
+
+    def initialise(self):
+        getPlugin('status').task_state.notify(self._onTaskStateChanged)
+
+        self._worker = threading.Thread(target=self._run, name='mdi-executor')
+        self._worker.daemon = True
+        self._worker.start()
+
+        self._initialized = True
+
+    def terminate(self):
+        self._stop_event.set()
+        self.cancel()
+        with self._condition:
+            self._condition.notify()
+
+        if self._worker is not None:
+            self._worker.join(self.command_timeout)
+
+    def _onTaskStateChanged(self, task_state):
+        if task_state != linuxcnc.STATE_ON:
+            # e-stopped or turned off
+            self.abort()
+
+    def _cancel(self, commands):
+        # cancel the commands which have not been issued yet, must be
+        # called with the condition held
+        for mdi in commands:
+            if mdi.state == MDICommand.QUEUED:
+                mdi._finish(MDICommand.CANCELLED, "Cancelled")
+
+    def _run(self):
+        # runs on the worker thread, with its own command and stat channels
+        cmd = linuxcnc.command()
+        stat = linuxcnc.stat()
+
+        while True:
+            with self._condition:
+                while not self._queue and not self._stop_event.is_set():
+                    self._condition.wait()
+                if self._stop_event.is_set():
+                    return
+                commands, reset = self._queue.popleft()
+                self._current = commands
+
+            try:
+                self._runBatch(cmd, stat, commands, reset)
+            except Exception:
+                LOG.exception("Error running MDI commands")
+                for mdi in commands:
+                    if not mdi.done():
+                        mdi._finish(MDICommand.FAILED, "Internal error")
+
+            with self._condition:
+                self._current = []
+                empty = not self._queue
+
+            if empty:
+                self.queue_empty.emit()
+
+    def _runBatch(self, cmd, stat, commands, reset):
+        stat.poll()
+        if stat.task_mode == linuxcnc.MODE_AUTO and \
+                stat.interp_state != linuxcnc.INTERP_IDLE:
+            LOG.error("Can't issue MDI commands while a program is running")
+            with self._condition:
+                self._cancel(commands)
+            return
+
+        # wait for any motion from outside the queue to finish
+        if not self._waitIdle(stat):
+            with self._condition:
+                self._cancel(commands)
+            return
+
+        previous_mode = stat.task_mode
+        if previous_mode != linuxcnc.MODE_MDI:
+            cmd.mode(linuxcnc.MODE_MDI)
+            cmd.wait_complete(self.command_timeout)
+
+        for index, mdi in enumerate(commands):
+            with self._condition:
+                if mdi.done():
+                    # cancelled
+                    continue
+                self._abort_event.clear()
+                mdi._start()
+
+            LOG.info("Issuing MDI command: %s", mdi.command)
+            self.command_started.emit(mdi)
+
+            cmd.mdi(mdi.command)
+            error = self._waitComplete(cmd, stat)
+
+            if error:
+                LOG.error("MDI command '%s' failed: %s", mdi.command, error)
+                mdi._finish(MDICommand.FAILED, error)
+                self.command_finished.emit(mdi)
+                # the rest of the batch most likely depends on this command
+                with self._condition:
+                    self._cancel(commands[index + 1:])
+                break
+
+            mdi._finish(MDICommand.DONE)
+            self.command_finished.emit(mdi)
+
+        if reset and previous_mode != linuxcnc.MODE_MDI:
+            cmd.mode(previous_mode)
+            cmd.wait_complete(self.command_timeout)
+            LOG.debug("Successfully reset task_mode after MDI")
+
+    def _waitComplete(self, cmd, stat):
+        # returns an error message, or '' if the command succeeded
+        result = cmd.wait_complete(self.command_timeout)
+        if result == -1:
+            return "Timed out waiting for LinuxCNC to accept the command"
+        elif result == linuxcnc.RCS_ERROR:
+            return "Command rejected by LinuxCNC"
+
+        # wait for the interpreter to finish running the command
+        if not self._waitIdle(stat):
+            return "Cancelled"
+
+        if self._abort_event.is_set() or stat.task_state != linuxcnc.STATE_ON:
+            return "Aborted"
+
+        if stat.state == linuxcnc.RCS_ERROR:
+            return "Error executing the command"
+
+        return ''
+
+    def _waitIdle(self, stat):
+        # returns False if stopped before the interpreter was idle
+        while not self._stop_event.is_set():
+            stat.poll()
+            if stat.interp_state == linuxcnc.INTERP_IDLE and \
+                    stat.state != linuxcnc.RCS_EXEC:
+                return True
+            time.sleep(self.poll_interval)
+        return False
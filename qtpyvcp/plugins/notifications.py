@@ -20,19 +20,31 @@ Supports evaluating arbitrary python expressions placed in gcode DEBUG statement
 """
 
 import time
+import threading
+from collections import deque
+
 import linuxcnc
 
+from qtpy.QtCore import QTimer, Signal
 from qtpy.QtWidgets import QApplication
 
 from qtpyvcp.utilities.logger import getLogger
 from qtpyvcp.plugins import DataPlugin, DataChannel, getPlugin
 from qtpyvcp.lib.native_notification import NativeNotification
 from qtpyvcp.lib.dbus_notification import DBusNotification
+from qtpyvcp.lib.notification_store import NotificationStore
 
 LOG = getLogger(__name__)
 STATUS = getPlugin('status')
 
 
+def wrapMessage(text, max_words=5):
+    """Wrap a message onto multiple lines of at most ``max_words`` words."""
+    words = text.split(' ')
+    return '\n'.join(' '.join(words[i:i + max_words])
+                     for i in range(0, len(words), max_words))
+
+
 class Notifications(DataPlugin):
     """
     Notification data plugin
@@ -42,24 +54,59 @@ class Notifications(DataPlugin):
         mode (str, optional):                          native or dbus (Default = 'native')
         max_messages (int, optional)                   Max number of notification popups to show.
         persistent (bool, optional):                   Save notifications on shutdown (Default = True)
+        history_size (int, optional):                  Max number of notifications to keep in the history (Default = 1000)
+        history_days (float, optional):                Max age of the notifications in the history in days,
+                                                       or None to keep them regardless of age (Default = 30)
+        poll_interval (float, optional):               Interval for reading the error channel in seconds (Default = 0.05)
+        repeat_interval (float, optional):             Don't show a popup for a message identical to one shown
+                                                       within this many seconds (Default = 2)
+        max_popup_rate (int, optional):                Max number of popups to show per second (Default = 5)
     """
+
+    # emitted from the reader thread with a list of
+    # (kind, text, formatted text, timestamp) tuples
+    messages_received = Signal(object)
+
     def __init__(self, enabled=True, mode="native", max_messages=5,
-                 persistent=True, **kwargs):
+                 persistent=True, history_size=1000, history_days=30,
+                 poll_interval=0.05, repeat_interval=2, max_popup_rate=5, **kwargs):
         super(Notifications, self).__init__()
 
         self.enabled = enabled
         self.mode = mode
         self.max_messages = max_messages
 
+        self.poll_interval = poll_interval
+        self.repeat_interval = repeat_interval
+        self.max_popup_rate = max_popup_rate
+
         self.error_channel = linuxcnc.error_channel()
+        self._reader = None
+        self._stop_event = threading.Event()
+        self.messages_received.connect(self.processMessages)
+
+        self._popup_times = deque()
+        self._last_popups = {}  # (type, message): time last shown
+        self._suppressed_popups = 0
+
+        # shows the number of suppressed popups once the rate allows
+        self._summary_timer = QTimer(self)
+        self._summary_timer.setSingleShot(True)
+        self._summary_timer.timeout.connect(self.showSuppressedSummary)
 
-        self.messages = []
+        max_age = history_days * 24 * 60 * 60 if history_days else None
+        self.store = NotificationStore(max_count=history_size, max_age=max_age)
         self.notification_dispatcher = None
 
         self.persistent = persistent
 
         self.data_manager = getPlugin('persistent_data_manager')
 
+    @property
+    def messages(self):
+        """List of the notifications in the history, oldest first."""
+        return self.store.toList()
+
     @DataChannel
     def debug_message(self, chan):
         return chan.value or ''
@@ -76,91 +123,198 @@ class Notifications(DataPlugin):
     def error_message(self, chan):
         return chan.value or ''
 
-    def captureMessage(self, m_type, msg):
+    def captureMessage(self, m_type, msg, timestamp=None, save=True):
+        """Show a notification popup and add the message to the history.
+
+        Args:
+            m_type (str) : The message type, e.g. ``error``.
+            msg (str) : The message text.
+            timestamp (float) : Time of the message, defaults to now.
+            save (bool) : Whether to save the history.
+        """
+        self.showPopup(m_type, msg)
+
+        self.store.add({'timestamp': timestamp or time.time(),
+                        'message_type': m_type,
+                        'message_text': msg,
+                        'operator_id': '',
+                        'loaded_file': STATUS.file.getValue(),
+                        'task_mode': STATUS.task_mode.getString(),
+                        'task_state': STATUS.task_state.getString(),
+                        'interp_mode': STATUS.interp_state.getString(),
+                        }
+                       )
+
+        if save and self.persistent:
+            self.data_manager.markChanged('messages')
+
+    def showPopup(self, m_type, msg):
+        """Show a notification popup, unless an identical one was just shown
+        or popups are being shown too fast."""
+        if not self.enabled or self.notification_dispatcher is None:
+            return
+
+        now = time.time()
+        key = (m_type, msg)
 
-        if self.enabled:
-            self.notification_dispatcher.setNotify(m_type, msg)
-
-        self.messages.append({'timestamp': time.time(),
-                              'message_type': m_type,
-                              'message_text': msg,
-                              'operator_id': '',
-                              'loaded_file': STATUS.file.getValue(),
-                              'task_mode': STATUS.task_mode.getString(),
-                              'task_state': STATUS.task_state.getString(),
-                              'interp_mode': STATUS.interp_state.getString(),
-                              }
-                             )
-
-    def timerEvent(self, event):
-        """Called every 200ms to poll error channel"""
-        error = self.error_channel.poll()
-
-        if not error:
+        last_shown = self._last_popups.get(key)
+        if last_shown is not None and now - last_shown < self.repeat_interval:
             return
 
-        kind, msg_text = error
-        msg_text = msg_text.strip()
+        if not self._popupAllowed(now):
+            self._suppressed_popups += 1
+            self._startSummaryTimer(now)
+            return
+
+        self.notification_dispatcher.setNotify(m_type, msg)
+        self._popup_times.append(now)
+
+        if len(self._last_popups) > 100:
+            self._last_popups = {k: t for k, t in self._last_popups.items()
+                                 if now - t < self.repeat_interval}
+        self._last_popups[key] = now
 
-        message_words = msg_text.split(' ')
+    def showSuppressedSummary(self):
+        """Show a popup with the number of popups suppressed by the rate limit."""
+        if not self._suppressed_popups or self.notification_dispatcher is None:
+            return
 
-        index = 1
-        max_words = 5
-        tmp_message = list()
+        now = time.time()
+        if not self._popupAllowed(now):
+            # the window was filled again by new popups
+            self._startSummaryTimer(now)
+            return
 
-        for word in message_words:
-            tmp_message.append(word)
-            if index == max_words:
-                tmp_message.append('\n')
-                index = 1
+        self.notification_dispatcher.setNotify(
+            'info', '{} more notifications, see the notification history'
+            .format(self._suppressed_popups))
+        self._suppressed_popups = 0
+        self._popup_times.append(now)
+
+    def _popupAllowed(self, now):
+        # whether another popup can be shown within max_popup_rate
+        while self._popup_times and now - self._popup_times[0] > 1:
+            self._popup_times.popleft()
+        return len(self._popup_times) < self.max_popup_rate
+
+    def _startSummaryTimer(self, now):
+        # fire when the oldest popup drops out of the one second window
+        if self._summary_timer.isActive() or self.max_popup_rate < 1:
+            return
+        delay = 1 - (now - self._popup_times[0]) if self._popup_times else 0
+        self._summary_timer.start(int(max(delay, 0) * 1000) + 10)
+
+    def exportMessages(self, fname, fmt='csv', **filters):
+        """Export the notification history to a file for review.
+
+        Args:
+            fname (str) : Path of the file to write.
+            fmt (str) : ``csv`` or ``jsonl``.
+            **filters : Only export matching messages, see
+                :py:meth:`.NotificationStore.messages`.
+
+        Returns:
+            int : The number of messages exported.
+        """
+        with open(fname, 'w') as fh:
+            if fmt == 'jsonl':
+                count = self.store.exportJSONL(fh, **filters)
             else:
-                index += 1
+                count = self.store.exportCSV(fh, **filters)
 
-        msg = ' '.join(tmp_message)
+        LOG.info("Exported %i notifications to: %s", count, fname)
+        return count
 
-        if msg == "" or msg is None:
-            msg = "No message text set."
+    def processMessages(self, messages):
+        """Handle a batch of messages read from the error channel.
 
-        if kind in [linuxcnc.NML_ERROR, linuxcnc.OPERATOR_ERROR]:
-            self.error_message.setValue(msg)
-            self.captureMessage('error', msg)
-            LOG.error(msg)
+        Args:
+            messages (list) : ``(kind, text, formatted text, timestamp)`` tuples.
+        """
+        for kind, msg_text, msg, timestamp in messages:
 
-        elif kind in [linuxcnc.NML_TEXT, linuxcnc.OPERATOR_TEXT]:
-            self.debug_message.setValue(msg)
-            self.captureMessage('debug', msg)
-            LOG.debug(msg)
+            if msg == "" or msg is None:
+                msg = "No message text set."
 
-        elif kind in [linuxcnc.NML_DISPLAY, linuxcnc.OPERATOR_DISPLAY]:
+            if kind in [linuxcnc.NML_ERROR, linuxcnc.OPERATOR_ERROR]:
+                self.error_message.setValue(msg)
+                self.captureMessage('error', msg, timestamp, save=False)
+                LOG.error(msg)
 
-            if msg_text.lower().startswith('eval['):
-                exp = msg_text[5:].strip(']')
-                exp = exp.replace('{', '(').replace('}', ')')
+            elif kind in [linuxcnc.NML_TEXT, linuxcnc.OPERATOR_TEXT]:
+                self.debug_message.setValue(msg)
+                self.captureMessage('debug', msg, timestamp, save=False)
+                LOG.debug(msg)
 
-                LOG.debug("Evaluating gcode DEBUG expression: '%s'", exp)
+            elif kind in [linuxcnc.NML_DISPLAY, linuxcnc.OPERATOR_DISPLAY]:
 
-                try:
-                    app = QApplication.instance()
-                    eval(exp, {"vcp": app})
-                except Exception:
-                    LOG.exception("Error evaluating DEBUG expression: '%s'", exp)
+                if msg_text.lower().startswith('eval['):
+                    exp = msg_text[5:].strip(']')
+                    exp = exp.replace('{', '(').replace('}', ')')
+
+                    LOG.debug("Evaluating gcode DEBUG expression: '%s'", exp)
+
+                    try:
+                        app = QApplication.instance()
+                        eval(exp, {"vcp": app})
+                    except Exception:
+                        LOG.exception("Error evaluating DEBUG expression: '%s'", exp)
+
+                else:
+                    self.info_message.setValue(msg)
+                    self.captureMessage('info', msg, timestamp, save=False)
+                    LOG.info(msg)
 
             else:
                 self.info_message.setValue(msg)
-                self.captureMessage('info', msg)
-                LOG.info(msg)
+                self.captureMessage('info', msg, timestamp, save=False)
+                LOG.error(msg)
 
-        else:
-            self.info_message.setValue(msg)
-            self.captureMessage('info', msg)
-            LOG.error(msg)
+        if self.persistent:
+            self.data_manager.markChanged('messages')
+
+    def _readErrorChannel(self):
+        # runs on the reader thread, drains all the pending messages each
+        # wake up and hands them to the GUI thread as a single batch
+        read_failed = False
+        while not self._stop_event.wait(self.poll_interval):
+            messages = []
+            while True:
+                try:
+                    error = self.error_channel.poll()
+                except linuxcnc.error:
+                    # only log the first of a run of failures
+                    if not read_failed:
+                        LOG.exception("Error reading the error channel")
+                    read_failed = True
+                    break
+
+                read_failed = False
+
+                if not error:
+                    break
+
+                kind, msg_text = error
+                msg_text = msg_text.strip()
+                messages.append((kind, msg_text, wrapMessage(msg_text), time.time()))
+
+            if messages:
+                self.messages_received.emit(messages)
 
     def initialise(self):
 
         if self.persistent:
-            self.messages = self.data_manager.getData('messages', [])
+            self.store.load(self.data_manager.getData('messages', []))
+            # the history is copied to a list on the writer thread when it
+            # is saved, copying the list is atomic so this is thread safe
+            self.data_manager.setDataSource('messages', self.store.toList)
+
+        self._reader = threading.Thread(target=self._readErrorChannel,
+                                        name='error-channel-reader')
+        self._reader.daemon = True
+        self._reader.start()
 
-        self.startTimer(200)
+        self._initialized = True
 
     def postGuiInitialise(self, main_window):
         if self.enabled:
@@ -173,5 +327,9 @@ class Notifications(DataPlugin):
                 raise Exception("error notification mode {}".format(self.mode))
 
     def terminate(self):
+        self._stop_event.set()
+        if self._reader is not None:
+            self._reader.join()
+
         if self.persistent:
-            self.data_manager.setData('messages', self.messages)
+            self.data_manager.markChanged('messages')
@@ -41,6 +41,7 @@ import linuxcnc
 from qtpy.QtCore import QFileSystemWatcher, QTimer, Signal
 
 from qtpyvcp.utilities.info import Info
+from qtpyvcp.utilities.misc import fileSignature
 from qtpyvcp.utilities.logger import getLogger
 from qtpyvcp.plugins import DataPlugin, DataChannel, getPlugin
 
@@ -53,6 +54,14 @@ STATUS = getPlugin('status')
 STAT = STATUS.stat
 INFO = Info()
 
+# the G5x offsets are stored in parameters 5221 (G54 X) to 5390 (G59.3 R),
+# 20 parameters per coordinate system in X Y Z A B C U V W R order
+G5X_FIRST_PARAM = 5221
+G5X_PARAM_STEP = 20
+G5X_PARAMS = {G5X_FIRST_PARAM + index * G5X_PARAM_STEP + col: (index, col)
+              for index in range(9) for col in range(10)}
+G5X_LAST_PARAM = max(G5X_PARAMS)
+
 
 def merge(a, b):
     """Shallow merge two dictionaries"""
@@ -104,6 +113,9 @@ class OffsetTable(DataPlugin):
     offset_table_changed = Signal(dict)
     active_offset_changed = Signal(int)
 
+    # emitted with the row index, changed offsets and success of a G10 command
+    _offsets_written = Signal(int, object, bool)
+
     def __init__(self, columns='XYZABCUVWR', file_header_template=None):
         super(OffsetTable, self).__init__()
 
@@ -126,7 +138,14 @@ class OffsetTable(DataPlugin):
         self.g5x_offset_table = self.DEFAULT_OFFSET.copy()
         self.current_index = STATUS.stat.g5x_index
 
-        self.loadOffsetTable()
+        # the offsets are loaded in preInitialise
+        self._preloaded_offset_table = None
+
+        # copy of the offsets as last loaded or saved, to find the changes
+        self._loaded_offsets = {index: list(offsets) for index, offsets
+                                in self.DEFAULT_OFFSET.items()}
+        self._file_signature = None
+        self._offsets_written.connect(self._onOffsetsWritten)
 
         self.status.g5x_index.notify(self.setCurrentOffsetNumber)
 
@@ -158,7 +177,16 @@ class OffsetTable(DataPlugin):
         """
         return self.current_offset
 
+    def preInitialise(self):
+        # read the parameter file off the GUI thread
+        if self.parameter_file:
+            self._file_signature = fileSignature(self.parameter_file)
+        self._preloaded_offset_table = self.readOffsetTable()
+
     def initialise(self):
+        self.loadOffsetTable(preloaded=self._preloaded_offset_table)
+        self._preloaded_offset_table = None
+
         self.fs_watcher = QFileSystemWatcher([self.parameter_file])
         self.fs_watcher.fileChanged.connect(self.onParamsFileChanged)
 
@@ -206,8 +234,13 @@ class OffsetTable(DataPlugin):
         if self.parameter_file not in self.fs_watcher.files():
             self.fs_watcher.addPath(self.parameter_file)
 
+        # LinuxCNC rewrites the whole file when any persistent parameter
+        # changes, so only re-read it if it changed since it was last read
+        if fileSignature(self.parameter_file) == self._file_signature:
+            return
+
         # reload with the new data
-        offset_table = self.loadOffsetTable()
+        self.loadOffsetTable(emit_unchanged=False)
 
     def iterTools(self, offset_table=None, columns=None):
         offset_table = offset_table or self.OFFSET_TABLE
@@ -216,61 +249,135 @@ class OffsetTable(DataPlugin):
             offset_data = offset_table[offset]
             yield [offset_data[key] for key in columns]
 
-    def loadOffsetTable(self):
+    def loadOffsetTable(self, preloaded=None, emit_unchanged=True):
+        """Load the offsets from the parameter file and notify of the new data.
+
+        Args:
+            preloaded (dict) : The offset table already read by
+                :py:meth:`readOffsetTable`, if any.
+            emit_unchanged (bool) : Whether to emit ``offset_table_changed``
+                even if none of the offsets changed.
+        """
+        if preloaded is None:
+            if self.parameter_file:
+                self._file_signature = fileSignature(self.parameter_file)
+            preloaded = self.readOffsetTable()
+
+        changed = preloaded != self._loaded_offsets
+
+        self.g5x_offset_table = preloaded
+        self._loaded_offsets = {index: list(offsets) for index, offsets
+                                in preloaded.items()}
+
+        if changed or emit_unchanged:
+            self.offset_table_changed.emit(self.g5x_offset_table)
+
+        return self.g5x_offset_table
+
+    def readOffsetTable(self):
+        """Read the offsets from the parameter file.
+
+        This does not change the loaded offsets, so is safe to call
+        from any thread.
+
+        Returns:
+            dict : The offset table.
+        """
+        offset_table = {index: list(offsets) for index, offsets
+                        in self.g5x_offset_table.items()}
 
         if self.parameter_file:
             with open(self.parameter_file, 'r') as fh:
                 for line in fh:
-                    param, data = int(line.split()[0]), float(line.split()[1])
-
-                    if 5230 >= param >= 5221:
-                        self.g5x_offset_table.get(0)[param - 5221] = data
-                    elif 5250 >= param >= 5241:
-                        self.g5x_offset_table.get(1)[param - 5241] = data
-                    elif 5270 >= param >= 5261:
-                        self.g5x_offset_table.get(2)[param - 5261] = data
-                    elif 5290 >= param >= 5281:
-                        self.g5x_offset_table.get(3)[param - 5281] = data
-                    elif 5310 >= param >= 5301:
-                        self.g5x_offset_table.get(4)[param - 5301] = data
-                    elif 5330 >= param >= 5321:
-                        self.g5x_offset_table.get(5)[param - 5321] = data
-                    elif 5350 >= param >= 5341:
-                        self.g5x_offset_table.get(6)[param - 5341] = data
-                    elif 5370 >= param >= 5361:
-                        self.g5x_offset_table.get(7)[param - 5361] = data
-                    elif 5390 >= param >= 5381:
-                        self.g5x_offset_table.get(8)[param - 5381] = data
+                    fields = line.split(None, 2)
+                    if len(fields) < 2:
+                        continue
 
-        self.offset_table_changed.emit(self.g5x_offset_table)
+                    try:
+                        param = int(fields[0])
+                    except ValueError:
+                        continue
 
-        return self.g5x_offset_table
+                    if param > G5X_LAST_PARAM:
+                        # LinuxCNC keeps the parameter file in order, so
+                        # there are no more offsets
+                        break
+
+                    location = G5X_PARAMS.get(param)
+                    if location is not None:
+                        index, col = location
+                        offset_table[index][col] = float(fields[1])
+
+        return offset_table
 
     def getOffsetTable(self):
         return self.g5x_offset_table
 
-    def saveOffsetTable(self, offset_table, columns):
-        """ Stores the offset table in memory.
+    def saveOffsetTable(self, offset_table, columns=None):
+        """Write the changed offsets to LinuxCNC.
+
+        Only the offsets which differ from the loaded ones are written, as
+        a single batch of ``G10 L2`` MDI commands, one per changed row.
 
         Args:
-            offset_table (dict) : Dictionary of dictionaries containing
-                the tool data to write to the file.
+            offset_table (dict) : Dictionary of lists containing
+                the offsets to write.
             columns (str | list) : A list of data columns to write.
                 If `None` will use the value of ``self.columns``.
         """
+        columns = self.validateColumns(columns) or self.columns
+
         self.g5x_offset_table = offset_table
 
+        mdi_list = []
+        changed_rows = []  # (row index, {column index: offset})
         for index in range(len(self.rows)):
-            mdi_list = list()
-            mdi_list.append("G10 L2")
-            mdi_list.append("P{}".format(index+1))
+            offsets = offset_table[index]
+            loaded = self._loaded_offsets[index]
 
+            items = []
+            changes = {}
             for char in columns:
+                column_index = self.COLUMN_LABELS.index(char)
+                if offsets[column_index] != loaded[column_index]:
+                    items.append("{}{}".format(char, offsets[column_index]))
+                    changes[column_index] = offsets[column_index]
 
-                column_index = self.columns.index(char)
+            if items:
+                mdi_list.append("G10 L2 P{} {}".format(index + 1, " ".join(items)))
+                changed_rows.append((index, changes))
 
-                mdi_list.append("{}{}".format(char, self.g5x_offset_table[index][column_index]))
+        if not mdi_list:
+            LOG.debug("No offsets changed, nothing to save")
+            return
 
-            mdi_command = " ".join(mdi_list)
+        commands = issue_mdi(";".join(mdi_list))
+        if commands is None:
+            # no MDI executor, so there is no way to tell if the commands
+            # succeeded, assume they did
+            for index, changes in changed_rows:
+                self._onOffsetsWritten(index, changes, True)
+            return
 
-            issue_mdi(mdi_command)
+        # the offsets only count as saved once LinuxCNC has accepted them
+        for (index, changes), mdi in zip(changed_rows, commands):
+            mdi.onFinished(lambda success, index=index, changes=changes:
+                           self._offsets_written.emit(index, changes, success))
+
+    def _onOffsetsWritten(self, index, changes, success):
+        loaded = self._loaded_offsets[index]
+        if success:
+            for column_index, offset in changes.items():
+                loaded[column_index] = offset
+            return
+
+        LOG.error("Failed to set the %s offsets, reverting the changes",
+                  self.ROW_LABELS[index])
+
+        # put back the offsets LinuxCNC still has, unless edited again since
+        offsets = self.g5x_offset_table[index]
+        for column_index, offset in changes.items():
+            if offsets[column_index] == offset:
+                offsets[column_index] = loaded[column_index]
+
+        self.offset_table_changed.emit(self.g5x_offset_table)
@@ -1,4 +1,36 @@
+"""Persistent Data Manager Plugin
+
+Stores data which should persist between sessions, such as the settings,
+the notification history and the tool in the spindle.
+
+Changes are saved in the background shortly after they are made, rather
+than only on exit, so that they are not lost if the VCP crashes. Saves are
+debounced, so a burst of changes results in a single write, and never block
+the GUI. The ``pickle`` and ``json`` methods rewrite the whole file
+atomically (temp file, fsync and rename), so the file is never left
+truncated. The ``sqlite`` method stores each key in its own row and only
+writes the keys which changed.
+
+Persistent Data Manager YAML configuration:
+
+.. code-block:: yaml
+
+    data_plugins:
+      persistent_data_manager:
+        provider: qtpyvcp.plugins.persistent_data_manager:PersistentDataManager
+        kwargs:
+          # serialization method to use: json, pickle or sqlite
+          serialization_method: pickle
+          # persistence_file: .vcp_data.json
+          # delay after the last change before saving, in seconds
+          save_delay: 1.0
+"""
+
 import os
+import time
+import pickle
+import sqlite3
+import threading
 
 from qtpyvcp.utilities.misc import normalizePath
 from qtpyvcp.utilities.logger import getLogger
@@ -7,48 +39,264 @@ from qtpyvcp.plugins import Plugin
 LOG = getLogger(__name__)
 
 
+class FileStore(object):
+    """Stores all the data in a single file, which is rewritten atomically.
+
+    Args:
+        path (str) : Path of the file.
+        serialization_method (str) : Either ``pickle`` or ``json``.
+    """
+    def __init__(self, path, serialization_method='pickle'):
+        self.path = path
+        self.serialization_method = serialization_method
+
+    def load(self):
+        if not os.path.isfile(self.path):
+            return {}
+
+        with open(self.path, 'rb') as fh:
+            str_data = fh.read()
+
+        if self.serialization_method == 'json':
+            import json
+            return json.loads(str_data.decode('utf-8'))
+        return pickle.loads(str_data)
+
+    def save(self, data, changed):
+        if self.serialization_method == 'json':
+            import json
+            str_data = json.dumps(data, indent=4, sort_keys=True).encode('utf-8')
+        else:
+            str_data = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+
+        temp_file = '{}.{}.tmp'.format(self.path, os.getpid())
+        try:
+            with open(temp_file, 'wb') as fh:
+                fh.write(str_data)
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.rename(temp_file, self.path)
+        finally:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+
+        # make sure the rename itself is on disk
+        try:
+            dir_fd = os.open(os.path.dirname(self.path) or '.', os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(dir_fd)
+        except OSError:
+            pass
+        finally:
+            os.close(dir_fd)
+
+
+class SQLiteStore(object):
+    """Stores each key in a row of an SQLite database, only the keys
+    which changed are written.
+
+    Args:
+        path (str) : Path of the database file.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._written = {}  # key: last written blob
+
+    def _connect(self):
+        # connections can only be used from the thread that created them
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE IF NOT EXISTS data "
+                     "(key TEXT PRIMARY KEY, value BLOB NOT NULL)")
+        return conn
+
+    def load(self):
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT key, value FROM data").fetchall()
+        finally:
+            conn.close()
+
+        data = {}
+        for key, blob in rows:
+            try:
+                data[key] = pickle.loads(bytes(blob))
+                self._written[key] = bytes(blob)
+            except Exception:
+                LOG.exception("Error reading persistent data for key: %s", key)
+        return data
+
+    def save(self, data, changed):
+        rows = []
+        for key in changed:
+            blob = pickle.dumps(data[key], protocol=pickle.HIGHEST_PROTOCOL)
+            if self._written.get(key) != blob:
+                rows.append((key, blob))
+
+        if not rows:
+            return
+
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO data (key, value) VALUES (?, ?)",
+                                 [(key, sqlite3.Binary(blob)) for key, blob in rows])
+        finally:
+            conn.close()
+
+        for key, blob in rows:
+            self._written[key] = blob
+
+
 class PersistentDataManager(Plugin):
-    def __init__(self, serialization_method='pickle', persistence_file=None):
+    def __init__(self, serialization_method='pickle', persistence_file=None,
+                 save_delay=1.0):
         super(PersistentDataManager, self).__init__()
 
         self.serialization_method = serialization_method
+        self.save_delay = save_delay
 
         if not persistence_file:
             persistence_file = '.vcp_persistent_data.' + serialization_method
 
-        if serialization_method == 'json':
-            import json
-            self.serializer = json
-        else:
-            import pickle
-            self.serializer = pickle
-
         self.data = {}
         self.persistence_file = normalizePath(path=persistence_file,
                                               base=os.getenv('CONFIG_DIR', '~/'))
 
+        if serialization_method == 'sqlite':
+            self.store = SQLiteStore(self.persistence_file)
+        else:
+            self.store = FileStore(self.persistence_file, serialization_method)
+
+        # the data as last serialized, only used under the save lock
+        self._snapshot = {}
+        self._changed = set()
+        self._sources = {}  # name: function to get the data when saving
+
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._change_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._writer = None
+
     def getData(self, name, default=None):
+        source = self._sources.get(name)
+        if source is not None:
+            return source()
         return self.data.get(name, default)
 
     def setData(self, name, data):
-        self.data[name] = data
+        """Set the data for a key, it will be saved in the background.
+
+        The data is serialized later on the writer thread, so it must not be
+        modified after it has been set. To change it set a new object.
+
+        Args:
+            name (str) : The key.
+            data : The data, must be serializable by the serialization method.
+        """
+        with self._lock:
+            self.data[name] = data
+            self._changed.add(name)
+
+        self._change_event.set()
+
+    def setDataSource(self, name, source):
+        """Set a function to get the data for a key when it is saved.
+
+        Use this for data which changes often, call :py:meth:`markChanged`
+        after each change and the data is only got and serialized once per
+        save, on the writer thread, so ``source`` must be safe to call from
+        another thread.
+
+        Args:
+            name (str) : The key.
+            source (function) : Returns the data to save.
+        """
+        with self._lock:
+            self._sources[name] = source
+
+    def markChanged(self, name):
+        """Mark the data for a key as changed, it will be saved in the background.
+
+        Args:
+            name (str) : The key.
+        """
+        with self._lock:
+            self._changed.add(name)
+
+        self._change_event.set()
+
+    def save(self):
+        """Save any pending changes now, blocking until they are written."""
+        with self._save_lock:
+            with self._lock:
+                if not self._changed:
+                    return
+                changed = self._changed
+                self._changed = set()
+                sources = {}
+                for name in changed:
+                    if name in self._sources:
+                        sources[name] = self._sources[name]
+                    elif name in self.data:
+                        self._snapshot[name] = self.data[name]
+                changed &= set(self._snapshot) | set(sources)
+
+            LOG.debug("Writing persistent data to file: %s", self.persistence_file)
+            try:
+                for name, source in sources.items():
+                    self._snapshot[name] = source()
+                self.store.save(self._snapshot, changed)
+            except Exception:
+                LOG.exception("Error writing persistent data to file: %s",
+                              self.persistence_file)
+                with self._lock:
+                    self._changed.update(changed)
+
+    def preInitialise(self):
+        try:
+            self.data = self.store.load()
+        except Exception:
+            LOG.exception("Error reading persistent data from file: %s",
+                          self.persistence_file)
+
+        self._snapshot = dict(self.data)
 
     def initialise(self):
-        if os.path.isfile(self.persistence_file):
-            with open(self.persistence_file, 'r') as fh:
-                try:
-                    self.data = self.serializer.loads(fh.read())
-                except:
-                    LOG.exception("Error reading persistent data from file: %s",
-                                  self.persistence_file)
+        self._writer = threading.Thread(target=self._writeLoop,
+                                        name='persistent-data-writer')
+        self._writer.daemon = True
+        self._writer.start()
+
+        self._initialized = True
 
     def terminate(self):
-        LOG.debug("Writing persistent data to file: %s", self.persistence_file)
-        if self.serialization_method == 'json':
-            str_data = self.serializer.dumps(self.data, indent=4, sort_keys=True)
-        else:
-            str_data = self.serializer.dumps(self.data,
-                                             protocol=self.serializer.HIGHEST_PROTOCOL)
+        self._stop_event.set()
+        self._change_event.set()
+        if self._writer is not None:
+            self._writer.join()
+
+        # save all the data, in case any of it was modified
+        # in place without calling setData
+        with self._lock:
+            self._changed.update(self.data)
+            self._changed.update(self._sources)
+
+        self.save()
+
+    def _writeLoop(self):
+        while not self._stop_event.is_set():
+            self._change_event.wait()
+            self._change_event.clear()
+
+            # wait until no more changes are made for the save delay, but
+            # don't hold off saving indefinitely if changes keep coming
+            deadline = time.time() + self.save_delay * 10
+            while not self._stop_event.is_set() and time.time() < deadline and \
+                    self._change_event.wait(self.save_delay):
+                self._change_event.clear()
 
-        with open(self.persistence_file, 'w') as fh:
-            fh.write(str_data)
+            if not self._stop_event.is_set():
+                self.save()
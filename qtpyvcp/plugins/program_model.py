@@ -0,0 +1,387 @@
+"""Program Model data plugin.
+
+Loads the G-code program once, each time a new (or changed) program is
+loaded in LinuxCNC, and shares the result with all the widgets that need
+it, so that the editors, backplots and run-from-line don't each re-read
+and re-process the file.
+
+The preview (the tool path and the interpreter state for each line) is
+only generated the first time it is requested for a given program. The
+preview of the last program is also cached on disk, so it does not need
+to be regenerated when the VCP is restarted with the same program, tool
+table and parameters.
+
+Program Model YAML configuration:
+
+.. code-block:: yaml
+
+    data_plugins:
+      program_model:
+        provider: qtpyvcp.plugins.program_model:ProgramModel
+"""
+
+import os
+import pickle
+import hashlib
+import threading
+from bisect import bisect_right
+
+from qtpyvcp.utilities.info import Info
+from qtpyvcp.utilities.logger import getLogger
+from qtpyvcp.utilities.misc import cacheDir
+from qtpyvcp.plugins import DataPlugin, DataChannel, getPlugin
+
+LOG = getLogger(__name__)
+INFO = Info()
+STATUS = getPlugin('status')
+
+IN_DESIGNER = os.getenv('DESIGNER', False)
+
+
+def makePreviewCanon():
+    """Create a canon that records the program preview.
+
+    The canon is created lazily so the ``gcode`` module is only needed
+    once a preview is actually requested.
+    """
+    from qtpyvcp.widgets.display_widgets.vtk_backplot.base_canon import StatCanon
+
+    class PreviewCanon(StatCanon):
+        """Records the path segments, offset and tool changes, as well as
+        a snapshot of the interpreter state for each line where it changes.
+
+        The path points are recorded in program coordinates, consumers can
+        apply the recorded offsets as needed.
+        """
+        def __init__(self, *args, **kwargs):
+            super(PreviewCanon, self).__init__(*args, **kwargs)
+
+            self.events = []
+            self.line_metadata = {}
+            self._last_snapshot = None
+
+        def next_line(self, st):
+            super(PreviewCanon, self).next_line(st)
+
+            snapshot = {
+                'gcodes': tuple(st.gcodes),
+                'mcodes': tuple(st.mcodes),
+                'origin': st.origin,
+                'feed_rate': st.feed_rate,
+                'speed': st.speed,
+                'tool': self.tools[0][0],
+            }
+
+            last = self._last_snapshot
+            if snapshot != last:
+                metadata = snapshot.copy()
+                metadata['tool_change'] = last is not None and last['tool'] != snapshot['tool']
+                metadata['wcs_change'] = last is not None and last['origin'] != snapshot['origin']
+                self.line_metadata[self.seq_num] = metadata
+                self._last_snapshot = snapshot
+
+        def comment(self, comment):
+            items = comment.lower().split(',', 1)
+            if len(items) > 1 and items[0] in ['axis', 'backplot']:
+                cmd = items[1].strip()
+                if cmd == "hide":
+                    self.suppress += 1
+                elif cmd == "show":
+                    self.suppress -= 1
+                elif cmd == 'stop':
+                    LOG.info("Preview generation aborted.")
+                    raise KeyboardInterrupt
+
+        def rotate_and_translate(self, x, y, z, a, b, c, u, v, w):
+            return x, y, z, a, b, c, u, v, w
+
+        def set_g5x_offset(self, index, x, y, z, a, b, c, u, v, w):
+            self.events.append(('g5x', self.seq_num, index, (x, y, z, a, b, c, u, v, w)))
+
+        def set_g92_offset(self, x, y, z, a, b, c, u, v, w):
+            self.events.append(('g92', self.seq_num, (x, y, z, a, b, c, u, v, w)))
+
+        def set_xy_rotation(self, rotation):
+            self.events.append(('rotation', self.seq_num, rotation))
+
+        def change_tool(self, pocket):
+            super(PreviewCanon, self).change_tool(pocket)
+            self.events.append(('tool', self.seq_num, pocket))
+
+        def add_path_point(self, line_type, start_point, end_point):
+            self.events.append(('path', self.seq_num, line_type, start_point, end_point))
+
+    return PreviewCanon
+
+
+class ProgramModel(DataPlugin):
+    """Shared model of the loaded G-code program."""
+
+    def __init__(self):
+        super(ProgramModel, self).__init__()
+
+        self._loaded_key = None
+        self._preview_loader = None
+        self._preview = None
+        self._line_metadata = None
+        self._metadata_lines = []
+
+    @DataChannel
+    def file(self, chan):
+        """Path of the program in the model
+
+        The signal is emitted once the program has been loaded, and only
+        if the program has actually changed.
+
+        :returns: the program path
+        :rtype: str
+        """
+        return chan.value
+
+    @DataChannel
+    def text(self, chan):
+        """Program text
+
+        :returns: the program text
+        :rtype: str
+        """
+        return chan.value
+
+    @DataChannel
+    def line_index(self, chan):
+        """Start offset in the program text of each line
+
+        :returns: line start offsets
+        :rtype: list
+        """
+        return chan.value
+
+    @DataChannel
+    def line_metadata(self, chan):
+        """Interpreter state snapshots
+
+        A dict keyed by line number with a snapshot of the active G-codes,
+        M-codes, origin, feed, speed and tool for each line on which any of
+        these change, and whether the line changes the tool or the WCS.
+
+        :returns: line metadata
+        :rtype: dict
+        """
+        self._loadPreview()
+        return self._line_metadata or {}
+
+    @DataChannel
+    def preview(self, chan):
+        """Program preview
+
+        List of the preview events in program order. Each event is a tuple
+        whose first two items are the event type and the line number:
+
+        * ``('path', line, line_type, start_point, end_point)``
+        * ``('g5x', line, index, offsets)``
+        * ``('g92', line, offsets)``
+        * ``('rotation', line, rotation)``
+        * ``('tool', line, pocket)``
+
+        :returns: preview events
+        :rtype: list
+        """
+        self._loadPreview()
+        return self._preview or []
+
+    def initialise(self):
+        STATUS.file.notify(self.loadProgram)
+        fname = STATUS.file.value
+        if fname:
+            self.loadProgram(fname)
+
+        self._initialized = True
+
+    def loadProgram(self, fname):
+        """Load a program into the model, if it is not already loaded.
+
+        Args:
+            fname (str) : Path of the program to load.
+        """
+        if not fname or not os.path.isfile(fname):
+            return
+
+        key = self._fileKey(fname)
+        if key == self._loaded_key:
+            LOG.debug("Program already loaded: %s", fname)
+            return
+
+        self._loaded_key = key
+
+        LOG.debug("Loading program: %s", fname)
+        with open(fname) as fh:
+            text = fh.read()
+
+        line_index = [0]
+        pos = text.find('\n')
+        while pos != -1:
+            line_index.append(pos + 1)
+            pos = text.find('\n', pos + 1)
+
+        # invalidate the preview, it is regenerated on request
+        self._preview = None
+        self._line_metadata = None
+        self._metadata_lines = []
+
+        self.text.value = text
+        self.line_index.value = line_index
+
+        self.file.setValue(fname)
+
+    def isLoaded(self, fname):
+        """Check whether the model holds the current contents of a file.
+
+        Args:
+            fname (str) : Path of the program.
+
+        Returns:
+            bool : True if the file is loaded and has not changed since.
+        """
+        try:
+            return self._fileKey(fname) == self._loaded_key
+        except OSError:
+            return False
+
+    def getLine(self, line):
+        """Get the text of a line.
+
+        Args:
+            line (int) : Line number (1 based).
+
+        Returns:
+            str : The text of the line, without the line ending.
+        """
+        index = self.line_index.value
+        if not index or not 0 < line <= len(index):
+            return ''
+
+        start = index[line - 1]
+        end = index[line] if line < len(index) else len(self.text.value)
+        return self.text.value[start:end].rstrip('\r\n')
+
+    def getLineState(self, line):
+        """Get the interpreter state at a line, e.g. for run-from-line.
+
+        Args:
+            line (int) : Line number.
+
+        Returns:
+            dict : The most recent state snapshot at or before the line,
+                or None if there is none.
+        """
+        metadata = self.line_metadata.getValue()
+        pos = bisect_right(self._metadata_lines, line)
+        if pos == 0:
+            return None
+        return metadata[self._metadata_lines[pos - 1]]
+
+    def replayPreview(self, canon):
+        """Replay the preview into a canon, as if it had been fed by the
+        interpreter. The canon should not apply offsets itself.
+
+        Args:
+            canon : The canon to replay the preview into.
+        """
+        for event in self.preview.getValue():
+            kind = event[0]
+            if kind == 'path':
+                canon.add_path_point(*event[2:])
+            elif kind == 'g5x':
+                canon.set_g5x_offset(event[2], *event[3])
+            elif kind == 'g92':
+                canon.set_g92_offset(*event[2])
+            elif kind == 'rotation':
+                canon.set_xy_rotation(event[2])
+            elif kind == 'tool':
+                canon.change_tool(event[2])
+
+    def _fileKey(self, fname):
+        stat = os.stat(fname)
+        return fname, stat.st_mtime, stat.st_size
+
+    def _loadPreview(self):
+        if self._preview is not None or self.file.value is None or IN_DESIGNER:
+            return
+
+        preview_key = self._previewKey()
+        if self._loadCachedPreview(preview_key):
+            return
+
+        from qtpyvcp.widgets.display_widgets.vtk_backplot.base_backplot import BaseBackPlot
+
+        try:
+            if self._preview_loader is None:
+                self._preview_loader = BaseBackPlot(canon=makePreviewCanon())
+
+            self._preview_loader.load(self.file.value)
+            canon = self._preview_loader.canon
+        except Exception:
+            LOG.exception("Error generating program preview")
+            canon = None
+
+        if canon is None:
+            self._preview = []
+            self._line_metadata = {}
+        else:
+            self._preview = canon.events
+            self._line_metadata = canon.line_metadata
+
+            # the preview is not modified once generated, so can be
+            # written out while the GUI carries on
+            writer = threading.Thread(target=self._saveCachedPreview,
+                                      args=(preview_key, self._preview, self._line_metadata))
+            writer.daemon = True
+            writer.start()
+
+        self._metadata_lines = sorted(self._line_metadata)
+
+    def _previewKey(self):
+        # the preview also depends on the tool table and on the parameters
+        # (offsets etc.), the var file is rewritten on each LinuxCNC
+        # shutdown so use the contents rather than the mtime
+        param_file = os.path.join(INFO.CONFIG_DIR, INFO.getParameterFile() or 'linuxcnc.var')
+        key = hashlib.sha1(repr((INFO.INI_FILE, self._loaded_key)).encode('utf-8'))
+        for fname in (param_file, INFO.getToolTableFile()):
+            try:
+                with open(fname, 'rb') as fh:
+                    key.update(fh.read())
+            except (IOError, OSError):
+                pass
+        return key.hexdigest()
+
+    def _previewCacheFile(self):
+        return os.path.join(cacheDir('preview'), 'last_program.pickle')
+
+    def _loadCachedPreview(self, preview_key):
+        try:
+            with open(self._previewCacheFile(), 'rb') as fh:
+                key, preview, line_metadata = pickle.load(fh)
+        except Exception:
+            return False
+
+        if key != preview_key:
+            return False
+
+        LOG.debug("Using cached preview for: %s", self.file.value)
+        self._preview = preview
+        self._line_metadata = line_metadata
+        self._metadata_lines = sorted(line_metadata)
+        return True
+
+    def _saveCachedPreview(self, preview_key, preview, line_metadata):
+        cache_file = self._previewCacheFile()
+        temp_file = '{}.{}.tmp'.format(cache_file, os.getpid())
+        try:
+            with open(temp_file, 'wb') as fh:
+                pickle.dump((preview_key, preview, line_metadata), fh,
+                            pickle.HIGHEST_PROTOCOL)
+            os.rename(temp_file, cache_file)
+        except Exception:
+            LOG.debug("Could not write preview cache: %s", cache_file, exc_info=True)
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
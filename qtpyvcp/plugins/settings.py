@@ -39,7 +39,15 @@ class Settings(DataPlugin):
             except KeyError:
                 pass
 
+        # save changes as they are made
+        for obj in SETTINGS.values():
+            if obj.persistent == True:
+                obj.notify(lambda *args: self.saveSettings())
+
     def terminate(self):
+        self.saveSettings()
+
+    def saveSettings(self):
         settings = {}
         for key, obj in SETTINGS.items():
             if obj.persistent == True:
@@ -26,17 +26,14 @@ class Status(DataPlugin):
 
         self.file_watcher = None
 
-        # recent files
+        # recent files, loaded in preInitialise
         self.max_recent_files = 10
-        with RuntimeConfig('~/.axis_preferences') as rc:
-            files = rc.get('DEFAULT', 'recentfiles', default=[])
-        files = [file for file in files if os.path.exists(file)]
-        self.recent_files.setValue(files)
+        self._recent_files = []
 
-        # MDI history
+        # MDI history, loaded in preInitialise
         self._max_mdi_history_length = 100
         self._mdi_history_file = INFO.getMDIHistoryFile()
-        self.loadMdiHistory(self._mdi_history_file)
+        self._mdi_history = []
 
         self.jog_increment = 0  # jog
         self.step_jog_increment = INFO.getIncrements()[0]
@@ -91,8 +88,8 @@ class Status(DataPlugin):
 
     recent_files = DataChannel(doc='List of recently loaded files', settable=True, data=[])
 
-    def loadMdiHistory(self, fname):
-        """Load MDI history from file."""
+    def readMdiHistory(self, fname):
+        """Read MDI history from file, most recent command first."""
         mdi_history = []
         if os.path.isfile(fname):
             with open(fname, 'r') as fh:
@@ -101,7 +98,11 @@ class Status(DataPlugin):
                     mdi_history.append(line)
 
         mdi_history.reverse()
-        self.mdi_history.setValue(mdi_history)
+        return mdi_history
+
+    def loadMdiHistory(self, fname):
+        """Load MDI history from file."""
+        self.mdi_history.setValue(self.readMdiHistory(fname))
 
     def saveMdiHistory(self, fname):
         """Write MDI history to file."""
@@ -662,9 +663,20 @@ class Status(DataPlugin):
         # TODO: add to this list as needed. Possible to externalise via yaml?
         self.old['axes'] = None
 
+    def preInitialise(self):
+        """Read the recent files and the MDI history."""
+        with RuntimeConfig('~/.axis_preferences') as rc:
+            files = rc.get('DEFAULT', 'recentfiles', default=[])
+        self._recent_files = [file for file in files if os.path.exists(file)]
+
+        self._mdi_history = self.readMdiHistory(self._mdi_history_file)
+
     def initialise(self):
         """Start the periodic update timer."""
 
+        self.recent_files.setValue(self._recent_files)
+        self.mdi_history.setValue(self._mdi_history)
+
         # watch the gcode file for changes and reload as needed
         self.file_watcher = QFileSystemWatcher()
         if self.file.value:
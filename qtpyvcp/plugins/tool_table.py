@@ -19,10 +19,15 @@ Tool Table YAML configuration:
             -------------------
 
             QtPyVCP will preserve comments before the opening semicolon.
+          # delay after the last change before writing the tool table
+          # file, in seconds
+          save_delay: 0.5
 """
 
 import os
 import re
+import csv
+import json
 from itertools import takewhile
 from datetime import datetime
 
@@ -32,6 +37,7 @@ from qtpy.QtCore import QFileSystemWatcher, QTimer, Signal, Slot
 
 import qtpyvcp
 from qtpyvcp.utilities.info import Info
+from qtpyvcp.utilities.misc import fileSignature
 from qtpyvcp.utilities.logger import getLogger
 from qtpyvcp.actions.machine_actions import issue_mdi
 from qtpyvcp.plugins import DataPlugin, DataChannel, getPlugin
@@ -52,6 +58,13 @@ def merge(a, b):
     return r
 
 
+def encodeText(value):
+    """Encode unicode text as UTF-8, other values are returned unchanged"""
+    if isinstance(value, basestring) and not isinstance(value, str):
+        return value.encode('utf-8')
+    return value
+
+
 DEFAULT_TOOL = {
     'A': 0.0,
     'B': 0.0,
@@ -108,6 +121,13 @@ INT_COLUMN_WIDTH = 6
 FLOAT_COLUMN_WIDTH = 12
 FLOAT_DECIMAL_PLACES = 6
 
+# column IDs by lower case column ID and label, for reading tool records
+COLUMN_IDS = dict([(col.lower(), col) for col in COLUMN_LABELS] +
+                  [(label.lower(), col) for col, label in COLUMN_LABELS.items()])
+
+# a descriptor letter followed by its value, e.g. `T1` or `Z +0.5`
+TOKEN_RE = re.compile(r"([A-Za-z])\s*([-+]?[0-9.]+)")
+
 
 def makeLorumIpsumToolTable():
     return {i: merge(DEFAULT_TOOL,
@@ -118,13 +138,17 @@ def makeLorumIpsumToolTable():
 class ToolTable(DataPlugin):
 
     TOOL_TABLE = {0: NO_TOOL}
+    TOOL_NUMBERS = []  # sorted tool numbers, excluding the spindle
     DEFAULT_TOOL = DEFAULT_TOOL
     COLUMN_LABELS = COLUMN_LABELS
 
     tool_table_changed = Signal(dict)
+    # emitted with the tool number and the new tool data, or None
+    # if the tool was removed
+    tool_changed = Signal(int, object)
 
     def __init__(self, columns='TPXYZABCUVWDIJQR', file_header_template=None,
-                 remember_tool_in_spindle=True):
+                 remember_tool_in_spindle=True, save_delay=0.5):
         super(ToolTable, self).__init__()
 
         self.fs_watcher = None
@@ -138,18 +162,20 @@ class ToolTable(DataPlugin):
         self.setCurrentToolNumber(0)
 
         self.tool_table_file = INFO.getToolTableFile()
-        if not os.path.exists(self.tool_table_file):
-            return
+        self._preloaded_tool_table = None
+        self._file_signature = None
+        self._disk_table = {}  # the tool table as last read or written
+        self._line_cache = {}  # tool table line: parsed tool
 
-        self.loadToolTable()
-
-        self.current_tool.setValue(self.TOOL_TABLE[STATUS.tool_in_spindle.getValue()])
-
-        # update signals
-        STATUS.tool_in_spindle.notify(self.setCurrentToolNumber)
-        STATUS.tool_table.notify(lambda *args: self.loadToolTable())
+        self.save_delay = save_delay
+        self._pending_save = None  # (tool file, lines, table, columns)
+        self._save_timer = QTimer(self)
+        self._save_timer.setSingleShot(True)
+        self._save_timer.timeout.connect(self.writePendingToolTable)
 
-        STATUS.all_axes_homed.notify(self.reload_tool)
+        if IN_DESIGNER:
+            # plugins are not initialised in QtDesigner
+            self.loadToolTable()
 
     def reload_tool(self):
         if self.remember_tool_in_spindle and STATUS.all_axes_homed.value and STATUS.enabled.value:
@@ -196,12 +222,32 @@ class ToolTable(DataPlugin):
             return self.TOOL_TABLE[STAT.tool_in_spindle]
         return self.TOOL_TABLE[STAT.tool_in_spindle].get(item[0].upper())
 
+    def preInitialise(self):
+        # read the tool table off the GUI thread, it is applied in initialise
+        if os.path.exists(self.tool_table_file):
+            self._preloaded_tool_table = self.readToolTable(self.tool_table_file)
+
     def initialise(self):
         self.fs_watcher = QFileSystemWatcher()
         self.fs_watcher.addPath(self.tool_table_file)
         self.fs_watcher.fileChanged.connect(self.onToolTableFileChanged)
 
+        if not os.path.exists(self.tool_table_file):
+            return
+
+        self.loadToolTable(preloaded=self._preloaded_tool_table)
+        self._preloaded_tool_table = None
+
+        # update signals
+        STATUS.tool_in_spindle.notify(self.setCurrentToolNumber)
+        STATUS.tool_in_spindle.notify(
+            lambda tnum: self.data_manager.setData('tool-in-spindle', tnum))
+        STATUS.tool_table.notify(lambda *args: self.reloadToolTable())
+
+        STATUS.all_axes_homed.notify(self.reload_tool)
+
     def terminate(self):
+        self.writePendingToolTable()
         self.data_manager.setData('tool-in-spindle', STAT.tool_in_spindle)
 
     @staticmethod
@@ -242,102 +288,463 @@ class ToolTable(DataPlugin):
         self.current_tool.setValue(self.TOOL_TABLE[tool_num])
 
     def reloadToolTable(self):
+        """Re-load the tool table file if it has changed since it was last
+        loaded or saved, only notifying of the tools which changed."""
         # rewatch the file if it stop being watched because it was deleted
         if self.tool_table_file not in self.fs_watcher.files():
             self.fs_watcher.addPath(self.tool_table_file)
 
-        # reload with the new data
-        tool_table = self.loadToolTable()
-        self.tool_table_changed.emit(tool_table)
+        if not os.path.exists(self.tool_table_file):
+            return
+
+        # the file watcher and the status tool_table change both fire for
+        # the same change, as do our own saves, so only parse the file once
+        if fileSignature(self.tool_table_file) == self._file_signature:
+            return
+
+        if self._pending_save is not None and \
+                self._pending_save[0] == self.tool_table_file:
+            # changed, e.g. by a G10 L1, before our edits were written
+            self.mergePendingToolTable()
+            return
+
+        self.loadToolTable(emit_unchanged=False)
+
+    def mergePendingToolTable(self):
+        """Merge the pending edits into the tool table file as it is now.
+
+        The tools which were edited since the file was last read or
+        written replace those in the file, the other tools are taken
+        from the file, then the merged table is saved instead.
+        """
+        tool_file, lines, edited, columns = self._pending_save
+        table, header_lines, signature = self.readToolTable(tool_file)
+
+        merged = table.copy()
+        base = self._disk_table
+        for tnum in set(edited) | set(base):
+            if edited.get(tnum) == base.get(tnum):
+                continue
+            if tnum in edited:
+                merged[tnum] = edited[tnum]
+            else:
+                merged.pop(tnum, None)
+
+        LOG.debug("Tool table file changed while a save was pending, merging")
+
+        if header_lines is not None:
+            self.orig_header_lines = header_lines
+        self._file_signature = signature
+        self._disk_table = table
+
+        lines = self.formatToolTable(merged, columns)
+        merged, header_lines = self.parseToolTable(lines)
+        self._pending_save = (tool_file, lines, merged, columns)
+        self.updateToolTable(merged, emit_unchanged=False)
 
     def iterTools(self, tool_table=None, columns=None):
-        tool_table = tool_table or self.TOOL_TABLE
+        if tool_table:
+            tool_nums = sorted(tool_table.iterkeys())
+        else:
+            tool_table = self.TOOL_TABLE
+            tool_nums = [0] + self.TOOL_NUMBERS
         columns = self.validateColumns(columns) or self.columns
-        for tool in sorted(tool_table.iterkeys()):
+        for tool in tool_nums:
             tool_data = tool_table[tool]
             yield [tool_data[key] for key in columns]
 
-    def loadToolTable(self, tool_file=None):
+    def loadToolTable(self, tool_file=None, preloaded=None, emit_unchanged=True):
+        """Load the tool table and notify of the new data.
 
+        Args:
+            tool_file (str) : Path of the tool table file to load.
+                Defaults to ``self.tool_table_file``.
+            preloaded (tuple) : The ``(table, header_lines, signature)``
+                already read by :py:meth:`readToolTable`, if any.
+            emit_unchanged (bool) : Whether to emit ``tool_table_changed``
+                even if no tools changed.
+        """
         if tool_file is None:
             tool_file = self.tool_table_file
 
-        if not os.path.exists(tool_file):
-            if IN_DESIGNER:
-                lorum_tooltable = makeLorumIpsumToolTable()
-                self.current_tool.setValue(lorum_tooltable)
-                return lorum_tooltable
-            LOG.critical("Tool table file does not exist: {}".format(tool_file))
-            return {}
+        if preloaded is None:
+            if not os.path.exists(tool_file):
+                if IN_DESIGNER:
+                    lorum_tooltable = makeLorumIpsumToolTable()
+                    self.current_tool.setValue(lorum_tooltable)
+                    return lorum_tooltable
+                LOG.critical("Tool table file does not exist: {}".format(tool_file))
+                return {}
+
+            preloaded = self.readToolTable(tool_file)
+
+        table, header_lines, signature = preloaded
+        if header_lines is not None:
+            self.orig_header_lines = header_lines
 
+        if tool_file == self.tool_table_file:
+            self._file_signature = signature
+            self._disk_table = table
+
+        self.updateToolTable(table, emit_unchanged)
+        return table.copy()
+
+    def updateToolTable(self, table, emit_unchanged=True):
+        """Set the loaded tool table, notifying of the tools which changed.
+
+        ``tool_changed`` is emitted for each tool which was added, changed
+        or removed, followed by ``tool_table_changed`` if any did.
+
+        Args:
+            table (dict) : The new tool table.
+            emit_unchanged (bool) : Whether to emit ``tool_table_changed``
+                even if no tools changed.
+        """
+        old_table = self.TOOL_TABLE
+
+        changed = [tnum for tnum, tool in table.iteritems()
+                   if old_table.get(tnum) != tool]
+        removed = [tnum for tnum in old_table if tnum not in table]
+
+        # update tooltable
+        self.__class__.TOOL_TABLE = table
+        self.__class__.TOOL_NUMBERS = sorted(tnum for tnum in table if tnum != 0)
+
+        if changed or removed:
+            LOG.debug("Tool table changed, %i tools changed and %i removed",
+                      len(changed), len(removed))
+
+        self.current_tool.setValue(self.TOOL_TABLE[STATUS.tool_in_spindle.getValue()])
+
+        for tnum in sorted(changed):
+            self.tool_changed.emit(tnum, table[tnum])
+        for tnum in sorted(removed):
+            self.tool_changed.emit(tnum, None)
+
+        if changed or removed or emit_unchanged:
+            self.tool_table_changed.emit(table)
+
+    def readToolTable(self, tool_file):
+        """Read and parse a tool table file.
+
+        This does not change the loaded tool table, so is safe to call
+        from any thread.
+
+        Args:
+            tool_file (str) : Path of the tool table file to read.
+
+        Returns:
+            tuple : The tool table dict, the header lines before the
+                table, or None if the file has no header, and the
+                signature of the file that was read.
+        """
+        signature = fileSignature(tool_file)
         with open(tool_file, 'r') as fh:
-            lines = [line.strip() for line in fh.readlines()]
+            lines = fh.read().splitlines()
+
+        table, header_lines = self.parseToolTable(lines)
+        return table, header_lines, signature
+
+    def parseToolTable(self, lines):
+        """Parse the lines of a tool table file.
+
+        Lines which are unchanged since the last parse are not re-parsed.
+
+        Args:
+            lines (list) : The lines of the tool table file.
+
+        Returns:
+            tuple : The tool table dict, and the header lines before the
+                table, or None if the file has no header.
+        """
+        lines = [line.strip() for line in lines]
 
         # find opening colon, and get header data so it can be restored
+        header_lines = None
         for rlnum, line in enumerate(reversed(lines)):
             if line.startswith(';'):
                 lnum = len(lines) - rlnum
                 raw_header = lines[:lnum]
                 lines = lines[lnum:]
 
-                self.orig_header_lines = list(takewhile(lambda l:
-                                        not l.strip() == '---' and
-                                        not l.startswith(';Tool'), raw_header))
+                header_lines = list(takewhile(lambda l:
+                                    not l.strip() == '---' and
+                                    not l.startswith(';Tool'), raw_header))
                 break
 
+        line_cache = {}
         table = {0: NO_TOOL,}
         for line in lines:
 
-            data, sep, comment = line.partition(';')
-            items = re.findall(r"([A-Z]+[0-9.+-]+)", data.replace(' ', ''))
-
-            tool = DEFAULT_TOOL.copy()
-            for item in items:
-                descriptor = item[0]
-                if descriptor in 'TPXYZABCUVWDIJQR':
-                    value = item[1:]
-                    if descriptor in ('T', 'P', 'Q'):
-                        if descriptor == 'P' and 'P' not in self.columns:
-                            continue
-                        try:
-                            print(value)
-                            tool[descriptor] = int(value)
-                        except:
-                            LOG.error('Error converting value to int: {}'.format(value))
-                            break
-                    else:
-                        try:
-                            tool[descriptor] = float(value)
-                        except:
-                            LOG.error('Error converting value to float: {}'.format(value))
-                            break
-
-            tool['R'] = comment.strip()
+            tool = self._line_cache.get(line)
+            if tool is None:
+                tool = self.parseToolLine(line)
+            line_cache[line] = tool
 
             tnum = tool['T']
             if tnum == -1:
                 continue
 
             # add the tool to the table
-            table[tnum] = tool
+            table[tnum] = tool.copy()
 
-        # update tooltable
-        self.__class__.TOOL_TABLE = table
+        # only keep the lines from this parse, so the cache can't grow
+        self._line_cache = line_cache
 
-        self.current_tool.setValue(self.TOOL_TABLE[STATUS.tool_in_spindle.getValue()])
+        return table, header_lines
 
-        # import json
-        # print json.dumps(table, sort_keys=True, indent=4)
+    def parseToolLine(self, line):
+        """Parse a single tool table line.
 
-        self.tool_table_changed.emit(table)
-        return table.copy()
+        Args:
+            line (str) : The line, e.g. ``T1 P1 Z0.511 D0.125 ;1/8 end mill``
+
+        Returns:
+            dict : The tool data, with ``T`` of -1 if the line has no tool.
+        """
+        data, sep, comment = line.partition(';')
+
+        tool = DEFAULT_TOOL.copy()
+        for match in TOKEN_RE.finditer(data):
+            descriptor, value = match.groups()
+            descriptor = descriptor.upper()
+            if descriptor in ('T', 'P', 'Q'):
+                if descriptor == 'P' and 'P' not in self.columns:
+                    continue
+                try:
+                    tool[descriptor] = int(value)
+                except ValueError:
+                    LOG.error('Error converting value to int: {}'.format(value))
+                    break
+            elif descriptor in tool:
+                try:
+                    tool[descriptor] = float(value)
+                except ValueError:
+                    LOG.error('Error converting value to float: {}'.format(value))
+                    break
+
+        tool['R'] = comment.strip()
+        return tool
 
     def getToolTable(self):
         return self.TOOL_TABLE.copy()
 
+    def getToolNumbers(self):
+        """Get the sorted tool numbers, excluding the spindle (T0)."""
+        return list(self.TOOL_NUMBERS)
+
+    def validateToolRecords(self, records):
+        """Validate and convert tool records, e.g. from a tool presetter.
+
+        Each record is a dict keyed by column ID (``T``, ``Z`` etc.) or
+        column label (``Z Offset`` etc.), case insensitive. The tool number
+        is required, other values are optional and empty values are
+        ignored. Only the configured columns can be set.
+
+        Args:
+            records (iterable) : The tool records.
+
+        Returns:
+            list : A dict of the converted values for each record.
+
+        Raises:
+            ValueError : If any of the records are not valid, listing the
+                problems with all the records.
+        """
+        tools = []
+        errors = []
+        for rnum, record in enumerate(records, 1):
+            tool = {}
+            for key, value in record.items():
+                # JSON gives unicode text, keep it as encoded text like
+                # the values read from the tool table file
+                key, value = encodeText(key), encodeText(value)
+
+                if isinstance(key, basestring):
+                    col = COLUMN_IDS.get(key.strip().lower())
+                else:
+                    col = COLUMN_IDS.get(str(key))
+                if col is None:
+                    errors.append("record {}: unknown column '{}'".format(rnum, key))
+                    continue
+
+                if col != 'T' and col not in self.columns:
+                    errors.append("record {}: column '{}' is not in the configured "
+                                  "columns".format(rnum, key))
+                    continue
+
+                if value is None or (isinstance(value, basestring) and value.strip() == ''):
+                    continue
+
+                try:
+                    if col in 'TPQ':
+                        if isinstance(value, basestring):
+                            tool[col] = int(value.strip())
+                        else:
+                            tool[col] = int(str(value))
+                    elif col == 'R':
+                        if isinstance(value, basestring):
+                            tool[col] = value.strip()
+                        else:
+                            tool[col] = str(value)
+                    else:
+                        tool[col] = float(value)
+                except ValueError:
+                    errors.append("record {}: invalid value for column '{}': {}"
+                                  .format(rnum, key, value))
+
+            tnum = tool.get('T')
+            if tnum is None:
+                errors.append("record {}: no tool number".format(rnum))
+            elif tnum < 1:
+                errors.append("record {}: invalid tool number: {}".format(rnum, tnum))
+
+            tools.append(tool)
+
+        if errors:
+            raise ValueError("Invalid tool records:\n" + '\n'.join(errors))
+
+        return tools
+
+    def importTools(self, records, replace=False):
+        """Apply tool records to the tool table as a single transaction.
+
+        All the records are validated before any are applied, then the
+        tool table file is written and loaded into LinuxCNC once. The
+        loaded tool table is only updated once the file has been written.
+
+        Args:
+            records (iterable) : The tool records, as for
+                :py:meth:`validateToolRecords`.
+            replace (bool) : If True the records replace the whole tool
+                table, otherwise they update the existing tools and add
+                any new ones.
+
+        Returns:
+            int : The number of tools imported.
+
+        Raises:
+            ValueError : If any of the records are not valid, in which
+                case none are applied.
+            IOError : If the tool table file could not be written, in
+                which case none are applied.
+        """
+        tools = self.validateToolRecords(records)
+
+        tool_table = {0: self.TOOL_TABLE[0]}
+        if not replace:
+            tool_table.update(self.TOOL_TABLE)
+
+        for tool in tools:
+            tnum = tool['T']
+            tool_table[tnum] = merge(tool_table.get(tnum, DEFAULT_TOOL), tool)
+
+        # any pending edits are included, so are saved by the import
+        lines = self.formatToolTable(tool_table, self.columns)
+        table, header_lines = self.parseToolTable(lines)
+        self.writeToolTableFile(self.tool_table_file, lines, table)
+
+        if self._pending_save is not None and \
+                self._pending_save[0] == self.tool_table_file:
+            self._save_timer.stop()
+            self._pending_save = None
+
+        self.updateToolTable(table)
+
+        LOG.info("Imported %i tools", len(tools))
+        return len(tools)
+
+    def importToolsFromFile(self, fname, fmt=None, replace=False):
+        """Import tool records from a CSV, JSON or JSON lines file.
+
+        CSV files must have a header row of column IDs or labels. JSON
+        files must contain a list of records, and JSON lines files a
+        record per line.
+
+        Args:
+            fname (str) : Path of the file to read.
+            fmt (str) : ``csv``, ``json`` or ``jsonl``, defaults to the
+                file extension.
+            replace (bool) : See :py:meth:`importTools`.
+
+        Returns:
+            int : The number of tools imported.
+        """
+        fmt = fmt or os.path.splitext(fname)[1].lstrip('.').lower()
+
+        with open(fname, 'r') as fh:
+            if fmt == 'csv':
+                records = list(csv.DictReader(fh))
+            elif fmt == 'json':
+                records = json.load(fh)
+            elif fmt == 'jsonl':
+                records = [json.loads(line) for line in fh if line.strip()]
+            else:
+                raise ValueError("Unknown tool file format: '{}'".format(fmt))
+
+        return self.importTools(records, replace=replace)
+
+    def exportTools(self, fh, fmt='csv', columns=None):
+        """Write the tool table to a file a tool at a time.
+
+        Args:
+            fh (file) : The text file to write to.
+            fmt (str) : ``csv`` or ``jsonl``.
+            columns (str | list) : The columns to write, defaults to the
+                configured columns.
+
+        Returns:
+            int : The number of tools written.
+        """
+        columns = self.validateColumns(columns) or self.columns
+        tool_table = self.TOOL_TABLE
+
+        if fmt == 'csv':
+            writer = csv.writer(fh)
+            writer.writerow(columns)
+        elif fmt != 'jsonl':
+            raise ValueError("Unknown tool file format: '{}'".format(fmt))
+
+        count = 0
+        for tnum in self.TOOL_NUMBERS:
+            tool_data = tool_table[tnum]
+            if fmt == 'csv':
+                writer.writerow([tool_data[col] for col in columns])
+            else:
+                fh.write(json.dumps({col: tool_data[col] for col in columns},
+                                    sort_keys=True))
+                fh.write('\n')
+            count += 1
+
+        return count
+
+    def exportToolsToFile(self, fname, fmt=None, columns=None):
+        """Export the tool table to a CSV or JSON lines file.
+
+        Args:
+            fname (str) : Path of the file to write.
+            fmt (str) : ``csv`` or ``jsonl``, defaults to the file extension.
+            columns (str | list) : See :py:meth:`exportTools`.
+
+        Returns:
+            int : The number of tools exported.
+        """
+        fmt = fmt or os.path.splitext(fname)[1].lstrip('.').lower()
+
+        with open(fname, 'w') as fh:
+            count = self.exportTools(fh, fmt, columns)
+
+        LOG.info("Exported %i tools to: %s", count, fname)
+        return count
+
     def saveToolTable(self, tool_table, columns=None, tool_file=None):
         """Write tooltable data to file.
 
+        The loaded tool table is updated straight away, but the file is
+        written after ``save_delay``, so a burst of saves results in a
+        single write. The file is replaced atomically, so LinuxCNC never
+        reads a partially written tool table.
+
         Args:
             tool_table (dict) : Dictionary of dictionaries containing
                 the tool data to write to the file.
@@ -352,6 +759,89 @@ class ToolTable(DataPlugin):
         if tool_file is None:
             tool_file = self.tool_table_file
 
+        lines = self.formatToolTable(tool_table, columns)
+
+        # use the table as it will be read back from the file
+        table, header_lines = self.parseToolTable(lines)
+        if tool_file == self.tool_table_file:
+            self.updateToolTable(table)
+
+        if self._pending_save is not None and self._pending_save[0] != tool_file:
+            self.writePendingToolTable()
+
+        self._pending_save = (tool_file, lines, table, columns)
+
+        if self.save_delay > 0:
+            self._save_timer.start(int(self.save_delay * 1000))
+        else:
+            self.writePendingToolTable()
+
+    def writePendingToolTable(self):
+        """Write the tool table now if there is a save pending, and have
+        LinuxCNC load it.
+
+        Returns:
+            bool : False if the file could not be written.
+        """
+        self._save_timer.stop()
+
+        if self._pending_save is None:
+            return True
+
+        tool_file, lines, table, columns = self._pending_save
+        self._pending_save = None
+
+        try:
+            self.writeToolTableFile(tool_file, lines, table)
+        except (IOError, OSError):
+            LOG.exception("Error writing tool table file: {}".format(tool_file))
+            return False
+
+        return True
+
+    def writeToolTableFile(self, tool_file, lines, table):
+        """Atomically write the lines of a tool table file, and have
+        LinuxCNC load it.
+
+        Args:
+            tool_file (str) : Path of the file to write.
+            lines (list) : The lines, from :py:meth:`formatToolTable`.
+            table (dict) : The tool table the lines were formatted from.
+
+        Raises:
+            IOError, OSError : If the file could not be written, in which
+                case it is unchanged.
+        """
+        temp_file = '{}.{}.tmp'.format(tool_file, os.getpid())
+        try:
+            with open(temp_file, 'w') as fh:
+                fh.write('\n'.join(lines))
+                fh.write('\n')  # new line at end of file
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.rename(temp_file, tool_file)
+        finally:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+
+        if tool_file == self.tool_table_file:
+            # so the reload triggered by our own write is skipped
+            self._file_signature = fileSignature(tool_file)
+            self._disk_table = table
+
+        CMD.load_tool_table()
+
+    def formatToolTable(self, tool_table, columns):
+        """Format tooltable data as the lines of a tool table file.
+
+        Args:
+            tool_table (dict) : Dictionary of dictionaries containing
+                the tool data.
+            columns (list) : A list of data columns to write.
+
+        Returns:
+            list : The lines, without line endings.
+        """
         lines = []
         header_lines = []
 
@@ -367,8 +857,8 @@ class ToolTable(DataPlugin):
 
         if self.orig_header_lines:
             try:
-                self.orig_header_lines.extend(header_lines[header_lines.index('---'):])
-                header_lines = self.orig_header_lines
+                header_lines = self.orig_header_lines + \
+                               header_lines[header_lines.index('---'):]
             except ValueError:
                 header_lines = self.orig_header_lines
 
@@ -416,14 +906,4 @@ class ToolTable(DataPlugin):
                 items.insert(1, "0\t")
             lines.append(''.join(items))
 
-        # for line in lines:
-        #     print line
-
-        # write to file
-        with open(tool_file, 'w') as fh:
-            fh.write('\n'.join(lines))
-            fh.write('\n')  # new line at end of file
-            fh.flush()
-            os.fsync(fh.fileno())
-
-        CMD.load_tool_table()
+        return lines
@@ -33,7 +33,7 @@ import os
 import sys
 import linuxcnc
 import subprocess
-from pkg_resources import iter_entry_points
+from qtpyvcp.utilities.entry_points import iterEntryPoints
 
 from docopt import docopt
 from qtpy.QtWidgets import QApplication, QFileDialog
@@ -85,9 +85,9 @@ def launch_designer(opts=DotDict()):
 
     if not '.' in fname or not '/' in fname:
         entry_points = {}
-        for entry_point in iter_entry_points(group='qtpyvcp.example_vcp'):
+        for entry_point in iterEntryPoints('qtpyvcp.example_vcp'):
             entry_points[entry_point.name] = entry_point
-        for entry_point in iter_entry_points(group='qtpyvcp.vcp'):
+        for entry_point in iterEntryPoints('qtpyvcp.vcp'):
             entry_points[entry_point.name] = entry_point
 
         try:
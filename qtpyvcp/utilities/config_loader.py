@@ -1,10 +1,14 @@
 import os
 import sys
+import pickle
+import hashlib
 import hiyapyco
 from jinja2.nativetypes import NativeEnvironment
 from jinja2 import Environment, FileSystemLoader, Undefined, make_logging_undefined
 
+import qtpyvcp
 from qtpyvcp.utilities.logger import getLogger, logLevelFromName
+from qtpyvcp.utilities.misc import cacheDir
 
 LOG = getLogger(__name__)
 
@@ -14,19 +18,69 @@ hiyapyco.logger = hiyapyco_logger
 
 LogUndefined = make_logging_undefined(logger=LOG, base=Undefined)
 
-def load_config_files(*files):
+# bump if the format of the cached configs changes
+CONFIG_CACHE_VERSION = 1
+
+# values available to the templates as `ini`
+INI_CONTEXT = {'traj': {'coordinates': 'XYZ'},
+               'machine': {'name': 'My Machine'},
+               'display': {'cycle_time': 100},
+               }
+
+
+class DependencyLoader(FileSystemLoader):
+    """Template loader that records the files it loads, including
+    any files pulled in by ``include`` or ``extends`` statements."""
+    def __init__(self, searchpath, dependencies):
+        super(DependencyLoader, self).__init__(searchpath)
+        self.dependencies = dependencies
+
+    def get_source(self, environment, template):
+        source, filename, uptodate = super(DependencyLoader, self).get_source(environment, template)
+        self.dependencies.add(filename)
+        return source, filename, uptodate
+
+
+class EnvironDict(dict):
+    """Copy of the environment that records the variables that are
+    referenced, and their values, so cached configs can be invalidated
+    when any of them change."""
+    def __init__(self, environ, referenced):
+        super(EnvironDict, self).__init__(environ)
+        self.referenced = referenced
+
+    def __getitem__(self, key):
+        self.referenced[key] = dict.get(self, key)
+        return dict.__getitem__(self, key)
+
+    def __contains__(self, key):
+        self.referenced[key] = dict.get(self, key)
+        return dict.__contains__(self, key)
+
+    def get(self, key, default=None):
+        self.referenced[key] = dict.get(self, key)
+        return dict.get(self, key, default)
+
+
+def load_config_files(*files, **kwargs):
     """Load and merge YAML config files.
 
     Files that come earlier in the list take precedence over files
     that come later in the list.
 
+    The merged config is cached, and the cache is used as long as none of
+    the config files (including any included files), nor the environment
+    variables they reference, have changed.
+
     Args:
         *files (list) : Variable number of file paths.
+        use_cache (bool) : Whether to use the config cache, defaults to True.
 
     Example::
 
         load_config_files(file1, file2, file3, ...):
     """
+    use_cache = kwargs.get('use_cache', True)
 
     files = [file for file in files if file is not None and file != '']
 
@@ -38,7 +92,17 @@ def load_config_files(*files):
     # hiyapyco merges in order least important to most important
     files.reverse()
 
-    expanded_files = process_templates(files)
+    cache_file = None
+    if use_cache:
+        cache_file = config_cache_file(files)
+        cfg_dict = load_cached_config(cache_file)
+        if cfg_dict is not None:
+            LOG.debug('Loaded merged config from cache: {}'.format(cache_file))
+            return cfg_dict
+
+    dependencies = set()
+    referenced_env = {}
+    expanded_files = process_templates(files, dependencies, referenced_env)
 
     hiyapyco.jinja2env = NativeEnvironment(variable_start_string='(',
                                            variable_end_string=')',
@@ -54,24 +118,104 @@ def load_config_files(*files):
                   hiyapyco.dump(cfg_dict,
                                 default_flow_style=False))
 
+    if cache_file is not None:
+        save_cached_config(cache_file, cfg_dict, dependencies, referenced_env)
+
     return cfg_dict
 
 
-def process_templates(files):
-    env = Environment(loader=FileSystemLoader(searchpath=[os.path.dirname(file) for file in files]),
+def config_cache_file(files):
+    """Get the path of the cache file for a list of config files."""
+    key = repr((CONFIG_CACHE_VERSION,
+                qtpyvcp.__version__,
+                sys.version_info[0],
+                [os.path.realpath(file) for file in files],
+                sorted(INI_CONTEXT.items())))
+
+    name = hashlib.sha1(key.encode('utf-8')).hexdigest()
+    return os.path.join(cacheDir('config'), name + '.pickle')
+
+
+def _file_stamp(file):
+    try:
+        stat = os.stat(file)
+    except OSError:
+        return None
+    return stat.st_mtime, stat.st_size
+
+
+def load_cached_config(cache_file):
+    """Load a cached config, if it is still valid.
+
+    Returns:
+        dict : The cached config, or None if there is no valid cache.
+    """
+    try:
+        with open(cache_file, 'rb') as fh:
+            cache = pickle.load(fh)
+    except Exception:
+        return None
+
+    for file, stamp in cache['dependencies'].items():
+        if _file_stamp(file) != stamp:
+            LOG.debug('Config cache is stale, file changed: {}'.format(file))
+            return None
+
+    for var, value in cache['environment'].items():
+        if os.environ.get(var) != value:
+            LOG.debug('Config cache is stale, env var changed: {}'.format(var))
+            return None
+
+    return cache['config']
+
+
+def save_cached_config(cache_file, cfg_dict, dependencies, referenced_env):
+    cache = {'dependencies': {file: _file_stamp(file) for file in dependencies},
+             'environment': referenced_env,
+             'config': cfg_dict,
+             }
+
+    # write to a temp file and rename, so the cache is never left half written
+    temp_file = '{}.{}.tmp'.format(cache_file, os.getpid())
+    try:
+        with open(temp_file, 'wb') as fh:
+            pickle.dump(cache, fh, pickle.HIGHEST_PROTOCOL)
+        os.rename(temp_file, cache_file)
+    except Exception:
+        LOG.debug('Could not write config cache: {}'.format(cache_file), exc_info=True)
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+
+
+def process_templates(files, dependencies=None, referenced_env=None):
+    """Render the config files as Jinja2 templates.
+
+    Args:
+        files (list) : The config file paths.
+        dependencies (set, optional) : If given, the paths of all the
+            template files loaded, including included files, are added to it.
+        referenced_env (dict, optional) : If given, the environment variables
+            referenced by the templates are added to it, along with their
+            values.
+    """
+    if dependencies is None:
+        dependencies = set()
+    if referenced_env is None:
+        referenced_env = {}
+
+    env = Environment(loader=DependencyLoader([os.path.dirname(file) for file in files], dependencies),
                       undefined=LogUndefined,
                       )
 
+    environ = EnvironDict(os.environ, referenced_env)
+
     expanded_templates = []
     for file in files:
         file_dir, file_name = os.path.split(os.path.realpath(file))
         template = env.get_template(file_name)
         result = template.render({'file': {'path': file, 'dir': file_dir, 'name': file_name},
-                                  'env': os.environ,
-                                  'ini': {'traj': {'coordinates': 'XYZ'},
-                                          'machine': {'name': 'My Machine'},
-                                          'display': {'cycle_time': 100},
-                                          },
+                                  'env': environ,
+                                  'ini': INI_CONTEXT,
                                   })
 
         expanded_templates.append(result)
@@ -0,0 +1,209 @@
+"""
+Entry Points
+------------
+
+Cached discovery of the entry points of installed VCPs and widget packages.
+
+Scanning the installed distributions for entry points is slow, and importing
+``pkg_resources`` alone scans every distribution in the Python environment.
+The ``qtpyvcp.*`` entry points are therefore kept in an index in the per-user
+cache dir, which is only rebuilt when a ``sys.path`` dir, or the entry points
+file of one of the distributions providing QtPyVCP entry points, changes, as
+happens when a package is installed or removed.
+
+Example:
+
+    Iterating the installed VCPs::
+
+        from qtpyvcp.utilities.entry_points import iterEntryPoints
+
+        for entry_point in iterEntryPoints('qtpyvcp.vcp'):
+            vcp = entry_point.load()
+"""
+
+import os
+import sys
+import json
+import importlib
+
+from qtpyvcp.utilities.logger import getLogger
+from qtpyvcp.utilities.misc import cacheDir
+
+LOG = getLogger(__name__)
+
+# bump if the format of the index changes
+INDEX_VERSION = 1
+
+# entry point groups providing VCPs, in order of increasing precedence
+VCP_GROUPS = ('qtpyvcp.example_vcp', 'qtpyvcp.test_vcp', 'qtpyvcp.vcp')
+
+_INDEX = None
+
+
+class EntryPoint(object):
+    """Entry point from the index.
+
+    Args:
+        name (str) : The entry point name.
+        group (str) : The entry point group.
+        value (str) : The object reference, as ``package.module:attr``.
+    """
+    def __init__(self, name, group, value):
+        self.name = name
+        self.group = group
+        self.value = value
+
+    def load(self):
+        """Import and return the object the entry point refers to."""
+        modname, sep, attrs = self.value.partition(':')
+        obj = importlib.import_module(modname.strip())
+        for attr in attrs.strip().split('.') if attrs.strip() else []:
+            obj = getattr(obj, attr)
+        return obj
+
+    def __repr__(self):
+        return 'EntryPoint({} = {})'.format(self.name, self.value)
+
+
+def iterEntryPoints(group):
+    """Iterate the entry points in a group.
+
+    Drop in replacement for ``pkg_resources.iter_entry_points`` for the
+    ``qtpyvcp.*`` groups.
+
+    Args:
+        group (str) : The entry point group, e.g. ``qtpyvcp.vcp``.
+
+    Returns:
+        An iterator of :py:class:`EntryPoint`.
+    """
+    for name, value in _getIndex()['entry_points'].get(group, []):
+        yield EntryPoint(name, group, value)
+
+
+def getVCPEntryPoints():
+    """Get the entry points of all the available VCPs.
+
+    Returns:
+        dict : The entry points keyed by name. If the same name is used in
+            more than one group, installed VCPs take precedence.
+    """
+    entry_points = {}
+    for group in VCP_GROUPS:
+        for entry_point in iterEntryPoints(group):
+            entry_points[entry_point.name] = entry_point
+    return entry_points
+
+
+def rebuildIndex():
+    """Rescan the installed distributions and rebuild the index."""
+    global _INDEX
+    _INDEX = _buildIndex()
+    _saveIndex(_INDEX)
+    return _INDEX
+
+
+def _getIndex():
+    global _INDEX
+    if _INDEX is None:
+        _INDEX = _loadIndex()
+        if _INDEX is None:
+            LOG.debug("Entry point index is stale, rescanning distributions")
+            rebuildIndex()
+    return _INDEX
+
+
+def _indexFile():
+    return os.path.join(cacheDir(), 'entry_points.json')
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def _pathStamps():
+    return [[path, _mtime(path or '.')] for path in sys.path]
+
+
+def _loadIndex():
+    try:
+        with open(_indexFile(), 'r') as fh:
+            index = json.load(fh)
+    except Exception:
+        return None
+
+    if index.get('version') != INDEX_VERSION or \
+            index.get('python') != [sys.executable, list(sys.version_info[:2])]:
+        return None
+
+    if index['path'] != _pathStamps():
+        return None
+
+    for fname, mtime in index['files']:
+        if _mtime(fname) != mtime:
+            return None
+
+    return index
+
+
+def _saveIndex(index):
+    index_file = _indexFile()
+    temp_file = '{}.{}.tmp'.format(index_file, os.getpid())
+    try:
+        with open(temp_file, 'w') as fh:
+            json.dump(index, fh)
+        os.rename(temp_file, index_file)
+    except Exception:
+        LOG.debug("Could not write entry point index: %s", index_file, exc_info=True)
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+
+
+def _buildIndex():
+    entry_points = {}
+    files = set()
+
+    try:
+        from importlib.metadata import distributions
+    except ImportError:
+        distributions = None
+
+    if distributions is not None:
+        for dist in distributions():
+            found = False
+            for ep in dist.entry_points:
+                if ep.group.startswith('qtpyvcp.'):
+                    entry_points.setdefault(ep.group, []).append([ep.name, ep.value])
+                    found = True
+
+            dist_path = getattr(dist, '_path', None)
+            if found and dist_path is not None:
+                files.add(os.path.join(str(dist_path), 'entry_points.txt'))
+
+    else:
+        import pkg_resources
+        for dist in pkg_resources.working_set:
+            found = False
+            for group, group_eps in dist.get_entry_map().items():
+                if not group.startswith('qtpyvcp.'):
+                    continue
+                for name, ep in group_eps.items():
+                    value = ep.module_name
+                    if ep.attrs:
+                        value += ':' + '.'.join(ep.attrs)
+                    entry_points.setdefault(group, []).append([name, value])
+                    found = True
+
+            egg_info = getattr(dist, 'egg_info', None)
+            if found and egg_info is not None:
+                files.add(os.path.join(egg_info, 'entry_points.txt'))
+
+    return {'version': INDEX_VERSION,
+            'python': [sys.executable, list(sys.version_info[:2])],
+            'path': _pathStamps(),
+            'files': [[fname, _mtime(fname)] for fname in sorted(files)],
+            'entry_points': entry_points,
+            }
@@ -22,3 +22,32 @@ def insertPath(env_var, index, file):
     files.insert(index, file)
     os.environ[env_var] = ':'.join(files)
     print os.environ[env_var]
+
+
+def cacheDir(*subdirs):
+    """Get the per-user QtPyVCP cache dir, creating it if needed.
+
+    Args:
+        *subdirs : Optional sub directories of the cache dir.
+
+    Returns:
+        str : Path of the cache dir.
+    """
+    base = os.getenv('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    path = os.path.join(base, 'qtpyvcp', *subdirs)
+    try:
+        os.makedirs(path)
+    except OSError:
+        if not os.path.isdir(path):
+            raise
+    return path
+
+
+def fileSignature(path):
+    """Get a signature of a file which changes whenever the file is
+    rewritten, or None if the file does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime
@@ -36,6 +36,12 @@ Application Options:
                        Specify the Qt Python binding to use.
   --perfmon            Monitor and log system performance.
   --develop            Development mode. Enables live reloading of QSS styles.
+  --no-config-cache    Don't use the cached merged YAML config, always load
+                       and merge the config files.
+  --profile-startup    Profile the startup, and write a Chrome trace and
+                       a summary report to ~/.cache/qtpyvcp/profiles.
+  --standby            Keep a warm process ready to launch the VCP as soon as
+                       LinuxCNC is running, and relaunch it if it exits.
   --command_line_args <args>...
                        Additional args passed to the QtApplication.
 
@@ -133,8 +139,8 @@ def apply_opts(opts):
 
         opts[k] = convType(ini_val)
 
-    # Check if LinuxCNC is running
-    if not os.path.isfile('/tmp/linuxcnc.lock'):
+    # Check if LinuxCNC is running, in standby mode the VCP waits for it
+    if not os.path.isfile('/tmp/linuxcnc.lock') and not opts.standby:
         # LinuxCNC is not running.
         # TODO: maybe launch LinuxCNC using subprocess?
         print 'LinuxCNC must be running to launch a VCP'
@@ -0,0 +1,208 @@
+"""
+Startup Profiler
+----------------
+
+Records how long the different steps of the application startup take, so
+that the plugins, windows and widgets that dominate the startup time can be
+identified.
+
+The profiler is enabled with the ``--profile-startup`` command line option.
+Once the application is ready two reports are written to the
+``~/.cache/qtpyvcp/profiles`` dir, a Chrome trace JSON file which can be
+viewed in ``chrome://tracing`` (or https://ui.perfetto.dev), and a text
+summary listing the steps sorted by the time they took.
+
+Example:
+
+    Profiling a step::
+
+        from qtpyvcp.utilities import profiler
+
+        with profiler.profile('load tool table', 'plugin'):
+            self.loadToolTable()
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+try:
+    import builtins
+except ImportError:
+    import __builtin__ as builtins
+
+from qtpyvcp.utilities.logger import getLogger
+from qtpyvcp.utilities.misc import cacheDir
+
+LOG = getLogger(__name__)
+
+_START_TIME = time.time()
+_MAIN_THREAD = threading.current_thread()
+_ENABLED = False
+
+_EVENTS = []
+_IMPORT_STACK = []
+_ORIGINAL_IMPORT = None
+
+
+def isEnabled():
+    """Whether startup profiling is enabled."""
+    return _ENABLED
+
+
+def enable():
+    """Enable startup profiling.
+
+    This also starts recording the import time of each module imported
+    from the main thread, so should be called as early as possible.
+    """
+    global _ENABLED, _ORIGINAL_IMPORT
+    if _ENABLED:
+        return
+
+    _ENABLED = True
+    _ORIGINAL_IMPORT = builtins.__import__
+    builtins.__import__ = _profiledImport
+
+    LOG.info("Startup profiling enabled")
+
+
+@contextmanager
+def profile(name, category='startup'):
+    """Context manager to record the duration of a startup step.
+
+    Does nothing if profiling is not enabled.
+
+    Args:
+        name (str) : The name of the step.
+        category (str) : The category of the step, e.g. ``plugin`` or ``widget``.
+    """
+    if not _ENABLED:
+        yield
+        return
+
+    start = time.time()
+    try:
+        yield
+    finally:
+        _addEvent(name, category, start, time.time())
+
+
+def mark(name):
+    """Record an instantaneous event, e.g. the end of a startup phase."""
+    if _ENABLED:
+        _EVENTS.append({'name': name,
+                        'cat': 'startup',
+                        'ph': 'i',
+                        's': 'g',
+                        'ts': _timestamp(time.time()),
+                        'pid': os.getpid(),
+                        'tid': threading.current_thread().ident,
+                        })
+
+
+def finish():
+    """Stop profiling and write the Chrome trace and the summary reports.
+
+    Returns:
+        tuple : The paths of the trace file and the summary file.
+    """
+    global _ENABLED
+    if not _ENABLED:
+        return
+
+    mark('startup complete')
+
+    _ENABLED = False
+    if builtins.__import__ is _profiledImport:
+        builtins.__import__ = _ORIGINAL_IMPORT
+
+    profile_dir = cacheDir('profiles')
+    base_name = time.strftime('startup-%Y%m%d-%H%M%S')
+    trace_file = os.path.join(profile_dir, base_name + '.json')
+    summary_file = os.path.join(profile_dir, base_name + '.txt')
+
+    with open(trace_file, 'w') as fh:
+        json.dump({'traceEvents': _EVENTS, 'displayTimeUnit': 'ms'}, fh)
+
+    with open(summary_file, 'w') as fh:
+        fh.write(summary())
+
+    LOG.info("Startup profile trace written to: yellow<{}>".format(trace_file))
+    LOG.info("Startup profile summary written to: yellow<{}>".format(summary_file))
+
+    return trace_file, summary_file
+
+
+def summary():
+    """Text summary of the recorded steps, sorted by duration.
+
+    For imports the self time is used, i.e. the time spent importing the
+    module excluding the time spent importing other modules.
+    """
+    total = (time.time() - _START_TIME) * 1000
+
+    categories = {}
+    for event in _EVENTS:
+        if event['ph'] != 'X':
+            continue
+
+        duration = event['args'].get('self_ms', event['dur'] / 1000.0)
+        categories.setdefault(event['cat'], []).append((duration, event['name']))
+
+    lines = ['QtPyVCP startup profile',
+             '',
+             'Total time to ready: {:.1f} ms'.format(total),
+             '']
+
+    totals = sorted(((sum(d for d, n in events), cat)
+                     for cat, events in categories.items()), reverse=True)
+
+    for cat_total, cat in totals:
+        events = sorted(categories[cat], reverse=True)
+        lines.append('{} ({} steps, {:.1f} ms total)'.format(cat, len(events), cat_total))
+        for duration, name in events:
+            lines.append('  {:10.3f} ms  {}'.format(duration, name))
+        lines.append('')
+
+    return '\n'.join(lines)
+
+
+def _timestamp(seconds):
+    # trace timestamps are in microseconds
+    return (seconds - _START_TIME) * 1e6
+
+
+def _addEvent(name, category, start, end, **args):
+    _EVENTS.append({'name': name,
+                    'cat': category,
+                    'ph': 'X',
+                    'ts': _timestamp(start),
+                    'dur': (end - start) * 1e6,
+                    'pid': os.getpid(),
+                    'tid': threading.current_thread().ident,
+                    'args': args,
+                    })
+
+
+def _profiledImport(name, *args, **kwargs):
+    if name in sys.modules or threading.current_thread() is not _MAIN_THREAD:
+        return _ORIGINAL_IMPORT(name, *args, **kwargs)
+
+    _IMPORT_STACK.append(0.0)
+    start = time.time()
+    try:
+        return _ORIGINAL_IMPORT(name, *args, **kwargs)
+    finally:
+        end = time.time()
+        duration = end - start
+        child_time = _IMPORT_STACK.pop()
+        if _IMPORT_STACK:
+            _IMPORT_STACK[-1] += duration
+
+        if _ENABLED:
+            _addEvent('import ' + name, 'import', start, end,
+                      self_ms=(duration - child_time) * 1000)
@@ -0,0 +1,196 @@
+"""
+UI Cache
+--------
+
+Compiles QtDesigner .ui files, and the .qrc resource files they use, to
+Python modules in the per-user cache dir, so that the widget tree can be
+built by the compiled code rather than by parsing the .ui XML each launch.
+
+The compiled modules are keyed by the hash of the .ui file, so editing the
+.ui file in QtDesigner will cause it to be recompiled on the next launch.
+If the .ui file can't be compiled for whatever reason it is loaded using
+``uic.loadUi`` as usual.
+"""
+
+import os
+import re
+import sys
+import hashlib
+import subprocess
+from xml.etree import ElementTree
+
+import qtpy
+from qtpy import uic
+
+from qtpyvcp.utilities.logger import getLogger
+from qtpyvcp.utilities.misc import cacheDir
+
+LOG = getLogger(__name__)
+
+# bump if the way the modules are compiled changes
+UI_CACHE_VERSION = 1
+
+PYRCC = 'pyrcc5'
+
+
+def loadUi(ui_file, baseinstance):
+    """Load a .ui file into an existing widget instance.
+
+    Drop in replacement for ``uic.loadUi(ui_file, baseinstance)`` which
+    uses the cached compiled .ui module if possible.
+
+    Args:
+        ui_file (str) : Path to the .ui file to load.
+        baseinstance (QWidget) : The widget to set up the UI on, its
+            class should match the base class of the .ui file.
+
+    Returns:
+        The base instance.
+    """
+    try:
+        form_class = getFormClass(ui_file)
+    except Exception:
+        LOG.debug("Could not load compiled UI for %s", ui_file, exc_info=True)
+        form_class = None
+
+    if form_class is None:
+        LOG.debug("Loading UI file using uic: %s", ui_file)
+        return uic.loadUi(ui_file, baseinstance)
+
+    form = form_class()
+    form.setupUi(baseinstance)
+
+    # uic.loadUi sets the child widgets as attributes of the base instance
+    for name, value in vars(form).items():
+        setattr(baseinstance, name, value)
+
+    return baseinstance
+
+
+def getFormClass(ui_file):
+    """Get the form class from the compiled .ui module, compiling the .ui
+    file if it is not in the cache yet.
+
+    Args:
+        ui_file (str) : Path to the .ui file.
+
+    Returns:
+        The ``Ui_<name>`` form class, or None if the .ui file can't be compiled.
+    """
+    try:
+        from qtpy.uic import compileUi
+    except ImportError:
+        # only available with PyQt
+        return None
+
+    with open(ui_file, 'rb') as fh:
+        data = fh.read()
+
+    ui_hash = hashlib.sha1(data)
+    ui_hash.update(repr((UI_CACHE_VERSION,
+                         sys.version_info[:2],
+                         qtpy.API_NAME,
+                         qtpy.QT_VERSION)).encode('utf-8'))
+
+    base_name = re.sub(r'\W', '_', os.path.splitext(os.path.basename(ui_file))[0])
+    module_name = 'ui_{}_{}'.format(base_name, ui_hash.hexdigest()[:16])
+
+    # the compiled module imports the resources it uses
+    compileResources(ui_file, data)
+
+    module = sys.modules.get(module_name)
+    if module is None:
+        py_file = os.path.join(cacheDir('ui'), module_name + '.py')
+        if not os.path.isfile(py_file):
+            LOG.debug("Compiling UI file %s => %s", ui_file, py_file)
+            temp_file = '{}.{}.tmp'.format(py_file, os.getpid())
+            try:
+                with open(temp_file, 'w') as fh:
+                    compileUi(ui_file, fh, from_imports=False)
+                os.rename(temp_file, py_file)
+            finally:
+                if os.path.exists(temp_file):
+                    os.remove(temp_file)
+
+        module = loadModule(module_name, py_file)
+
+    for name, value in vars(module).items():
+        if name.startswith('Ui_'):
+            return value
+
+
+def compileResources(ui_file, data):
+    """Compile the .qrc resource files used by a .ui file.
+
+    The compiled ``<name>_rc.py`` modules are put in a cache dir which is
+    added to ``sys.path`` so the compiled .ui module can import them.
+    Resource modules that are already imported are skipped.
+    """
+    root = ElementTree.fromstring(data)
+    ui_dir = os.path.dirname(os.path.realpath(ui_file))
+
+    for include in root.iter('include'):
+        location = include.attrib.get('location', '')
+        if not location.endswith('.qrc'):
+            continue
+
+        module_name = os.path.basename(location)[:-4] + '_rc'
+        if module_name in sys.modules:
+            continue
+
+        qrc_file = os.path.join(ui_dir, location)
+        if not os.path.isfile(qrc_file):
+            continue
+
+        rc_dir = cacheDir('rc', _resourcesHash(qrc_file))
+        py_file = os.path.join(rc_dir, module_name + '.py')
+
+        if not os.path.isfile(py_file):
+            LOG.debug("Compiling resource file %s => %s", qrc_file, py_file)
+            temp_file = '{}.{}.tmp'.format(py_file, os.getpid())
+            try:
+                ret = subprocess.call([PYRCC, '-o', temp_file, qrc_file])
+                if ret != 0:
+                    raise RuntimeError("{} failed for {}".format(PYRCC, qrc_file))
+                os.rename(temp_file, py_file)
+            finally:
+                if os.path.exists(temp_file):
+                    os.remove(temp_file)
+
+        if rc_dir not in sys.path:
+            sys.path.insert(0, rc_dir)
+
+
+def loadModule(name, path):
+    """Import a Python module from a file path."""
+    try:
+        from importlib.util import spec_from_file_location, module_from_spec
+    except ImportError:
+        import imp
+        return imp.load_source(name, path)
+
+    spec = spec_from_file_location(name, path)
+    module = module_from_spec(spec)
+    spec.loader.exec_module(module)
+    sys.modules[name] = module
+    return module
+
+
+def _resourcesHash(qrc_file):
+    # the hash of the .qrc file and the mtime and size of each resource in it
+    with open(qrc_file, 'rb') as fh:
+        data = fh.read()
+
+    qrc_hash = hashlib.sha1(data)
+    qrc_hash.update(repr((UI_CACHE_VERSION, sys.version_info[:2])).encode('utf-8'))
+
+    qrc_dir = os.path.dirname(os.path.realpath(qrc_file))
+    for item in ElementTree.fromstring(data).iter('file'):
+        try:
+            stat = os.stat(os.path.join(qrc_dir, item.text.strip()))
+            stamp = (item.text, stat.st_mtime, stat.st_size)
+        except (OSError, AttributeError):
+            stamp = (item.text, None)
+        qrc_hash.update(repr(stamp).encode('utf-8'))
+
+    return qrc_hash.hexdigest()
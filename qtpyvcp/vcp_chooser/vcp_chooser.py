@@ -1,6 +1,6 @@
 import os
 import yaml
-from pkg_resources import iter_entry_points
+from qtpyvcp.utilities.entry_points import iterEntryPoints
 from qtpy import uic
 
 from qtpy.QtCore import Qt, Slot
@@ -32,7 +32,7 @@ class VCPChooser(QDialog):
         category.setFlags(Qt.ItemIsEnabled)
 
         # add example VCPs to the treeview
-        for entry_point in iter_entry_points(group='qtpyvcp.example_vcp'):
+        for entry_point in iterEntryPoints('qtpyvcp.example_vcp'):
             child = QTreeWidgetItem(category)
             child.setText(0, self.get_vcp_data(entry_point))
 
@@ -42,7 +42,7 @@ class VCPChooser(QDialog):
         category.setFlags(Qt.ItemIsEnabled)
 
         # add example VCPs to the treeview
-        for entry_point in iter_entry_points(group='qtpyvcp.test_vcp'):
+        for entry_point in iterEntryPoints('qtpyvcp.test_vcp'):
             child = QTreeWidgetItem(category)
             child.setText(0, self.get_vcp_data(entry_point))
 
@@ -54,7 +54,7 @@ class VCPChooser(QDialog):
         category.setHidden(True)
 
         # add installed VCPs to the treeview
-        for entry_point in iter_entry_points(group='qtpyvcp.vcp'):
+        for entry_point in iterEntryPoints('qtpyvcp.vcp'):
             child = QTreeWidgetItem(category)
             child.setText(0, self.get_vcp_data(entry_point))
             category.setHidden(False)
@@ -1,5 +1,5 @@
 from qtpy.QtCore import Qt, Property, Slot, QRectF, QSize
-from qtpy.QtGui import QColor, QLinearGradient, QPainter, QPen
+from qtpy.QtGui import QColor, QLinearGradient, QPainter, QPainterPath, QPen
 from qtpy.QtWidgets import QWidget, QSizePolicy, QWIDGETSIZE_MAX
 
 from qtpyvcp.utilities import logger
@@ -39,6 +39,18 @@ class BarIndicatorBase(QWidget):
         self._origin_at_zero = False
         self._origin_position = 0
 
+        # paint objects, only rebuilt on resize or property change
+        self._cache_valid = False
+        self._border_pen = None
+        self._border_path = None
+        self._text_rect = None
+        self._bar_path = None
+        self._bar_path_width = None
+
+        # what was last painted, to skip repaints which change nothing
+        self._painted_pixels = None
+        self._painted_text = None
+
         self.barGradient = [u'0.0, 0, 255, 0',
                             u'0.8, 255, 255, 0',
                             u'1.0, 255, 0, 0',]
@@ -74,9 +86,40 @@ class BarIndicatorBase(QWidget):
             self._flip_translation_y = 0
             self._flip_scale_y = 1
 
-    def paintEvent(self, event):
+    def invalidateCache(self):
+        """Rebuild the paint objects on the next paint, and repaint."""
+        self._cache_valid = False
+        self.update()
 
+    def updateCache(self):
+        """Build the paint objects which only depend on the size and properties."""
         self.adjustTransformation()
+
+        bw = float(self._border_width)
+        br = self._border_radius
+
+        self.gradient.setStart(0, 0)
+        self.gradient.setFinalStop(self._bar_length, 0)
+
+        self._border_pen = QPen()
+        self._border_pen.setWidthF(bw)
+        self._border_pen.setColor(self._border_color)
+
+        self._border_path = QPainterPath()
+        self._border_path.addRoundedRect(
+            QRectF(bw / 2, bw / 2, self._bar_length - bw, self._bar_width - bw), br, br)
+
+        self._text_rect = QRectF(0, 0, self._bar_length, self._bar_width)
+
+        self._bar_path = None
+        self._bar_path_width = None
+        self._cache_valid = True
+
+    def paintEvent(self, event):
+
+        if not self._cache_valid:
+            self.updateCache()
+
         self._painter.begin(self)
         self._painter.translate(0, self._painter_translation_y) # Draw vertically if needed
         self._painter.rotate(self._painter_rotation)
@@ -93,6 +136,7 @@ class BarIndicatorBase(QWidget):
         if self._border_width > 0:
             self.drawBorder()
 
+        self._painted_text = None
         if self._format is not '':
             self.drawText()
 
@@ -100,66 +144,65 @@ class BarIndicatorBase(QWidget):
 
     def drawBackground(self):
 
-        bw = float(self._border_width)
-        br = self._border_radius
+        # the bar path is only rebuilt when its width changes by a pixel
+        pixels = self.barPixels()
+        if pixels != self._bar_path_width:
+            bw = float(self._border_width)
+            br = self._border_radius
+
+            self._bar_path = QPainterPath()
+            self._bar_path.addRoundedRect(
+                QRectF(bw / 2, bw / 2, pixels - bw, self._bar_width - bw), br, br)
+            self._bar_path_width = pixels
 
-        w = self.sliderPositionFromValue(self.minimum, self.maximum, self._value, self._bar_length)
-        h = self._bar_width
-        rect = QRectF(bw / 2, bw / 2, w - bw, h - bw)
+        self._painted_pixels = pixels
 
         p = self._painter
 
         # draw the load meter value bar
-        p.setPen(Qt.transparent)
+        p.setPen(Qt.NoPen)
         p.setBrush(self.gradient)
 
-        p.drawRoundedRect(rect, br, br)
+        p.drawPath(self._bar_path)
 
     def drawBorder(self):
         p = self._painter
 
-        bw = float(self._border_width)
-        br = self._border_radius
-
-        p.setBrush(Qt.transparent)
-        border_pen = QPen()
-        border_pen.setWidth(bw)
-        border_pen.setColor(self._border_color)
-        p.setPen(border_pen)
+        p.setBrush(Qt.NoBrush)
+        p.setPen(self._border_pen)
 
-        # deal with orientation
-        if self._orientation == Qt.Horizontal:
-            rect = QRectF(bw / 2, bw / 2, self.width() - bw, self.height() - bw)
-        else:
-            # must be Qt.Vertical
-            rect = QRectF(bw / 2, bw / 2, self.height() - bw, self.width() - bw)
-
-        p.drawRoundedRect(rect, br, br)
+        p.drawPath(self._border_path)
 
     def drawText(self):
         p = self._painter
 
         # draw the load percentage text
+        text = self.text()
         p.setPen(self._text_color)
-        if self.orientation == Qt.Vertical:
-            p.drawText(0, 0, self.height(), self.width(), Qt.AlignCenter, self.text())
-        else:
-            p.drawText(0, 0, self.width(), self.height(), Qt.AlignCenter, self.text())
+        p.drawText(self._text_rect, Qt.AlignCenter, text)
+
+        self._painted_text = text
 
     def minimumSizeHint(self):
         return QSize(30, 30)
 
     def resizeEvent(self, event):
-        if self._orientation == Qt.Horizontal:
-            self.gradient.setStart(0, 0)
-            self.gradient.setFinalStop(self.width(), 0)
-        else:
-            self.gradient.setStart(0, 0)
-            self.gradient.setFinalStop(self.height(), 0)
+        self.invalidateCache()
 
     def sliderPositionFromValue(self, min, max, val, span, upsideDown=False):
         return span * (val / max - min)
 
+    def barPixels(self):
+        """The length of the value bar, rounded to whole pixels."""
+        return int(round(self.sliderPositionFromValue(
+            self.minimum, self.maximum, self._value, self._bar_length)))
+
+    def needsRepaint(self):
+        """Whether the value bar or text would look different if repainted."""
+        if not self._cache_valid or self.barPixels() != self._painted_pixels:
+            return True
+        return self._format != '' and self.text() != self._painted_text
+
     @Slot(int)
     @Slot(float)
     @Slot(object)
@@ -184,7 +227,9 @@ class BarIndicatorBase(QWidget):
     def value(self, value):
         if value >= self.minimum and value <= self.maximum:
             self._value = value
-            self.update()
+            # only repaint if the bar moves by at least a pixel or the text changes
+            if self.needsRepaint():
+                self.update()
 
     @Property(float)
     def minimum(self):
@@ -223,8 +268,7 @@ class BarIndicatorBase(QWidget):
             return
 
         self._orientation = orient
-        self.adjustTransformation()
-        self.update()
+        self.invalidateCache()
 
     def text(self):
         values = {'v': self._value,
@@ -253,8 +297,7 @@ class BarIndicatorBase(QWidget):
 
         self._gradient_def = gradient
         self.gradient = grad
-        self.resizeEvent(None)
-        self.update()
+        self.invalidateCache()
 
     # text color
     @Property(QColor)
@@ -274,7 +317,7 @@ class BarIndicatorBase(QWidget):
     @borderColor.setter
     def borderColor(self, border_color):
         self._border_color = border_color
-        self.update()
+        self.invalidateCache()
 
     # border radius
     @Property(int)
@@ -284,7 +327,7 @@ class BarIndicatorBase(QWidget):
     @borderRadius.setter
     def borderRadius(self, border_radius):
         self._border_radius = border_radius
-        self.update()
+        self.invalidateCache()
 
     # border width
     @Property(int)
@@ -294,7 +337,7 @@ class BarIndicatorBase(QWidget):
     @borderWidth.setter
     def borderWidth(self, border_width):
         self._border_width = border_width
-        self.update()
+        self.invalidateCache()
 
 
 if __name__ == "__main__":
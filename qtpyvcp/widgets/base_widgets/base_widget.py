@@ -13,6 +13,7 @@ from qtpy.QtCore import Property, Slot
 from qtpy.QtWidgets import QPushButton
 
 from qtpyvcp.plugins import getPlugin
+from qtpyvcp.utilities import profiler
 from qtpyvcp.utilities.logger import getLogger
 
 LOG = getLogger(__name__)
@@ -122,6 +123,14 @@ class VCPBaseWidget(VCPPrimitiveWidget):
         self.registerRules()
 
     def registerRules(self):
+        if profiler.isEnabled():
+            name = "{} '{}'".format(self.__class__.__name__, self.objectName())
+            with profiler.profile(name, 'rules'):
+                self._registerRules()
+        else:
+            self._registerRules()
+
+    def _registerRules(self):
         rules = json.loads(self._rules)
         for rule in rules:
             # print rule
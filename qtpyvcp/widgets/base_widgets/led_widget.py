@@ -1,5 +1,5 @@
-from qtpy.QtCore import Qt, Slot, Property, QTimer, QSize
-from qtpy.QtGui import QColor, QPainter, QRadialGradient, QBrush
+from qtpy.QtCore import Qt, Slot, Property, QTimer, QSize, QEvent, QRectF
+from qtpy.QtGui import QColor, QPainter, QRadialGradient, QBrush, QPen
 from qtpy.QtWidgets import QWidget
 
 
@@ -21,10 +21,22 @@ class LEDWidget(QWidget):
         self._timer = QTimer()
         self._timer.timeout.connect(self.toggleState)
 
+        # paint objects for the on and off states, only rebuilt on
+        # resize or property change
+        self._painter = QPainter()
+        self._rect = None
+        self._pens = None
+        self._brushes = None
+
         self.setDiameter(self._diameter)
 
-    def paintEvent(self, event):
-        painter = QPainter()
+    def invalidateCache(self):
+        """Rebuild the paint objects on the next paint, and repaint."""
+        self._rect = None
+        self.update()
+
+    def updateCache(self):
+        """Build the paint objects for the on and off states."""
         x = 0
         y = 0
         if self._alignment & Qt.AlignLeft:
@@ -43,37 +55,59 @@ class LEDWidget(QWidget):
         elif self._alignment & Qt.AlignVCenter:
             y = (self.height() - self._diameter) / 2
 
-        gradient = QRadialGradient(x + self._diameter / 2, y + self._diameter / 2,
-                                   self._diameter * 0.3, self._diameter * 0.1, self._diameter * 0.1)
-        gradient.setColorAt(0, Qt.white)
+        self._pens = {}
+        self._brushes = {}
+        for state in (True, False):
+            gradient = QRadialGradient(x + self._diameter / 2, y + self._diameter / 2,
+                                       self._diameter * 0.3, self._diameter * 0.1, self._diameter * 0.1)
+            gradient.setColorAt(0, Qt.white)
+
+            # ensure the border/halo is same color as gradient
+            draw_color = QColor(self._color)
 
-        # ensure the border/halo is same color as gradient
-        draw_color = QColor(self._color)
+            if not state:
+                # cut to black @ 70% for darker effect
+                draw_color = QColor(Qt.black)
 
-        if not self._state:
-            # cut to black @ 70% for darker effect
-            draw_color = QColor(Qt.black)
+            if not self.isEnabled():
+                draw_color.setAlpha(30)
 
-        if not self.isEnabled():
-            draw_color.setAlpha(30)
+            gradient.setColorAt(0.7, draw_color)
+
+            self._pens[state] = QPen(draw_color)
+            self._brushes[state] = QBrush(gradient)
+
+        self._rect = QRectF(x + 1, y + 1, self._diameter - 2, self._diameter - 2)
+
+    def paintEvent(self, event):
+        if self._rect is None:
+            self.updateCache()
 
-        pen_color = draw_color
-        gradient.setColorAt(0.7, draw_color)
+        state = bool(self._state)
 
+        painter = self._painter
         painter.begin(self)
-        brush = QBrush(gradient)
-        painter.setPen(pen_color)
+        painter.setPen(self._pens[state])
         painter.setRenderHint(QPainter.Antialiasing, True)
-        painter.setBrush(brush)
-        painter.drawEllipse(x + 1, y + 1, self._diameter - 2, self._diameter - 2)
+        painter.setBrush(self._brushes[state])
+        painter.drawEllipse(self._rect)
+        painter.end()
+
+    def resizeEvent(self, event):
+        super(LEDWidget, self).resizeEvent(event)
+        self.invalidateCache()
 
+    def changeEvent(self, event):
+        super(LEDWidget, self).changeEvent(event)
+        if event.type() == QEvent.EnabledChange:
+            self.invalidateCache()
+
+    def updateFlashTimer(self):
         if self._flashRate > 0 and self._flashing:
             self._timer.start(self._flashRate)
         else:
             self._timer.stop()
 
-        painter.end()
-
     def minimumSizeHint(self):
         return QSize(self._diameter, self._diameter)
 
@@ -87,7 +121,7 @@ class LEDWidget(QWidget):
     def setDiameter(self, value):
         self._diameter = value
         self.adjustSize()
-        self.update()
+        self.invalidateCache()
 
     def getColor(self):
         return self._color
@@ -97,7 +131,7 @@ class LEDWidget(QWidget):
         self._color = value
         self._disabledColor = QColor(self._color)
         self._disabledColor.setAlpha(30)
-        self.update()
+        self.invalidateCache()
 
     def getAlignment(self):
         return self._alignment
@@ -105,13 +139,15 @@ class LEDWidget(QWidget):
     @Slot(Qt.Alignment)
     def setAlignment(self, value):
         self._alignment = value
-        self.update()
+        self.invalidateCache()
 
     def getState(self):
         return self._state
 
     @Slot(bool)
     def setState(self, value):
+        if value == self._state:
+            return
         self._state = value
         self.update()
 
@@ -126,6 +162,7 @@ class LEDWidget(QWidget):
     @Slot(bool)
     def setFlashing(self, value):
         self._flashing = value
+        self.updateFlashTimer()
         self.update()
 
     def getFlashRate(self):
@@ -134,6 +171,7 @@ class LEDWidget(QWidget):
     @Slot(int)
     def setFlashRate(self, value):
         self._flashRate = value
+        self.updateFlashTimer()
         self.update()
 
     @Slot()
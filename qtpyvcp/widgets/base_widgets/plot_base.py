@@ -0,0 +1,126 @@
+from qtpy.QtCore import Property, QTimer
+from qtpy.QtWidgets import QWidget, QVBoxLayout
+
+import pyqtgraph as pg
+
+
+class PlotBase(QWidget):
+    """Base for the pyqtgraph plot widgets
+
+    Sets up the plot with a labelled y-axis and an optional legend, and
+    redraws it at ``displayRate`` when it has changed and is visible.
+
+    Subclasses add their plot items in :py:meth:`setSeries`, set
+    ``self._dirty`` when there is new data, and draw it in :py:meth:`redraw`.
+
+    Args:
+        parent (QWidget) : The parent widget.
+        bottom_axis (pg.AxisItem) : The x-axis, defaults to a plain axis.
+    """
+    def __init__(self, parent=None, bottom_axis=None):
+        super(PlotBase, self).__init__(parent)
+
+        self._displayRate = 10  # Hz
+        self._legend = False
+
+        self._yAxisLabel = 'y label'
+        self._yAxisUnits = 'y units'
+
+        self._dirty = False
+
+        self.graph = pg.GraphicsLayoutWidget()
+
+        self.yAxis = pg.AxisItem(orientation='left')
+        self.yAxis.setLabel(self._yAxisLabel, units=self._yAxisUnits)
+        self.yAxis.setGrid(125)
+
+        axis_items = {'left': self.yAxis}
+        if bottom_axis is not None:
+            axis_items['bottom'] = bottom_axis
+
+        self.plot = self.graph.addPlot(axisItems=axis_items)
+        self.legend = None
+
+        self.Vlayout = QVBoxLayout(self)
+        self.Vlayout.addWidget(self.graph)
+
+    def setSeries(self):
+        """Recreate the plot items, reimplement to add them."""
+        # first remove the legend as it does not update correctly
+        if self.legend is not None:
+            try:
+                self.legend.scene().removeItem(self.legend)
+            except:
+                pass
+            self.legend = None
+
+        # remove all plot items
+        self.plot.clear()
+
+        if self._legend:
+            self.legend = self.plot.addLegend()
+
+        # the new plot items need the data
+        self._dirty = True
+
+    def startUpdateTimer(self):
+        """Start redrawing the plot at ``displayRate``."""
+        self.updatetimer = QTimer(self)
+        self.updatetimer.timeout.connect(self.updateplot)
+        self.updatetimer.start(self._displayPeriod())
+
+    def _displayPeriod(self):
+        # redraw period in milliseconds
+        return int(1000.0 / max(self._displayRate, 1))
+
+    def updateplot(self):
+        """Redraw the plot if it has changed and is visible."""
+        if not self._dirty or not self.isVisible():
+            return
+        self._dirty = False
+        self.redraw()
+
+    def redraw(self):
+        """Set the data of the plot items, reimplement in subclasses."""
+        pass
+
+    def setyAxis(self):
+        self.yAxis.setLabel(self._yAxisLabel, units=self._yAxisUnits)
+
+    @Property(int)
+    def displayRate(self):
+        return self._displayRate
+
+    @displayRate.setter
+    def displayRate(self, displayRate):
+        self._displayRate = displayRate
+        if hasattr(self, 'updatetimer'):
+            self.updatetimer.start(self._displayPeriod())
+
+    @Property(str)
+    def yAxisLabel(self):
+        return self._yAxisLabel
+
+    @yAxisLabel.setter
+    def yAxisLabel(self, yAxisLabel):
+        self._yAxisLabel = yAxisLabel
+        self.setyAxis()
+
+    @Property(str)
+    def yAxisUnits(self):
+        return self._yAxisUnits
+
+    @yAxisUnits.setter
+    def yAxisUnits(self, yAxisUnits):
+        self._yAxisUnits = yAxisUnits
+        self.setyAxis()
+
+    # Legend properties
+    @Property(bool)
+    def legendenable(self):
+        return self._legend
+
+    @legendenable.setter
+    def legendenable(self, legendenable):
+        self._legend = legendenable
+        self.setSeries()
@@ -1 +1,6 @@
-from gcode_backplot import GcodeBackplot
\ No newline at end of file
+from qtpyvcp.lib.lazy_module import lazyModule
+
+# OpenGL is only imported if the backplot is actually used
+lazyModule(__name__, {
+    'GcodeBackplot': 'qtpyvcp.widgets.display_widgets.gcode_backplot.gcode_backplot',
+})
@@ -36,6 +36,7 @@ LOG = logger.getLogger(__name__)
 from qtpyvcp.plugins import getPlugin
 
 STATUS = getPlugin('status')
+PROGRAM = getPlugin('program_model')
 
 from qtpyvcp.utilities.info import Info
 
@@ -86,7 +87,7 @@ class GcodeBackplot(QBackPlot):
         STATUS.g92_offset.onValueChanged(self.reloadBackplot)
 
         # Connect status signals
-        STATUS.file.notify(self.loadBackplot)
+        PROGRAM.file.notify(self.loadBackplot)
         # STATUS.reload_backplot.notify(self.reloadBackplot)
         STATUS.program_units.notify(lambda v: self.setMetricUnits(v == 2))
 
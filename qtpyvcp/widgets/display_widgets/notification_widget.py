@@ -26,11 +26,28 @@ from qtpyvcp.plugins import getPlugin
 from datetime import datetime
 from time import time
 
+# item data role holding the message type, used for filtering
+MESSAGE_TYPE_ROLE = Qt.UserRole + 1
+
+# message type: (label, icon theme name)
+MESSAGE_TYPES = {
+    'info': ('INFO:', 'dialog-information'),
+    'warn': ('WARNING:', 'dialog-warning'),
+    'error': ('ERROR:', 'dialog-error'),
+    'debug': ('DEBUG', 'dialog-question'),
+}
+
+# max number of notifications to load from the history
+HISTORY_SIZE = 200
+
 class NotificationWidget(QWidget, VCPWidget):
     def __init__(self, parent=None):
         super(NotificationWidget, self).__init__(parent)
         self.notification_channel = getPlugin("notifications")
 
+        self._created_time = time()
+        self._history_loaded = False
+
         self.main_layout = QVBoxLayout()
         self.button_layout = QHBoxLayout()
 
@@ -79,6 +96,7 @@ class NotificationWidget(QWidget, VCPWidget):
         self.all_notification_model_proxy = QSortFilterProxyModel(self.all_notification_view)
 
         self.all_notification_model_proxy.setSourceModel(self.all_notification_model)
+        self.all_notification_model_proxy.setFilterRole(MESSAGE_TYPE_ROLE)
 
         # self.all_notification_view.setModel(self.all_notification_model)
         self.all_notification_view.setModel(self.all_notification_model_proxy)
@@ -103,56 +121,67 @@ class NotificationWidget(QWidget, VCPWidget):
         self.debug_button.clicked.connect(self.show_debug_notifications)
 
     def on_info_message(self, message):
-        timestamp = time()
-        dt_object = datetime.fromtimestamp(timestamp)
-
-        current_time = str(dt_object)
-
-        msg = 'INFO:\nTIME {}\n  {}'.format(current_time, message)
-        notification_item = QStandardItem()
-        notification_item.setText(msg)
-        notification_item.setIcon(QIcon.fromTheme('dialog-information'))
-        notification_item.setEditable(False)
-        self.all_notification_model.appendRow(notification_item)
+        self.addNotification('info', message)
 
     def on_warn_message(self, message):
-        timestamp = time()
-        dt_object = datetime.fromtimestamp(timestamp)
-
-        current_time = str(dt_object)
-
-        msg = 'WARNING:\nTIME {}\n  {}'.format(current_time, message)
-        notification_item = QStandardItem()
-        notification_item.setText(msg)
-        notification_item.setIcon(QIcon.fromTheme('dialog-warning'))
-        notification_item.setEditable(False)
-        self.all_notification_model.appendRow(notification_item)
+        self.addNotification('warn', message)
 
     def on_error_message(self, message):
-        timestamp = time()
-        dt_object = datetime.fromtimestamp(timestamp)
+        self.addNotification('error', message)
 
-        current_time = str(dt_object)
+    def on_debug_message(self, message):
+        self.addNotification('debug', message)
 
-        msg = 'ERROR:\nTIME {}\n  {}'.format(current_time, message)
-        notification_item = QStandardItem()
-        notification_item.setText(msg)
-        notification_item.setIcon(QIcon.fromTheme('dialog-error'))
-        notification_item.setEditable(False)
-        self.all_notification_model.appendRow(notification_item)
+    def addNotification(self, message_type, message, timestamp=None, row=None):
+        """Add a notification to the list.
 
-    def on_debug_message(self, message):
-        timestamp = time()
-        dt_object = datetime.fromtimestamp(timestamp)
+        Args:
+            message_type (str) : info, warn, error or debug.
+            message (str) : The notification text.
+            timestamp (float) : Time of the notification, defaults to now.
+            row (int) : Row to insert the notification at, defaults to the end.
+        """
+        label, icon = MESSAGE_TYPES.get(message_type, MESSAGE_TYPES['info'])
 
-        current_time = str(dt_object)
+        current_time = str(datetime.fromtimestamp(timestamp or time()))
 
-        msg = 'DEBUG\nTIME {}\n  {}'.format(current_time, message)
+        msg = '{}\nTIME {}\n  {}'.format(label, current_time, message)
         notification_item = QStandardItem()
         notification_item.setText(msg)
-        notification_item.setIcon(QIcon.fromTheme('dialog-question'))
+        notification_item.setIcon(QIcon.fromTheme(icon))
         notification_item.setEditable(False)
-        self.all_notification_model.appendRow(notification_item)
+        notification_item.setData(message_type, MESSAGE_TYPE_ROLE)
+
+        if row is None:
+            self.all_notification_model.appendRow(notification_item)
+        else:
+            self.all_notification_model.insertRow(row, notification_item)
+
+    def loadHistory(self):
+        """Load the notifications from before the widget was created.
+
+        Only the most recent :py:attr:`HISTORY_SIZE` are loaded, the full
+        history can be exported from the notifications plugin.
+        """
+        if self._history_loaded:
+            return
+        self._history_loaded = True
+
+        store = getattr(self.notification_channel, 'store', None)
+        if store is None:
+            return
+
+        history = store.latest(HISTORY_SIZE, until=self._created_time)
+        for row, message in enumerate(history):
+            self.addNotification(message.get('message_type'),
+                                 message.get('message_text', ''),
+                                 message.get('timestamp'),
+                                 row=row)
+
+    def showEvent(self, event):
+        # load the history the first time the widget is shown
+        self.loadHistory()
+        super(NotificationWidget, self).showEvent(event)
 
     def show_all_notifications(self):
         self.all_button.setChecked(True)
@@ -172,8 +201,7 @@ class NotificationWidget(QWidget, VCPWidget):
         self.debug_button.setChecked(False)
 
         self.notification_name.setText("Information Notifications")
-        self.all_notification_model_proxy.setFilterRegExp(QRegExp("INFO", Qt.CaseSensitive,
-                                                          QRegExp.FixedString))
+        self.all_notification_model_proxy.setFilterRegExp(QRegExp("^info$"))
 
     def show_warn_notifications(self):
         self.all_button.setChecked(False)
@@ -183,8 +211,7 @@ class NotificationWidget(QWidget, VCPWidget):
         self.debug_button.setChecked(False)
 
         self.notification_name.setText("Warning Notifications")
-        self.all_notification_model_proxy.setFilterRegExp(QRegExp("WANRNING", Qt.CaseSensitive,
-                                                          QRegExp.FixedString))
+        self.all_notification_model_proxy.setFilterRegExp(QRegExp("^warn$"))
 
     def show_error_notifications(self):
         self.all_button.setChecked(False)
@@ -194,8 +221,7 @@ class NotificationWidget(QWidget, VCPWidget):
         self.debug_button.setChecked(False)
 
         self.notification_name.setText("Error Notifications")
-        self.all_notification_model_proxy.setFilterRegExp(QRegExp("ERROR", Qt.CaseInsensitive,
-                                                          QRegExp.FixedString))
+        self.all_notification_model_proxy.setFilterRegExp(QRegExp("^error$"))
 
     def show_debug_notifications(self):
         self.all_button.setChecked(False)
@@ -205,8 +231,7 @@ class NotificationWidget(QWidget, VCPWidget):
         self.debug_button.setChecked(True)
 
         self.notification_name.setText("Debug Notifications")
-        self.all_notification_model_proxy.setFilterRegExp(QRegExp("DEBUG", Qt.CaseSensitive,
-                                                          QRegExp.FixedString))
+        self.all_notification_model_proxy.setFilterRegExp(QRegExp("^debug$"))
 
     def clear_all_notifications(self):
         self.all_notification_model.clear()
@@ -1 +1,7 @@
-from vtk_backplot import VTKBackPlot
\ No newline at end of file
+from qtpyvcp.lib.lazy_module import lazyModule
+
+# VTK is only imported if the backplot is actually used, so the base
+# canon and backplot can be used without it
+lazyModule(__name__, {
+    'VTKBackPlot': 'qtpyvcp.widgets.display_widgets.vtk_backplot.vtk_backplot',
+})
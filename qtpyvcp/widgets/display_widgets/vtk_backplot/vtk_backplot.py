@@ -37,6 +37,7 @@ INFO = Info()
 
 LOG = logger.getLogger(__name__)
 STATUS = getPlugin('status')
+PROGRAM = getPlugin('program_model')
 TOOLTABLE = getPlugin('tooltable')
 OFFSETTABLE = getPlugin('offsettable')
 IN_DESIGNER = os.getenv('DESIGNER', False)
@@ -449,7 +450,7 @@ class VTKBackPlot(QVTKRenderWindowInteractor, VCPWidget, BaseBackPlot):
         self.renderer_window.Render()
         self.interactor.Start()
 
-        self.status.file.notify(self.load_program)
+        PROGRAM.file.notify(self.load_program)
         self.status.position.notify(self.update_position)
         self.status.motion_type.notify(self.motion_type)
 
@@ -680,7 +681,12 @@ class VTKBackPlot(QVTKRenderWindowInteractor, VCPWidget, BaseBackPlot):
         self.offset_axes.clear()
         self.extents.clear()
 
-        if fname:
+        if fname and fname == PROGRAM.file.value:
+            # reuse the preview shared by the program model
+            self.last_filename = fname
+            self.canon = self.canon_class()
+            PROGRAM.replayPreview(self.canon)
+        elif fname:
             self.load(fname)
 
         if self.canon is None:
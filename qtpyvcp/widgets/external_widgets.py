@@ -4,14 +4,14 @@ This module loads custom widgets defined in external packages
 so they are available in QtDesigner.
 """
 
-from pkg_resources import iter_entry_points
+from qtpyvcp.utilities.entry_points import iterEntryPoints
 
 from qtpyvcp.utilities.logger import getLogger
 
 LOG = getLogger(__name__)
 
 
-for entry_point in iter_entry_points(group='qtpyvcp.widgets'):
+for entry_point in iterEntryPoints('qtpyvcp.widgets'):
 
     try:
         group_name = entry_point.name
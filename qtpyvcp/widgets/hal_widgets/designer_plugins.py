@@ -52,6 +52,11 @@ class HalPlotPlugin(_DesignerPlugin):
     def pluginClass(self):
         return HalPlot
 
+from qtpyvcp.widgets.hal_widgets.hal_logger_plot import HalLoggerPlot
+class HalLoggerPlotPlugin(_DesignerPlugin):
+    def pluginClass(self):
+        return HalLoggerPlot
+
 from qtpyvcp.widgets.hal_widgets.hal_bar_indicator import HalBarIndicator
 class HalLoadMeterPlugin(_DesignerPlugin):
     def pluginClass(self):
@@ -0,0 +1,117 @@
+
+import os
+
+from qtpy.QtCore import Property
+
+import pyqtgraph as pg
+
+from qtpyvcp.plugins import getPlugin
+from qtpyvcp.utilities.logger import getLogger
+from qtpyvcp.widgets.base_widgets.plot_base import PlotBase
+
+LOG = getLogger(__name__)
+
+IN_DESIGNER = os.getenv('DESIGNER', False)
+
+
+class HalLoggerPlot(PlotBase):
+    """HAL Logger Plot
+
+    Plot for displaying the HAL pin values logged by the
+    :py:class:`.HalLogger` plugin, which needs to be enabled in the
+    YAML config.
+
+    Any number of the logged series can be plotted, and several plots
+    can show the same series. The x-axis is the time in seconds before
+    the latest sample. Long time windows are reduced to at most
+    ``MAX_POINTS`` points per series, keeping the min and max values, so
+    short peaks are still shown.
+    """
+
+    # max number of points to draw per series
+    MAX_POINTS = 2000
+
+    def __init__(self, parent=None):
+        super(HalLoggerPlot, self).__init__(parent)
+
+        self._series = ''  # comma separated series names, all if empty
+        self._timeWindow = 10  # seconds
+        self._legend = True
+
+        self.plot.setLabel('bottom', 'time', units='s')
+
+        self.curves = {}
+        self.logger = None
+
+        if IN_DESIGNER:
+            return
+
+        self.logger = getPlugin('hal_logger')
+        if self.logger is None:
+            return
+
+        self.setSeries()
+        self.logger.updated.connect(self.onLoggerUpdated)
+
+        self.startUpdateTimer()
+
+    def seriesNames(self):
+        """Get the names of the plotted series."""
+        if self.logger is None:
+            return []
+
+        names = [name.strip() for name in self._series.split(',') if name.strip()]
+        if not names:
+            return self.logger.seriesNames()
+
+        logged = self.logger.seriesNames()
+        for name in names:
+            if name not in logged:
+                LOG.warning("HAL logger series '%s' is not logged", name)
+        return [name for name in names if name in logged]
+
+    def setSeries(self):
+        super(HalLoggerPlot, self).setSeries()
+        self.curves = {}
+
+        names = self.seriesNames()
+        for index, name in enumerate(names):
+            curve = pg.PlotCurveItem(name=name)
+            curve.setPen(pg.intColor(index, hues=max(len(names), 1)))
+            self.plot.addItem(curve)
+            self.curves[name] = curve
+
+    def onLoggerUpdated(self):
+        self._dirty = True
+
+    def redraw(self):
+        """Draw the logged samples in the time window."""
+        if not self.curves:
+            return
+
+        times, values = self.logger.samples(self._timeWindow, self.MAX_POINTS,
+                                            list(self.curves))
+        if not len(times):
+            return
+
+        x = times - times[-1]
+        for name, curve in self.curves.items():
+            curve.setData(x, values[name])
+
+    @Property(str)
+    def series(self):
+        return self._series
+
+    @series.setter
+    def series(self, series):
+        self._series = series
+        self.setSeries()
+
+    @Property(int)
+    def timeWindow(self):
+        return self._timeWindow
+
+    @timeWindow.setter
+    def timeWindow(self, timeWindow):
+        self._timeWindow = timeWindow
+        self._dirty = True
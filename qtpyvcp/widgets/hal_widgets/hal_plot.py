@@ -4,13 +4,14 @@ import os
 from qtpy.QtGui import QColor
 from qtpy.QtWidgets import *
 from qtpy.QtCore import Property, Signal, Slot, QTime, QTimer, Qt
-from collections import deque
 
 import pyqtgraph as pg
 import numpy as np
 
 from qtpyvcp import hal
+from qtpyvcp.lib.ring_buffer import RingBuffer
 from qtpyvcp.widgets import HALWidget
+from qtpyvcp.widgets.base_widgets.plot_base import PlotBase
 
 IN_DESIGNER = os.getenv('DESIGNER', False)
 
@@ -25,7 +26,7 @@ class TimeAxisItem(pg.AxisItem):
         return [QTime().currentTime().addMSecs(value).toString('mm:ss') for value in values]
 
 
-class HalPlot(QWidget, HALWidget):
+class HalPlot(PlotBase, HALWidget):
     """HAL Plot
 
     Plot for displaying HAL pin values.
@@ -34,6 +35,10 @@ class HalPlot(QWidget, HALWidget):
 
     Up to four HAL pin values can be plotted
 
+    The pins are sampled at ``frequency`` into a fixed size ring buffer,
+    and the plot is redrawn at ``displayRate``. Long time windows are
+    reduced to at most ``MAX_POINTS`` points per series when drawn.
+
     .. table:: Generated HAL Pins
 
         ========================= =========== =========
@@ -43,8 +48,11 @@ class HalPlot(QWidget, HALWidget):
         ========================= =========== =========
     """
 
+    # max number of points to draw per series
+    MAX_POINTS = 2000
+
     def __init__(self, parent=None):
-        super(HalPlot, self).__init__(parent)
+        super(HalPlot, self).__init__(parent, TimeAxisItem(orientation='bottom'))
 
         # HAL sampling frequency parameters
         self._frequency = 1       # Hz
@@ -54,10 +62,6 @@ class HalPlot(QWidget, HALWidget):
         self.timestamp = QTime()
         self.timestamp.start()
 
-        self._legend = False
-
-        self._yAxisLabel = 'y label'
-        self._yAxisUnits = 'y units'
         self._minY = 0
         self._maxY = 1
 
@@ -90,28 +94,18 @@ class HalPlot(QWidget, HALWidget):
         self._s4_pin = None
 
         # PyQtGraph stuff
-        self.graph = pg.GraphicsLayoutWidget()
-
-        self.yAxis = pg.AxisItem(orientation='left')
-        self.yAxis.setLabel(self._yAxisLabel, units=self._yAxisUnits)
-        self.yAxis.setGrid(125)
-
-        self.plot = self.graph.addPlot(axisItems={'bottom': TimeAxisItem(orientation='bottom'), 'left': self.yAxis})
         self.plot.setYRange(self._minY, self._maxY, padding=0.0)
 
-        self.legend = self.plot.addLegend()
-
         self.p1 = pg.PlotCurveItem(name=self._s1name)
         self.p2 = pg.PlotCurveItem(name=self._s2name)
         self.p3 = pg.PlotCurveItem(name=self._s3name)
         self.p4 = pg.PlotCurveItem(name=self._s4name)
 
+        self.buffer = None
+
         self.setSeries()
         self.setData()
 
-        self.Vlayout = QVBoxLayout(self)
-        self.Vlayout.addWidget(self.graph)
-
         # HAL stuff
         self._typ = "float"
         self._fmt = "%s"
@@ -119,25 +113,17 @@ class HalPlot(QWidget, HALWidget):
         if IN_DESIGNER:
             return
 
-        # QTimer
-        self.updatetimer = QTimer(self)
-        self.updatetimer.timeout.connect(self.updateplot)
-        self.updatetimer.start(self._refreshRate)
-
-    def setSeries(self):
-        # first remove the legend as it does not update correnctly
-        try:
-            self.legend.scene().removeItem(self.legend)
-        except:
-            pass
+        # QTimers
+        self.sampletimer = QTimer(self)
+        self.sampletimer.timeout.connect(self.sample)
+        self.sampletimer.start(self._refreshRate)
 
-        # remove all plot items
-        self.plot.clear()
+        self.startUpdateTimer()
 
-        # add the legend and plot itmes
-        if self._legend:
-            self.legend = self.plot.addLegend()
+    def setSeries(self):
+        super(HalPlot, self).setSeries()
 
+        # add the plot items
         if self._s1enable:
             self.p1 = pg.PlotCurveItem(name=self._s1name)
             self.plot.addItem(self.p1)
@@ -165,49 +151,53 @@ class HalPlot(QWidget, HALWidget):
         self._timeWindowMS = self._timeWindow * 1000      # time window in milliseconds
         self._bufsize = int(self._timeWindowMS / self._refreshRate)
 
-        # Data containers: collections.deque is list-like container with fast appends and pops on either end
-        self.x = np.linspace(-self.timeWindow, 0.0, self._bufsize)
+        # Data container: preallocated ring buffer of [time, s1, s2, s3, s4] samples,
+        # initially filled with zeros covering the whole time window
         self.now = self.timestamp.elapsed()
-        self.x_data = deque(np.linspace(self.now-self._timeWindowMS, self.now, self._bufsize),self._bufsize)
-
-        self.s1 = np.zeros(self._bufsize, dtype=np.float)
-        self.s1_data = deque([0.0] * self._bufsize, self._bufsize)
-
-        self.s2 = np.zeros(self._bufsize, dtype=np.float)
-        self.s2_data = deque([0.0] * self._bufsize, self._bufsize)
-
-        self.s3 = np.zeros(self._bufsize, dtype=np.float)
-        self.s3_data = deque([0.0] * self._bufsize, self._bufsize)
-
-        self.s4 = np.zeros(self._bufsize, dtype=np.float)
-        self.s4_data = deque([0.0] * self._bufsize, self._bufsize)
-
-    def updateplot(self):
-        self.x_data.append(self.timestamp.elapsed())
-        self.x[:] = self.x_data
+        initial = np.zeros((self._bufsize, 5), dtype=float)
+        initial[:, 0] = np.linspace(self.now - self._timeWindowMS, self.now, self._bufsize)
+
+        self.buffer = RingBuffer(self._bufsize, 5)
+        self.buffer.extend(initial)
+        self._dirty = True
+
+        # restart the timers at the new rates
+        if hasattr(self, 'sampletimer'):
+            self.sampletimer.start(self._refreshRate)
+            self.updatetimer.start(self._displayPeriod())
+
+    def _displayPeriod(self):
+        # redraw period in milliseconds, no faster than the data is sampled
+        return max(super(HalPlot, self)._displayPeriod(), self._refreshRate)
+
+    def sample(self):
+        """Add the current pin values to the buffer."""
+        values = [self.timestamp.elapsed()]
+        for enabled, pin in ((self._s1enable, self._s1_pin),
+                             (self._s2enable, self._s2_pin),
+                             (self._s3enable, self._s3_pin),
+                             (self._s4enable, self._s4_pin)):
+            values.append(pin.value if enabled and pin is not None else 0.0)
+
+        self.buffer.append(values)
+        self._dirty = True
+
+    def redraw(self):
+        """Draw the samples in the buffer."""
+        points = self.buffer.decimated(self.MAX_POINTS)
+        x = points[:, 0]
 
         if self._s1enable:
-            self.s1_data.append(self._s1_pin.value)
-            self.s1[:] = self.s1_data
-            self.p1.setData(self.x, self.s1)
+            self.p1.setData(x, points[:, 1])
 
         if self._s2enable:
-            self.s2_data.append(self._s2_pin.value)
-            self.s2[:] = self.s2_data
-            self.p2.setData(self.x, self.s2)
+            self.p2.setData(x, points[:, 2])
 
         if self._s3enable:
-            self.s3_data.append(self._s3_pin.value)
-            self.s3[:] = self.s3_data
-            self.p3.setData(self.x, self.s3)
+            self.p3.setData(x, points[:, 3])
 
         if self._s4enable:
-            self.s4_data.append(self._s4_pin.value)
-            self.s4[:] = self.s4_data
-            self.p4.setData(self.x, self.s4)
-
-    def setyAxis(self):
-        self.yAxis.setLabel(self._yAxisLabel, units=self._yAxisUnits)
+            self.p4.setData(x, points[:, 4])
 
     def setYRange(self):
         self.plot.setYRange(self._minY, self._maxY, padding = 0.0)
@@ -232,24 +222,6 @@ class HalPlot(QWidget, HALWidget):
         self._timeWindow = timeWindow
         return self.setData()
 
-    @Property(str)
-    def yAxisLabel(self):
-        return self._yAxisLabel
-
-    @yAxisLabel.setter
-    def yAxisLabel(self, yAxisLabel):
-        self._yAxisLabel = yAxisLabel
-        return self.setyAxis()
-
-    @Property(str)
-    def yAxisUnits(self):
-        return self._yAxisUnits
-
-    @yAxisUnits.setter
-    def yAxisUnits(self, yAxisUnits):
-        self._yAxisUnits = yAxisUnits
-        return self.setyAxis()
-
     @Property(float)
     def minYRange(self):
         return self._minY
@@ -269,17 +241,6 @@ class HalPlot(QWidget, HALWidget):
         return self.setYRange()
 
 
-    # Legend propterties
-    @Property(bool)
-    def legendenable(self):
-        return self._legend
-
-    @legendenable.setter
-    def legendenable(self, legendenable):
-        self._legend = legendenable
-        self.setSeries()
-
-
     # Series 1 properties
     @Property(bool)
     def series1enable(self):
@@ -26,14 +26,16 @@
 
 import sys
 import os
+import re
 
-from qtpy.QtCore import Property, QObject, Slot, QFile, QFileInfo, QTextStream, Signal
+from qtpy.QtCore import Property, QObject, Slot, QFile, QFileInfo, QTextStream, Signal, QTimer
 from qtpy.QtGui import QFont, QFontMetrics, QColor
 from qtpy.QtWidgets import QInputDialog, QLineEdit, QDialog, QHBoxLayout, QVBoxLayout, QLabel, QPushButton, QCheckBox
 
 from qtpyvcp.utilities import logger
 from qtpyvcp.plugins import getPlugin
 from qtpyvcp.utilities.info import Info
+from qtpyvcp.lib.gcode_search import GcodeSearch, compilePattern
 
 
 LOG = logger.getLogger(__name__)
@@ -41,12 +43,28 @@ LOG = logger.getLogger(__name__)
 try:
     from PyQt5.Qsci import QsciScintilla, QsciLexerCustom
 except ImportError as e:
+    # don't exit, only the VCPs that actually use the editor should fail
     LOG.critical("Can't import QsciScintilla - is package python-pyqt5.qsci installed?", exc_info=e)
-    sys.exit(1)
+    raise
 
 STATUS = getPlugin('status')
+PROGRAM = getPlugin('program_model')
 INFO = Info()
 
+# G-code tokens, each token is styled as a single run
+TOKEN_RE = re.compile(br'(?P<comment>\((?P<msg>\s*(?:msg|debug|print|abort)\s*,)?[^)]*\)?)'
+                      br'|(?P<assignment>[%<>#=]+)'
+                      br'|(?P<value>[\[\]]+)'
+                      br'|(?P<key>[a-z]+)', re.IGNORECASE)
+
+# O-word control flow, used for folding
+OWORD_RE = re.compile(br'\s*(?:n\d+\s*)?o\s*(?P<name><[^>]*>|\d+)\s*'
+                      br'(?P<keyword>endsub|sub|endif|elseif|else|if|endwhile|while|'
+                      br'do|endrepeat|repeat)\b', re.IGNORECASE)
+
+OWORD_OPEN_KEYWORDS = (b'sub', b'if', b'while', b'do', b'repeat')
+OWORD_ELSE_KEYWORDS = (b'else', b'elseif')
+
 
 # ==============================================================================
 # Simple custom lexer for Gcode
@@ -69,6 +87,17 @@ class GcodeLexer(QsciLexerCustom):
         }
         for key, value in self._styles.iteritems():
             setattr(self, value, key)
+
+        self._token_styles = {
+            'comment': self.Comment,
+            'assignment': self.Assignment,
+            'value': self.Value,
+            'key': self.Key,
+        }
+
+        # O-word block stack at the end of each line, indexed by line number
+        self._fold_stacks = []
+
         font = QFont()
         font.setFamily('Courier')
         font.setFixedPitch(True)
@@ -122,57 +151,100 @@ class GcodeLexer(QsciLexerCustom):
         if not source:
             return
 
-        # the line index will also be needed to implement folding
+        # the line index is needed to implement folding
         index = editor.SendScintilla(editor.SCI_LINEFROMPOSITION, start)
+
+        # scintilla only asks to restyle from the first edited or unstyled
+        # line, so the cached fold state of the lines above is still valid
+        del self._fold_stacks[index:]
+        if len(self._fold_stacks) < index:
+            # the lines above have not all been styled, so work out
+            # their fold state from the last line which was
+            self._cacheFoldStacks(editor, index)
         if index > 0:
-            # the previous state may be needed for multi-line styling
-            pos = editor.SendScintilla(
-                editor.SCI_GETLINEENDPOSITION, index - 1)
-            state = editor.SendScintilla(editor.SCI_GETSTYLEAT, pos)
+            stack = list(self._fold_stacks[index - 1])
         else:
-            state = self.Default
+            stack = []
 
         set_style = self.setStyling
+        token_styles = self._token_styles
         self.startStyling(start, 0x1f)
 
         # scintilla always asks to style whole lines
-        for line in source.splitlines(True):
-            # print line
-            length = len(line)
-            graymode = False
-            msg = ('msg' in line.lower() or 'debug' in line.lower())
-            for char in str(line):
-                # print char
-                if char == '(':
-                    graymode = True
-                    set_style(1, self.Comment)
-                    continue
-                elif char == ')':
-                    graymode = False
+        for line in bytes(source).splitlines(True):
+
+            # style the line as a sequence of runs
+            pos = 0
+            for match in TOKEN_RE.finditer(line):
+                tok_start, tok_end = match.span()
+                if tok_start > pos:
+                    set_style(tok_start - pos, self.Default)
+
+                if match.lastgroup == 'comment' and match.group('msg'):
+                    msg_end = match.end('msg')
                     set_style(1, self.Comment)
-                    continue
-                elif graymode:
-                    if msg and char.lower() in ('m', 's', 'g', ',', 'd', 'e', 'b', 'u'):
-                        set_style(1, self.Assignment)
-                        if char == ',': msg = False
-                    else:
-                        set_style(1, self.Comment)
-                    continue
-                elif char in ('%', '<', '>', '#', '='):
-                    state = self.Assignment
-                elif char in ('[', ']'):
-                    state = self.Value
-                elif char.isalpha():
-                    state = self.Key
-                elif char.isdigit():
-                    state = self.Default
+                    set_style(msg_end - tok_start - 1, self.Assignment)
+                    set_style(tok_end - msg_end, self.Comment)
                 else:
-                    state = self.Default
-                set_style(1, state)
+                    set_style(tok_end - tok_start, token_styles[match.lastgroup])
+
+                pos = tok_end
 
-            # folding implementation goes here
+            if pos < len(line):
+                set_style(len(line) - pos, self.Default)
+
+            # fold on O-word blocks
+            level, flags = self._foldLine(line, stack)
+            editor.SendScintilla(editor.SCI_SETFOLDLEVEL, index,
+                                 (QsciScintilla.SC_FOLDLEVELBASE + level) | flags)
+
+            self._fold_stacks.append(tuple(stack))
             index += 1
 
+    def _cacheFoldStacks(self, editor, end_line):
+        # add the fold stacks of the lines from the last cached line
+        # up to end_line, without styling them
+        first_line = len(self._fold_stacks)
+        start = editor.SendScintilla(editor.SCI_POSITIONFROMLINE, first_line)
+        end = editor.SendScintilla(editor.SCI_POSITIONFROMLINE, end_line)
+
+        source = bytearray(end - start)
+        if end > start:
+            editor.SendScintilla(editor.SCI_GETTEXTRANGE, start, end, source)
+
+        stack = list(self._fold_stacks[-1]) if self._fold_stacks else []
+        for line in bytes(source).splitlines(True)[:end_line - first_line]:
+            self._foldLine(line, stack)
+            self._fold_stacks.append(tuple(stack))
+
+        # in case the text did not split into the expected number of lines
+        while len(self._fold_stacks) < end_line:
+            self._fold_stacks.append(tuple(stack))
+
+    def _foldLine(self, line, stack):
+        # update the O-word block stack for a line, returns the
+        # fold level and flags of the line
+        level = len(stack)
+        flags = 0
+        match = OWORD_RE.match(line)
+        if match:
+            name = match.group('name').lower()
+            keyword = match.group('keyword').lower()
+
+            if keyword == b'while' and stack and stack[-1] == (name, b'do'):
+                # closes a do-while loop
+                stack.pop()
+            elif keyword in OWORD_OPEN_KEYWORDS:
+                stack.append((name, keyword))
+                flags = QsciScintilla.SC_FOLDLEVELHEADERFLAG
+            elif keyword in OWORD_ELSE_KEYWORDS:
+                level = max(level - 1, 0)
+                flags = QsciScintilla.SC_FOLDLEVELHEADERFLAG
+            elif stack:
+                stack.pop()
+
+        return level, flags
+
 
 # ==============================================================================
 # Base editor class
@@ -211,6 +283,9 @@ class EditorBase(QsciScintilla):
         self.setMarkerBackgroundColor(QColor("#ffe4e4"),
                                       self.ARROW_MARKER_NUM)
 
+        # Margin 2 is used for folding O-word blocks
+        self.setFolding(QsciScintilla.BoxedTreeFoldStyle, 2)
+
         # Brace matching: enable for a brace immediately before or after
         # the current position
         #
@@ -230,61 +305,64 @@ class EditorBase(QsciScintilla):
 
         self.highlit = None
 
+        # background search and replace
+        self.searcher = GcodeSearch(self)
+        self.searcher.matchesFound.connect(self._on_matches_found)
+        self.searcher.replaceFinished.connect(self._on_replace_finished)
+        self._text_generation = 0
+        self._replace_all_generation = None
+        self._replace_all_args = None
+        self.textChanged.connect(self._on_text_changed)
+
         # not too small
         # self.setMinimumSize(200, 100)
 
-    def find_text_occurences(self, text):
-        """Return byte positions of start and end of all 'text' occurences in the document"""
+    def document_bytes(self):
+        """Return a copy of the raw document bytes"""
+        length = self.SendScintilla(QsciScintilla.SCI_GETLENGTH)
+        data = bytearray(length + 1)
+        self.SendScintilla(QsciScintilla.SCI_GETTEXT, length + 1, data)
+        return bytes(data[:length])
 
-        text_len = len(text)
-        end_pos = self.SendScintilla(QsciScintilla.SCI_GETLENGTH)
-        self.SendScintilla(QsciScintilla.SCI_SETTARGETSTART, 0)
-        self.SendScintilla(QsciScintilla.SCI_SETTARGETEND, end_pos)
-
-        occurences = []
-
-        match = self.SendScintilla(QsciScintilla.SCI_SEARCHINTARGET, text_len, text)
-        print(match)
-        while match != -1:
-            match_end = self.SendScintilla(QsciScintilla.SCI_GETTARGETEND)
-            occurences.append((match, match_end))
-            # -- if there's a match, the target is modified so we shift its start
-            # -- and restore its end --
-            self.SendScintilla(QsciScintilla.SCI_SETTARGETSTART, match_end)
-            self.SendScintilla(QsciScintilla.SCI_SETTARGETEND, end_pos)
-            # -- find it again in the new (reduced) target --
-            match = self.SendScintilla(QsciScintilla.SCI_SEARCHINTARGET, text_len, text)
-
-        return occurences
-
-    def highlight_occurences(self, text):
-
-        occurences = self.find_text_occurences(text)
-        text_len = len(text)
-        self.SendScintilla(QsciScintilla.SCI_SETSTYLEBITS, 8)
-        for occs in occurences:
-            self.SendScintilla(QsciScintilla.SCI_SETINDICATORCURRENT, 0)
-            self.SendScintilla(QsciScintilla.SCI_INDICATORFILLRANGE,
-                               occs[0], text_len)
+    def search_pattern(self, text, re=False, cs=True, wo=False):
+        """Compile a pattern to search the document bytes for 'text'"""
+        encoding = 'utf-8' if self.isUtf8() else 'latin-1'
+        return compilePattern(text, regex=re, case_sensitive=cs,
+                              whole_word=wo, encoding=encoding)
 
-            # -- this is somewhat buggy : it was meant to change the color
-            # -- but somewhy the colouring suddenly changes colour.
+    def find_text_occurences(self, text, re=False, cs=True, wo=False):
+        """Return byte positions of start and end of all 'text' occurences in the document"""
+        pattern = self.search_pattern(text, re, cs, wo)
+        return [match.span() for match in pattern.finditer(self.document_bytes())]
+
+    def highlight_occurences(self, text, re=False, cs=True, wo=False):
+        """Highlight all 'text' occurences, the document is searched in the
+        background and the matches are highlighted as they are found"""
+        self.clear_highlights()
+        self.highlit = []
+        self.searcher.search(self.document_bytes(),
+                             self.search_pattern(text, re, cs, wo))
+
+    def _on_matches_found(self, occurences):
+        if self.highlit is None:
+            return
 
-            # self.SendScintilla(Qsci.QsciScintilla.SCI_STARTSTYLING, occs[0], 0xFF)
-            # self.SendScintilla(Qsci.QsciScintilla.SCI_SETSTYLING,
-            #                    textLen,
-            #                    styles["HIGHLIGHT"][0])
+        self.SendScintilla(QsciScintilla.SCI_SETINDICATORCURRENT, 0)
+        for start, end in occurences:
+            self.SendScintilla(QsciScintilla.SCI_INDICATORFILLRANGE,
+                               start, end - start)
 
-        self.highlit = occurences
+        self.highlit.extend(occurences)
 
     def clear_highlights(self):
+        self.searcher.cancel()
+
         if self.highlit is None:
             return
 
-        for occs in self.highlit:
-            self.SendScintilla(QsciScintilla.SCI_SETINDICATORCURRENT, 0)
-            self.SendScintilla(QsciScintilla.SCI_INDICATORCLEARRANGE,
-                               occs[0], occs[1] - occs[0])
+        self.SendScintilla(QsciScintilla.SCI_SETINDICATORCURRENT, 0)
+        self.SendScintilla(QsciScintilla.SCI_INDICATORCLEARRANGE,
+                           0, self.SendScintilla(QsciScintilla.SCI_GETLENGTH))
         self.highlit = None
 
     def text_search(self, text, from_start, highlight_all, re=False,
@@ -293,8 +371,7 @@ class EditorBase(QsciScintilla):
 
         if text is not None:
             if highlight_all:
-                self.clear_highlights()
-                self.highlight_occurences(text)
+                self.highlight_occurences(text, re, cs, wo)
 
             if from_start:
                 self.setCursorPosition(0, 0)
@@ -306,8 +383,7 @@ class EditorBase(QsciScintilla):
                      line=-1, index=-1, show=True):
 
         if text is not None and sub is not None:
-            self.clear_highlights()
-            self.highlight_occurences(text)
+            self.highlight_occurences(text, re, cs, wo)
 
             if from_start:
                 self.setCursorPosition(0, 0)
@@ -323,15 +399,40 @@ class EditorBase(QsciScintilla):
         if text is not None and sub is not None:
             self.clear_highlights()
 
-            self.SendScintilla(QsciScintilla.SCI_SETTARGETSTART, 0)
-            end_pos = self.SendScintilla(QsciScintilla.SCI_GETLENGTH)
-            self.SendScintilla(QsciScintilla.SCI_SETTARGETEND, end_pos)
+            if not isinstance(sub, bytes):
+                sub = sub.encode('utf-8' if self.isUtf8() else 'latin-1')
+
+            self._replace_all_args = (text, sub, re, cs, wo)
+            self._replace_all_generation = self._text_generation
+            self.searcher.replaceAll(self.document_bytes(),
+                                     self.search_pattern(text, re, cs, wo),
+                                     sub, literal=not re)
+
+    def _on_replace_finished(self, data, count):
+        if self._replace_all_generation != self._text_generation:
+            # the text was edited while replacing, start over
+            LOG.debug("Text changed during replace all, restarting")
+            text, sub, re, cs, wo = self._replace_all_args
+            self.text_replace_all(text, sub, True, re, cs, wo)
+            return
 
-            print(self.SendScintilla(QsciScintilla.SCI_SEARCHINTARGET, len(text), text))
+        if count == 0:
+            return
+
+        # replace the whole document in a single edit, so the
+        # replace all can be undone in a single step
+        self.beginUndoAction()
+        self.SendScintilla(QsciScintilla.SCI_SETTARGETSTART, 0)
+        self.SendScintilla(QsciScintilla.SCI_SETTARGETEND,
+                           self.SendScintilla(QsciScintilla.SCI_GETLENGTH))
+        self.SendScintilla(QsciScintilla.SCI_REPLACETARGET, len(data), data)
+        self.endUndoAction()
 
-            # match = self.findFirst(text, re, cs, wo, wrap, forward, line, index, show)
-            # if match:
-            #     self.replace(sub)
+    def _on_text_changed(self):
+        self._text_generation += 1
+        # match positions from a running search, or still queued, would be stale
+        if self.highlit is not None:
+            self.searcher.cancel()
 
     # must set lexer paper background color _and_ editor background color it seems
     def set_background_color(self, color):
@@ -355,6 +456,9 @@ class EditorBase(QsciScintilla):
 class GcodeEditor(EditorBase, QObject):
     ARROW_MARKER_NUM = 8
 
+    # min time (in ms) between motion line updates, about one frame
+    MOTION_LINE_INTERVAL = 16
+
     def __init__(self, parent=None):
         super(GcodeEditor, self).__init__(parent)
 
@@ -364,6 +468,14 @@ class GcodeEditor(EditorBase, QObject):
         self.last_line = None
         # self.setEolVisibility(True)
 
+        # motion line updates are applied at most once per frame
+        self._cursor_follows_motion_line = False
+        self._pending_motion_line = None
+        self._motion_line_timer = QTimer(self)
+        self._motion_line_timer.setSingleShot(True)
+        self._motion_line_timer.setInterval(self.MOTION_LINE_INTERVAL)
+        self._motion_line_timer.timeout.connect(self._update_motion_line)
+
         self.is_editor = False
 
         self.dialog = FindReplaceDialog(parent=self)
@@ -445,7 +557,7 @@ class GcodeEditor(EditorBase, QObject):
     def replace_all_text(self, find_text, replace_text):
         from_start = True
         if find_text != "" and replace_text != "":
-            self.text_replace_all(find_text, find_text, from_start)
+            self.text_replace_all(find_text, replace_text, from_start)
 
     @Property(bool)
     def is_editor(self):
@@ -455,13 +567,26 @@ class GcodeEditor(EditorBase, QObject):
     def is_editor(self, enabled):
         self._is_editor = enabled
         if not self._is_editor:
-            STATUS.file.notify(self.load_program)
-            STATUS.motion_line.onValueChanged(self.highlight_line)
+            PROGRAM.file.notify(self.load_program)
+            STATUS.motion_line.onValueChanged(self.on_motion_line_changed)
 
             # STATUS.connect('line-changed', self.highlight_line)
             # if self.idle_line_reset:
             #     STATUS.connect('interp_idle', lambda w: self.set_line_number(None, 0))
 
+    @Property(bool)
+    def cursor_follows_motion_line(self):
+        """Property to move the cursor to the motion line (bool).
+
+        By default only the marker and the view follow the motion line,
+        and the cursor is left where the user put it.
+        """
+        return self._cursor_follows_motion_line
+
+    @cursor_follows_motion_line.setter
+    def cursor_follows_motion_line(self, follow):
+        self._cursor_follows_motion_line = follow
+
     @Property(str)
     def backgroundcolor(self):
         """Property to set the background color of the GCodeEditor (str).
@@ -501,7 +626,10 @@ class GcodeEditor(EditorBase, QObject):
     def load_text(self, fname):
         try:
             fp = os.path.expanduser(fname)
-            self.setText(open(fp).read())
+            if PROGRAM.isLoaded(fp):
+                self.setText(PROGRAM.text.value)
+            else:
+                self.setText(open(fp).read())
         except:
             LOG.error('File path is not valid: {}'.format(fname))
             self.setText('')
@@ -520,11 +648,25 @@ class GcodeEditor(EditorBase, QObject):
         self.markerAdd(line, self.ARROW_MARKER_NUM)
         if self.last_line:
             self.markerDelete(self.last_line, self.ARROW_MARKER_NUM)
-        self.setCursorPosition(line, 0)
-        self.ensureCursorVisible()
-        self.SendScintilla(QsciScintilla.SCI_VERTICALCENTRECARET)
+        if self._cursor_follows_motion_line:
+            self.setCursorPosition(line, 0)
+            self.ensureCursorVisible()
+            self.SendScintilla(QsciScintilla.SCI_VERTICALCENTRECARET)
+        else:
+            lines_on_screen = self.SendScintilla(QsciScintilla.SCI_LINESONSCREEN)
+            self.setFirstVisibleLine(max(line - lines_on_screen // 2, 0))
         self.last_line = line
 
+    def on_motion_line_changed(self, line):
+        self._pending_motion_line = line
+        if not self._motion_line_timer.isActive():
+            self._motion_line_timer.start()
+
+    def _update_motion_line(self):
+        line = self._pending_motion_line
+        if line is not None and line != self.last_line:
+            self.highlight_line(line)
+
     def set_line_number(self, line):
         pass
 
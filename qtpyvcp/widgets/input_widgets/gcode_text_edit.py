@@ -6,22 +6,47 @@ QPlainTextEdit based G-code editor with syntax highlighting.
 """
 
 import os
+import re
+import time
 import oyaml as yaml
 
-from qtpy.QtCore import (Qt, QRect, QRegularExpression, QEvent, Slot, Signal, Property)
+from qtpy.QtCore import (Qt, QRect, QTimer, QEvent, Slot, Signal, Property)
 from qtpy.QtGui import (QFont, QColor, QPainter, QSyntaxHighlighter, QTextDocument,
                         QTextOption, QTextFormat, QTextCharFormat, QTextCursor)
-from qtpy.QtWidgets import (QApplication, QPlainTextEdit, QTextEdit, QWidget, QMenu, QPlainTextDocumentLayout)
+from qtpy.QtWidgets import (QPlainTextEdit, QTextEdit, QWidget, QMenu, QPlainTextDocumentLayout)
 
 from qtpyvcp import DEFAULT_CONFIG_FILE
 from qtpyvcp.plugins import getPlugin
 from qtpyvcp.actions import program_actions
 
 STATUS = getPlugin('status')
+PROGRAM = getPlugin('program_model')
 YAML_DIR = os.path.dirname(DEFAULT_CONFIG_FILE)
 
 
 class GcodeSyntaxHighlighter(QSyntaxHighlighter):
+    """G-code syntax highlighter.
+
+    The match patterns defined in ``gcode_syntax.yml`` are combined into a
+    single regular expression so that each line is tokenized in one pass.
+    Only the visible blocks, plus a look-ahead window, are highlighted right
+    away; the rest of the document is highlighted in short time slices
+    whenever the event loop is idle.
+    """
+
+    # block states
+    UNSEEN = -1
+    HIGHLIGHTED = 0
+    DEFERRED = 1
+
+    # number of blocks past the bottom of the view to highlight immediately
+    LOOK_AHEAD = 100
+
+    # max time (in seconds) to spend per background highlighting slice
+    TIME_SLICE = 0.01
+
+    _syntax_specs = None
+
     def __init__(self, parent):
         super(GcodeSyntaxHighlighter, self).__init__(parent.document())
 
@@ -30,19 +55,38 @@ class GcodeSyntaxHighlighter(QSyntaxHighlighter):
         self.rules = []
         self.char_fmt = QTextCharFormat()
 
-        self._abort = False
+        self._regex = None
+        self._formats = {}
+
+        # range of block numbers which should be highlighted immediately
+        self._window = (0, self.LOOK_AHEAD)
+        self._force_block = None
+        self._defer_all = False
+
+        # first block number that may still need background highlighting
+        self._bg_block_num = 0
+        self._bg_timer = QTimer(self)
+        self._bg_timer.setSingleShot(True)
+        self._bg_timer.setInterval(0)
+        self._bg_timer.timeout.connect(self._highlightDeferred)
+
+        parent.verticalScrollBar().valueChanged.connect(self.updateWindow)
 
         self.loadSyntaxFromYAML()
+        self.updateWindow()
 
     def loadSyntaxFromYAML(self):
 
-        with open(os.path.join(YAML_DIR, 'gcode_syntax.yml')) as fh:
-            syntax_specs = yaml.load(fh, Loader=yaml.FullLoader)
+        if GcodeSyntaxHighlighter._syntax_specs is None:
+            with open(os.path.join(YAML_DIR, 'gcode_syntax.yml')) as fh:
+                GcodeSyntaxHighlighter._syntax_specs = yaml.load(fh, Loader=yaml.FullLoader)
+
+        syntax_specs = GcodeSyntaxHighlighter._syntax_specs
 
         assert isinstance(syntax_specs, dict), \
             "Invalid YAML format for language spec, root item must be a dictionary."
 
-        cio = QRegularExpression.CaseInsensitiveOption
+        self.rules = []
 
         for lang_name, language in syntax_specs.items():
 
@@ -61,8 +105,33 @@ class GcodeSyntaxHighlighter(QSyntaxHighlighter):
                 char_fmt = self.charFormatFromSpec(fmt_spec)
 
                 patterns = spec.get('match', [])
-                for pattern in patterns:
-                    self.rules.append([QRegularExpression(pattern, cio), char_fmt])
+                if isinstance(patterns, basestring):
+                    # a plain string is a set of single character matches
+                    patterns = list(patterns)
+
+                if patterns:
+                    self.rules.append([patterns, char_fmt])
+
+        self.compileRules()
+
+    def compileRules(self):
+        """Combine the rules into a single case insensitive regex.
+
+        Rules defined later in the YAML take precedence over earlier ones,
+        so the alternatives are tried in reverse order. Within a rule the
+        longest patterns are tried first, so that e.g. G92.1 is not matched
+        as G92.
+        """
+        alternatives = []
+        self._formats = {}
+        for index in reversed(range(len(self.rules))):
+            patterns, char_fmt = self.rules[index]
+            group = 'r{}'.format(index)
+            patterns = sorted(patterns, key=len, reverse=True)
+            alternatives.append('(?P<{}>{})'.format(group, '|'.join(patterns)))
+            self._formats[group] = char_fmt
+
+        self._regex = re.compile('|'.join(alternatives), re.IGNORECASE)
 
     def charFormatFromSpec(self, fmt_spec):
 
@@ -88,28 +157,88 @@ class GcodeSyntaxHighlighter(QSyntaxHighlighter):
         char_fmt.setFont(self._parent.font())
         return char_fmt
 
+    def setDocument(self, doc):
+        self._bg_timer.stop()
+        self._bg_block_num = 0
+        super(GcodeSyntaxHighlighter, self).setDocument(doc)
+
+    def updateFont(self):
+        """Update the text formats after the editor font has changed."""
+        self.loadSyntaxFromYAML()
+        self.rehighlight()
+
+    def rehighlight(self):
+        """Re-highlight the document, deferring blocks that are not in view."""
+        self._defer_all = True
+        try:
+            super(GcodeSyntaxHighlighter, self).rehighlight()
+        finally:
+            self._defer_all = False
+
+    @Slot()
+    def updateWindow(self):
+        """Update the range of blocks to highlight immediately and highlight
+        any deferred blocks that have scrolled into it."""
+        first = self._parent.firstVisibleBlock().blockNumber()
+        line_height = max(self._parent.fontMetrics().height(), 1)
+        visible = self._parent.viewport().height() // line_height + 1
+        self._window = (first, first + visible + self.LOOK_AHEAD)
+
+        block = self.document().findBlockByNumber(first)
+        while block.isValid() and block.blockNumber() <= self._window[1]:
+            if block.userState() == self.DEFERRED:
+                self._highlightBlockNow(block)
+            block = block.next()
+
+    def _highlightBlockNow(self, block):
+        self._force_block = block.blockNumber()
+        try:
+            self.rehighlightBlock(block)
+        finally:
+            self._force_block = None
+
+    @Slot()
+    def _highlightDeferred(self):
+        """Highlight deferred blocks until the time slice is used up."""
+        deadline = time.time() + self.TIME_SLICE
+
+        block = self.document().findBlockByNumber(self._bg_block_num)
+        while block.isValid():
+            if block.userState() == self.DEFERRED:
+                self._highlightBlockNow(block)
+            block = block.next()
+            if time.time() > deadline:
+                break
+
+        if block.isValid():
+            self._bg_block_num = block.blockNumber()
+            self._bg_timer.start()
+        else:
+            self._bg_block_num = self.document().blockCount()
+
     def highlightBlock(self, text):
         """Apply syntax highlighting to the given block of text.
         """
+        block_num = self.currentBlock().blockNumber()
 
-        QApplication.processEvents()
-
-        for regex, fmt in self.rules:
+        if block_num != self._force_block \
+                and not self._window[0] <= block_num <= self._window[1] \
+                and (self._defer_all or self.currentBlockState() != self.HIGHLIGHTED):
 
-            nth = 0
-            match = regex.match(text, offset=0)
-            index = match.capturedStart()
+            # not in view, highlight later in the background
+            self.setCurrentBlockState(self.DEFERRED)
+            if block_num < self._bg_block_num:
+                self._bg_block_num = block_num
+            if not self._bg_timer.isActive():
+                self._bg_timer.start()
+            return
 
-            while index >= 0:
+        formats = self._formats
+        for match in self._regex.finditer(text):
+            start, end = match.span()
+            self.setFormat(start, end - start, formats[match.lastgroup])
 
-                # We actually want the index of the nth match
-                index = match.capturedStart(nth)
-                length = match.capturedLength(nth)
-                self.setFormat(index, length, fmt)
-
-                # check the rest of the string
-                match = regex.match(text, offset=index + length)
-                index = match.capturedStart()
+        self.setCurrentBlockState(self.HIGHLIGHTED)
 
 
 class GcodeTextEdit(QPlainTextEdit):
@@ -119,6 +248,9 @@ class GcodeTextEdit(QPlainTextEdit):
     """
     focusLine = Signal(int)
 
+    # min time (in ms) between motion line updates, about one frame
+    MOTION_LINE_INTERVAL = 16
+
     def __init__(self, parent=None):
         super(GcodeTextEdit, self).__init__(parent)
 
@@ -130,7 +262,21 @@ class GcodeTextEdit(QPlainTextEdit):
         self.focused_line = 1
         self.current_line_background = QColor(self.palette().alternateBase())
 
-        self.old_docs = []
+        # motion line tracking
+        self.motion_line = None
+        self.motion_line_background = QColor(self.palette().alternateBase())
+        self.follow_motion_line = True
+        # the motion line is shown with a marker, the cursor is left alone
+        self.cursor_follows_motion_line = False
+        self._pending_motion_line = None
+        self._motion_line_timer = QTimer(self)
+        self._motion_line_timer.setSingleShot(True)
+        self._motion_line_timer.setInterval(self.MOTION_LINE_INTERVAL)
+        self._motion_line_timer.timeout.connect(self._updateMotionLine)
+
+        self._cursor_selection = None
+        self._motion_line_selection = None
+
         # set the custom margin
         self.margin = NumberMargin(self)
 
@@ -154,8 +300,8 @@ class GcodeTextEdit(QPlainTextEdit):
         self.cursorPositionChanged.connect(self.onCursorChanged)
 
         # connect status signals
-        STATUS.file.notify(self.loadProgramFile)
-        STATUS.motion_line.onValueChanged(self.setCurrentLine)
+        PROGRAM.file.notify(self.loadProgramFile)
+        STATUS.motion_line.onValueChanged(self.onMotionLineChanged)
 
     def keyPressEvent(self, event):
         # keep the cursor centered
@@ -173,15 +319,10 @@ class GcodeTextEdit(QPlainTextEdit):
     def changeEvent(self, event):
         if event.type() == QEvent.FontChange:
             # Update syntax highlighter with new font
-            self.gCodeHighlighter = GcodeSyntaxHighlighter(self)
+            self.gCodeHighlighter.updateFont()
         super(GcodeTextEdit, self).changeEvent(event)
 
     def setPlainText(self, p_str):
-        # FixMe: Keep a reference to old QTextDocuments form previously loaded
-        # files. This is needed to prevent garbage collection which results in a
-        # seg fault if the document is discarded while still being highlighted.
-        self.old_docs.append(self.document())
-
         doc = QTextDocument()
         doc.setDocumentLayout(QPlainTextDocumentLayout(doc))
         doc.setPlainText(p_str)
@@ -189,8 +330,12 @@ class GcodeTextEdit(QPlainTextEdit):
         self.setDocument(doc)
         self.margin.updateWidth()
 
+        self._cursor_selection = None
+        self._motion_line_selection = None
+
         # start syntax heightening
-        self.gCodeHighlighter = GcodeSyntaxHighlighter(self)
+        self.gCodeHighlighter.setDocument(doc)
+        self.gCodeHighlighter.updateWindow()
 
     @Slot(bool)
     def EditorReadOnly(self, state):
@@ -211,6 +356,42 @@ class GcodeTextEdit(QPlainTextEdit):
         self.setCurrentLine(2)
         self.setCurrentLine(1)
 
+    @Property(QColor)
+    def motionLineBackground(self):
+        return self.motion_line_background
+
+    @motionLineBackground.setter
+    def motionLineBackground(self, color):
+        self.motion_line_background = color
+        if self.motion_line is not None:
+            self.setMotionLine(self.motion_line)
+
+    @Property(bool)
+    def followMotionLine(self):
+        """Whether to scroll the view to keep the motion line centered."""
+        return self.follow_motion_line
+
+    @followMotionLine.setter
+    def followMotionLine(self, follow):
+        self.follow_motion_line = follow
+
+    @Property(bool)
+    def cursorFollowsMotionLine(self):
+        """Whether to move the text cursor to the motion line.
+
+        By default the motion line is shown with a separate marker, and the
+        user's cursor (and the focused line shown in the backplot) are not
+        affected by the running program. If True the cursor is moved to
+        the motion line instead, which is much slower.
+        """
+        return self.cursor_follows_motion_line
+
+    @cursorFollowsMotionLine.setter
+    def cursorFollowsMotionLine(self, follow):
+        self.cursor_follows_motion_line = follow
+        self._motion_line_selection = None
+        self._updateExtraSelections()
+
     @Property(QColor)
     def marginBackground(self):
         return self.margin.background
@@ -250,7 +431,9 @@ class GcodeTextEdit(QPlainTextEdit):
     @Slot(str)
     @Slot(object)
     def loadProgramFile(self, fname=None):
-        if fname:
+        if fname and PROGRAM.isLoaded(fname):
+            self.setPlainText(PROGRAM.text.value)
+        elif fname:
             with open(fname) as f:
                 gcode = f.read()
             self.setPlainText(gcode)
@@ -258,10 +441,63 @@ class GcodeTextEdit(QPlainTextEdit):
     @Slot(int)
     @Slot(object)
     def setCurrentLine(self, line):
-        cursor = QTextCursor(self.document().findBlockByLineNumber(line - 1))
+        cursor = QTextCursor(self.findBlock(line))
         self.setTextCursor(cursor)
         self.centerCursor()
 
+    def findBlock(self, line):
+        """Get the QTextBlock for a line number (1 based).
+
+        Lines map directly to blocks as word wrap is disabled, and the
+        document looks blocks up by number in its block tree.
+        """
+        block = self.document().findBlockByNumber(max(line - 1, 0))
+        if not block.isValid():
+            return self.document().lastBlock()
+        return block
+
+    @Slot(int)
+    @Slot(object)
+    def onMotionLineChanged(self, line):
+        """Queue a motion line update, these are applied at most once per
+        frame however often the motion line changes."""
+        self._pending_motion_line = line
+        if not self._motion_line_timer.isActive():
+            self._motion_line_timer.start()
+
+    def _updateMotionLine(self):
+        line = self._pending_motion_line
+        if line is not None and line != self.motion_line:
+            self.setMotionLine(line)
+
+    @Slot(int)
+    def setMotionLine(self, line):
+        """Show the currently executing line."""
+        self.motion_line = line
+
+        if self.cursor_follows_motion_line:
+            self.setCurrentLine(line)
+            return
+
+        block = self.findBlock(line)
+
+        selection = QTextEdit.ExtraSelection()
+        selection.format.setBackground(self.motion_line_background)
+        selection.format.setProperty(QTextFormat.FullWidthSelection, True)
+        selection.cursor = QTextCursor(block)
+        self._motion_line_selection = selection
+        self._updateExtraSelections()
+
+        if self.follow_motion_line:
+            # without word wrap the scroll bar value is the first visible line
+            visible_lines = self.viewport().height() // max(self.fontMetrics().height(), 1)
+            self.verticalScrollBar().setValue(block.blockNumber() - visible_lines // 2)
+
+    def _updateExtraSelections(self):
+        selections = [sel for sel in (self._cursor_selection, self._motion_line_selection)
+                      if sel is not None]
+        self.setExtraSelections(selections)
+
     def getCurrentLine(self):
         return self.textCursor().blockNumber() + 1
 
@@ -275,7 +511,8 @@ class GcodeTextEdit(QPlainTextEdit):
             selection.format.setProperty(QTextFormat.FullWidthSelection, True)
             selection.cursor = self.textCursor()
             selection.cursor.clearSelection()
-            self.setExtraSelections([selection])
+            self._cursor_selection = selection
+            self._updateExtraSelections()
 
         # emit signals for backplot etc.
         self.focused_line = block_number + 1
@@ -295,6 +532,7 @@ class GcodeTextEdit(QPlainTextEdit):
         rec = QRect(cr.left(), cr.top(), self.margin.getWidth(), cr.height())
         self.margin.setGeometry(rec)
         QPlainTextEdit.resizeEvent(self, *e)
+        self.gCodeHighlighter.updateWindow()
 
 
 class NumberMargin(QWidget):
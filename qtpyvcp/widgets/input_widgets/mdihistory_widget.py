@@ -19,7 +19,7 @@ ToDo:
 """
 import os
 
-from qtpy.QtCore import Qt, Slot, Property, QTimer
+from qtpy.QtCore import Qt, Slot, Property
 from qtpy.QtGui import QIcon
 from qtpy.QtWidgets import QListWidget
 from qtpy.QtWidgets import QListWidgetItem
@@ -53,6 +53,7 @@ class MDIHistory(QListWidget, CMDWidget):
     MDIQ_DONE = 0
     MDIQ_RUNNING = 1
     MDIQ_TODO = 2
+    MDIQ_FAILED = 3
     MDQQ_ROLE = 256
 
     def __init__(self, parent=None):
@@ -62,12 +63,17 @@ class MDIHistory(QListWidget, CMDWidget):
         self.mdi_entryline_name = None
         self.mdi_entry_widget = None
 
-        self.heart_beat_timer = None
+        # the queue is run as each command completes, rather than polled
+        self._queue_paused = False
+        self._running_item = None
+        self._wait_for_idle = False
 
         self.icon_run_name = 'media-playback-start'
         self.icon_run = QIcon.fromTheme(self.icon_run_name)
         self.icon_waiting_name = 'media-playback-pause'
         self.icon_waiting = QIcon.fromTheme(self.icon_waiting_name)
+        self.icon_failed_name = 'dialog-error'
+        self.icon_failed = QIcon.fromTheme(self.icon_failed_name)
 
         #self.returnPressed.connect(self.submit)
 
@@ -86,10 +92,8 @@ class MDIHistory(QListWidget, CMDWidget):
         """Toggle queue pause.
         Starting point is the queue is active.
         """
-        if toggle:
-            self.heart_beat_timer.stop()
-        else:
-            self.heart_beat_timer.start()
+        self._queue_paused = toggle
+        self.runNext()
 
     @Slot()
     def clearQueue(self):
@@ -123,6 +127,8 @@ class MDIHistory(QListWidget, CMDWidget):
             row_item.setIcon(self.icon_waiting)
             row -= 1
 
+        self.runNext()
+
     @Slot()
     def runSelection(self):
         """Run the selected row only."""
@@ -132,6 +138,8 @@ class MDIHistory(QListWidget, CMDWidget):
         row_item.setData(MDIHistory.MDQQ_ROLE, MDIHistory.MDIQ_TODO)
         row_item.setIcon(self.icon_waiting)
 
+        self.runNext()
+
     @Slot()
     def submit(self):
         """Put a new command on the queue for later execution.
@@ -150,6 +158,8 @@ class MDIHistory(QListWidget, CMDWidget):
         # now clear down the mdi entry text ready for new input
         self.mdi_entry_widget.clear()
 
+        self.runNext()
+
     def rowClicked(self):
         """Item row clicked."""
         pass
@@ -219,16 +229,20 @@ class MDIHistory(QListWidget, CMDWidget):
             row_item.setIcon(QIcon())
             self.addItem(row_item)
 
-    def heartBeat(self):
-        """Supports heart beat on the MDI History execution queue.
-        Issue the next command from the queue.
-        Double check machine is in ok state to accept next command.
-        Issue the command and if success mark command as being active.
-        Mark last command as done.
+    def runNext(self):
+        """Issue the next command from the queue.
+
+        Called whenever a command is queued, when the running command is
+        done and when the interpreter becomes idle. Issues the oldest
+        command waiting to run, unless the queue is paused, a command is
+        already running or the interpreter is busy, e.g. running a program.
         """
+        if self._queue_paused or self._running_item is not None:
+            return
+
         # check if machine is idle and ready to run another command
         if STAT.interp_state != linuxcnc.INTERP_IDLE:
-            # RS274NGC interpreter not in a state to execute, bail
+            # keep the commands queued until the interpreter is idle
             return
 
         # scan for the next command to execute from bottom up.
@@ -237,20 +251,54 @@ class MDIHistory(QListWidget, CMDWidget):
             row_item = self.item(list_length)
             row_item_data = row_item.data(MDIHistory.MDQQ_ROLE)
 
-            if row_item_data == MDIHistory.MDIQ_RUNNING:
-                # machine is in idle state so the running command is done
-                row_item.setData(MDIHistory.MDQQ_ROLE, MDIHistory.MDIQ_DONE)
-                row_item.setIcon(QIcon())
-
-            elif row_item_data == MDIHistory.MDIQ_TODO:
+            if row_item_data == MDIHistory.MDIQ_TODO:
                 cmd = str(row_item.text()).strip()
                 row_item.setData(MDIHistory.MDQQ_ROLE, MDIHistory.MDIQ_RUNNING)
                 row_item.setIcon(self.icon_run)
-                issue_mdi(cmd)
+                self._running_item = row_item
+
+                commands = issue_mdi(cmd)
+                self._wait_for_idle = commands is None
+                if commands:
+                    commands[-1].onFinished(self.onCommandFinished)
+                elif commands is not None:
+                    # nothing to run, e.g. an empty command
+                    self.onCommandFinished()
+                # else the mdi_executor plugin is not available, so
+                # wait for the interpreter to become idle
                 break
 
             list_length -= 1
 
+    def onCommandFinished(self, success=True):
+        """Mark the running command as done or failed and issue the next one."""
+        if self._running_item is None:
+            return
+
+        row_item, self._running_item = self._running_item, None
+        if row_item.data(MDIHistory.MDQQ_ROLE) == MDIHistory.MDIQ_RUNNING:
+            if success:
+                row_item.setData(MDIHistory.MDQQ_ROLE, MDIHistory.MDIQ_DONE)
+                row_item.setIcon(QIcon())
+            else:
+                # failed, or cancelled e.g. by an abort
+                row_item.setData(MDIHistory.MDQQ_ROLE, MDIHistory.MDIQ_FAILED)
+                row_item.setIcon(self.icon_failed)
+
+        self.runNext()
+
+    def onInterpStateChanged(self, interp_state):
+        if interp_state != linuxcnc.INTERP_IDLE:
+            return
+
+        if self._wait_for_idle:
+            # the mdi_executor plugin is not available, so the command
+            # is taken to be done once the interpreter is idle
+            self.onCommandFinished()
+        else:
+            # run any commands queued while the interpreter was busy
+            self.runNext()
+
     def initialize(self):
         """Load up starting data and set signal connections."""
         history = STATUS.mdi_history.value
@@ -263,12 +311,11 @@ class MDIHistory(QListWidget, CMDWidget):
             if hasattr(obj, str(self.mdi_entryline_name)):
                 self.mdi_entry_widget = getattr(obj, self.mdi_entryline_name)
                 break
-        # Setup the basic timer system as a heart beat on the queue
-        self.heart_beat_timer = QTimer(self)
-        # use a 1 second timer
-        self.heart_beat_timer.start(250)
-        self.heart_beat_timer.timeout.connect(self.heartBeat)
+
+        STATUS.interp_state.notify(self.onInterpStateChanged)
+
+        self.runNext()
 
     def terminate(self):
         """Teardown processing."""
-        self.heart_beat_timer.stop()
+        self._queue_paused = True
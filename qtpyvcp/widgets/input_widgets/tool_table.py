@@ -1,5 +1,8 @@
-from qtpy.QtCore import Qt, Slot, Property, QModelIndex, QSortFilterProxyModel
-from qtpy.QtGui import QStandardItemModel, QColor, QBrush
+from bisect import bisect_left
+
+from qtpy.QtCore import Qt, Slot, Property, QModelIndex, QSortFilterProxyModel, \
+     QAbstractTableModel
+from qtpy.QtGui import QColor, QBrush
 from qtpy.QtWidgets import QTableView, QStyledItemDelegate, QDoubleSpinBox, \
      QSpinBox, QLineEdit, QMessageBox
 
@@ -10,6 +13,10 @@ from qtpyvcp.plugins import getPlugin
 
 LOG = getLogger(__name__)
 
+# order of the values in the tool rows
+TOOL_COLUMNS = 'TPXYZABCUVWDIJQR'
+COLUMN_INDEX = {col: i for i, col in enumerate(TOOL_COLUMNS)}
+
 
 class ItemDelegate(QStyledItemDelegate):
 
@@ -78,7 +85,18 @@ class ItemDelegate(QStyledItemDelegate):
         return None
 
 
-class ToolModel(QStandardItemModel):
+class ToolModel(QAbstractTableModel):
+    """Table model of the tool table.
+
+    The tools are kept as a list of rows sorted by tool number, each row
+    being a list of the tool values in ``TOOL_COLUMNS`` order, so cell
+    lookups don't need to sort or search the tool table. Changes to the
+    tool table and to the tool in the spindle only update the affected rows.
+    """
+
+    # max number of tools that can be added
+    MAX_TOOLS = 56
+
     def __init__(self, parent=None):
         super(ToolModel, self).__init__(parent)
 
@@ -92,40 +110,87 @@ class ToolModel(QStandardItemModel):
         self._columns = self.tt.columns
         self._column_labels = self.tt.COLUMN_LABELS
 
-        self._tool_table = self.tt.getToolTable()
-
-        self.setColumnCount(self.columnCount())
-        self.setRowCount(1000)  # (self.rowCount())
+        self._tool_nums = []  # sorted tool numbers, excluding the spindle
+        self._rows = []       # tool values, one row per tool number
+        self._spindle_tool = None
+        self._current_tool = self.stat.tool_in_spindle
+        self._setToolTable(self.tt.getToolTable())
 
         self.status.tool_in_spindle.notify(self.refreshModel)
         self.tt.tool_table_changed.connect(self.updateModel)
 
-    def refreshModel(self):
-        # refresh model so current tool gets highlighted
-        self.beginResetModel()
-        self.endResetModel()
+    def _setToolTable(self, tool_table):
+        self._spindle_tool = tool_table.get(0, self._spindle_tool)
+        self._tool_nums = sorted(tnum for tnum in tool_table if tnum != 0)
+        self._rows = [self._toolRow(tool_table[tnum]) for tnum in self._tool_nums]
+
+    def _toolRow(self, tool_data):
+        default_tool = self.tt.DEFAULT_TOOL
+        return [tool_data.get(col, default_tool[col]) for col in TOOL_COLUMNS]
+
+    def _rowForTool(self, tnum):
+        row = bisect_left(self._tool_nums, tnum)
+        if row < len(self._tool_nums) and self._tool_nums[row] == tnum:
+            return row
+        return -1
+
+    def _emitRowChanged(self, row):
+        if row != -1:
+            self.dataChanged.emit(self.index(row, 0),
+                                  self.index(row, self.columnCount() - 1))
+
+    def refreshModel(self, tool_in_spindle=None):
+        # update the previous and the new current tool rows, so the
+        # current tool gets highlighted
+        if tool_in_spindle is None:
+            tool_in_spindle = self.stat.tool_in_spindle
+
+        previous_tool, self._current_tool = self._current_tool, tool_in_spindle
+        self._emitRowChanged(self._rowForTool(previous_tool))
+        self._emitRowChanged(self._rowForTool(tool_in_spindle))
 
     def updateModel(self, tool_table):
-        # update model with new data
-        self.beginResetModel()
-        self._tool_table = tool_table
-        self.endResetModel()
+        # update model with new data, only changing the affected rows
+        self._spindle_tool = tool_table.get(0, self._spindle_tool)
+        new_tool_nums = set(tnum for tnum in tool_table if tnum != 0)
+
+        # remove deleted tools, last first so the rows don't shift
+        for row in reversed(range(len(self._tool_nums))):
+            if self._tool_nums[row] not in new_tool_nums:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self._tool_nums[row]
+                del self._rows[row]
+                self.endRemoveRows()
+
+        for tnum in sorted(new_tool_nums):
+            new_row = self._toolRow(tool_table[tnum])
+            row = self._rowForTool(tnum)
+            if row == -1:
+                row = bisect_left(self._tool_nums, tnum)
+                self.beginInsertRows(QModelIndex(), row, row)
+                self._tool_nums.insert(row, tnum)
+                self._rows.insert(row, new_row)
+                self.endInsertRows()
+            elif self._rows[row] != new_row:
+                self._rows[row] = new_row
+                self._emitRowChanged(row)
 
     def setColumns(self, columns):
+        self.beginResetModel()
         self._columns = columns
-        self.setColumnCount(len(columns))
+        self.endResetModel()
 
     def headerData(self, section, orientation, role=Qt.DisplayRole):
         if role == Qt.DisplayRole and orientation == Qt.Horizontal:
             return self._column_labels[self._columns[section]]
 
-        return QStandardItemModel.headerData(self, section, orientation, role)
+        return QAbstractTableModel.headerData(self, section, orientation, role)
 
     def columnCount(self, parent=None):
         return len(self._columns)
 
     def rowCount(self, parent=None):
-        return len(self._tool_table) - 1
+        return len(self._tool_nums)
 
     def flags(self, index):
         return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsEditable
@@ -133,8 +198,7 @@ class ToolModel(QStandardItemModel):
     def data(self, index, role=Qt.DisplayRole):
         if role == Qt.DisplayRole or role == Qt.EditRole:
             key = self._columns[index.column()]
-            tnum = sorted(self._tool_table)[index.row() + 1]
-            return self._tool_table[tnum][key]
+            return self._rows[index.row()][COLUMN_INDEX[key]]
 
         elif role == Qt.TextAlignmentRole:
             col = self._columns[index.column()]
@@ -146,64 +210,100 @@ class ToolModel(QStandardItemModel):
                 return Qt.AlignVCenter | Qt.AlignRight
 
         elif role == Qt.TextColorRole:
-            tnum = sorted(self._tool_table)[index.row() + 1]
-            if self.stat.tool_in_spindle == tnum:
+            if self._tool_nums[index.row()] == self._current_tool:
                 return QBrush(self.current_tool_color)
-            else:
-                return QStandardItemModel.data(self, index, role)
 
         elif role == Qt.BackgroundRole and self.current_tool_bg is not None:
-            tnum = sorted(self._tool_table)[index.row() + 1]
-            if self.stat.tool_in_spindle == tnum:
+            if self._tool_nums[index.row()] == self._current_tool:
                 return QBrush(self.current_tool_bg)
-            else:
-                return QStandardItemModel.data(self, index, role)
 
-        return QStandardItemModel.data(self, index, role)
+        return None
 
     def setData(self, index, value, role):
         key = self._columns[index.column()]
-        tnum = sorted(self._tool_table)[index.row() + 1]
-        self._tool_table[tnum][key] = value
+        if key == 'T':
+            return self._setToolNumber(index.row(), value)
+
+        self._rows[index.row()][COLUMN_INDEX[key]] = value
+        self.dataChanged.emit(index, index)
+        return True
+
+    def _setToolNumber(self, row, tnum):
+        # change the tool number of a row, moving the row to keep the
+        # rows sorted by tool number
+        if tnum == self._tool_nums[row]:
+            return True
+
+        if tnum == 0 or self._rowForTool(tnum) != -1:
+            LOG.warning("Can't change the tool number to T%s, the tool already exists", tnum)
+            return False
+
+        tool_nums = self._tool_nums[:row] + self._tool_nums[row + 1:]
+        new_row = bisect_left(tool_nums, tnum)
+
+        # the destination is given as the row position before the move
+        moved = new_row != row and self.beginMoveRows(
+            QModelIndex(), row, row, QModelIndex(),
+            new_row if new_row < row else new_row + 1)
+
+        tool_row = self._rows.pop(row)
+        tool_row[COLUMN_INDEX['T']] = tnum
+        self._rows.insert(new_row, tool_row)
+        self._tool_nums = tool_nums
+        self._tool_nums.insert(new_row, tnum)
+
+        if moved:
+            self.endMoveRows()
+        self._emitRowChanged(new_row)
         return True
 
     def removeTool(self, row):
         self.beginRemoveRows(QModelIndex(), row, row)
-        tnum = sorted(self._tool_table)[row + 1]
-        del self._tool_table[tnum]
+        del self._tool_nums[row]
+        del self._rows[row]
         self.endRemoveRows()
         return True
 
     def addTool(self):
         try:
-            tnum = sorted(self._tool_table)[-1] + 1
+            tnum = self._tool_nums[-1] + 1
         except IndexError:
             tnum = 1
 
-        row = len(self._tool_table) - 1
+        row = len(self._tool_nums)
 
-        if row == 56:
-            # max 56 tools
+        if row == self.MAX_TOOLS:
             return False
 
         self.beginInsertRows(QModelIndex(), row, row)
-        self._tool_table[tnum] = self.tt.newTool(tnum=tnum)
+        self._tool_nums.append(tnum)
+        self._rows.append(self._toolRow(self.tt.newTool(tnum=tnum)))
         self.endInsertRows()
         return True
 
     def toolDataFromRow(self, row):
         """Returns dictionary of tool data"""
-        tnum = sorted(self._tool_table)[row + 1]
-        return self._tool_table[tnum]
+        return dict(zip(TOOL_COLUMNS, self._rows[row]))
+
+    def toolTable(self):
+        """Returns the tool table dict, including any unsaved changes"""
+        tool_table = {0: self._spindle_tool}
+        for tnum, row in zip(self._tool_nums, self._rows):
+            tool_table[tnum] = dict(zip(TOOL_COLUMNS, row))
+        return tool_table
 
     def saveToolTable(self):
-        self.tt.saveToolTable(self._tool_table, self._columns)
+        self.tt.saveToolTable(self.toolTable(), self._columns)
         return True
 
     def clearToolTable(self):
-        self.beginRemoveRows(QModelIndex(), 0, 100)
+        if not self._tool_nums:
+            return True
+
+        self.beginRemoveRows(QModelIndex(), 0, len(self._tool_nums) - 1)
         # delete all but the spindle, which can't be deleted
-        self._tool_table = {0: self._tool_table[0]}
+        self._tool_nums = []
+        self._rows = []
         self.endRemoveRows()
         return True
 